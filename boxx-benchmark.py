@@ -0,0 +1,176 @@
+"""
+MODULE: boxx-benchmark.py
+
+Time a complete boxx-download.py run against a local mock site (see
+boxx-mock-site.py) for catalogs of several sizes, and show where the time
+went: sleeping (rate limit and page waits) versus transferring files.
+
+Each run uses its own temporary directories and .ini file, so nothing
+under the real base-dir or state-dir is touched.  Firefox and geckodriver
+must be installed, the same as for a real run, unless --http-only is given.
+    python boxx-benchmark.py --files 10 100 1000
+    python boxx-benchmark.py --http-only --files 10 100
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+MOCK_SITE = "mock-boxx"
+
+
+def load_script(name: str):
+    """ Import one of the hyphenated scripts in this directory as a fresh module. """
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_"), SCRIPT_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_ini(run_dir: str, site_url: str, args: argparse.Namespace) -> None:
+    """
+    Write the .ini file for one benchmark run.
+
+    param run_dir: temporary directory for the run. (The .ini file and all
+                   directories go here)
+    param site_url: address of the mock site.
+    param args: benchmark command line.
+    """
+    with open(os.path.join(run_dir, "boxx-download.ini"), "w", encoding="utf-8") as ini_file:
+        ini_file.write(f"""[SETTINGS]
+downloads-per-window={args.downloads_per_window}
+download-window-in-seconds={args.window}
+wait-until-duration=15
+hide-browser=Yes
+download-engine={args.engine}
+catalog-engine={args.catalog_engine}
+crawl-workers={args.crawl_workers}
+
+[BOXX SITE URLS]
+{MOCK_SITE}={site_url}
+
+[DIRECTORIES]
+base-dir={run_dir}/base
+download-dir={run_dir}/downloads
+state-dir={run_dir}/state
+{MOCK_SITE}={MOCK_SITE}
+""")
+
+
+def save_mock_session(run_dir: str, mock) -> None:
+    """
+    Save a login session for the mock site, as an earlier run would have,
+    so the run doesn't need the browser to log in.  (See load_session())
+    """
+    session_dir = os.path.join(run_dir, "state", "sessions")
+    os.makedirs(session_dir, mode=0o700)
+    name, value = mock.SESSION_COOKIE.split("=")
+    with open(os.path.join(session_dir, f"{MOCK_SITE}.json"), "w", encoding="utf-8") as session_file:
+        json.dump({"cookies": [{"name": name, "value": value}], "user_agent": None}, session_file)
+
+
+def run_once(mock, files: int, args: argparse.Namespace) -> dict:
+    """
+    Download a whole mock catalog once.
+
+    param mock: the boxx-mock-site module.
+    param files: number of files the mock site offers.
+    param args: benchmark command line.
+    return: wall time, the run's RUN_STATS and the mock site's request counts.
+    """
+    catalog = mock.MockCatalog.for_file_count(files, args.members, args.variants, args.file_size,
+                                              args.static_variants, args.duplicates)
+    rate_limit = mock.RateLimit(args.downloads_per_window, args.window) if args.site_rate_limit else None
+    server, site_stats = mock.start_mock_site(catalog, bandwidth=args.bandwidth, rate_limit=rate_limit,
+                                              latency=args.latency)
+    site_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    start_dir = os.getcwd()
+    saved_argv = sys.argv
+    with tempfile.TemporaryDirectory(prefix="boxx-benchmark-") as run_dir:
+        write_ini(run_dir, site_url, args)
+        if args.http_only:
+            save_mock_session(run_dir, mock)
+        os.environ.setdefault("BOXX_USER", "benchmark@example.com")
+        os.environ.setdefault("BOXX_PW", "benchmark")
+        try:
+            # boxx-download.py READS ITS .ini FILE FROM THE CURRENT
+            # DIRECTORY WHEN IT IS LOADED.
+            os.chdir(run_dir)
+            sys.argv = ["boxx-download.py", MOCK_SITE]
+            downloader = load_script("boxx-download")
+            started = time.monotonic()
+            downloader.main()
+            wall = time.monotonic() - started
+        finally:
+            sys.argv = saved_argv
+            os.chdir(start_dir)
+            server.shutdown()
+
+    return {"files": catalog.file_count, "wall": wall, "stats": downloader.RUN_STATS, "site": site_stats}
+
+
+def print_report(result: dict) -> None:
+    """ Show where the time went in one benchmark run. """
+    stats = result["stats"]
+    seconds = stats["seconds"]
+    waited = sum(total for (_, total, _, _) in stats["waits"].values())
+    slept = seconds.get("rate-limit-sleep", 0.0) + waited
+    transfer = seconds.get("transfer", 0.0)
+    megabytes = result["site"]["bytes"] / (1024 * 1024)
+
+    print(f"{result['files']} files: {result['wall']:.1f}s wall, "
+          f"{stats['downloaded']} downloaded, {stats['linked']} linked, {stats['skipped']} skipped, "
+          f"{len(stats['failed'])} failed")
+    print(f"    sleeping {slept:.1f}s (rate limit {seconds.get('rate-limit-sleep', 0.0):.1f}s, "
+          f"page waits {waited:.1f}s) vs transfer {transfer:.1f}s "
+          f"({megabytes / transfer if transfer else 0.0:.1f} MB/s)")
+    for phase, phase_seconds in sorted(seconds.items()):
+        print(f"    {phase}: {phase_seconds:.1f}s ({100 * phase_seconds / result['wall']:.0f}%)")
+    print(f"    site: {result['site']['requests']} requests, "
+          f"{result['site']['downloads']} downloads, {result['site']['refused']} refused")
+
+
+def main():
+    """
+    Main program starts here.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark boxx-download.py against a mock boxx site.")
+    parser.add_argument("--files", type=int, nargs="+", default=[10, 100, 1000, 5000],
+                        help="catalog sizes to benchmark")
+    parser.add_argument("--members", type=int, default=10, help="members of each item")
+    parser.add_argument("--variants", type=int, default=2, help="files for each member")
+    parser.add_argument("--file-size", type=int, default=256 * 1024, help="bytes in each file")
+    parser.add_argument("--bandwidth", type=int, default=0, help="bytes per second per download (0 = unlimited)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds each page takes to be served")
+    parser.add_argument("--static-variants", action="store_true",
+                        help="put the variants in the item pages (so they can be read without the browser)")
+    parser.add_argument("--duplicates", action="store_true", help="give every item the same files")
+    parser.add_argument("--engine", choices=["http", "browser"], default="http")
+    parser.add_argument("--catalog-engine", choices=["http", "browser"], default="http")
+    parser.add_argument("--crawl-workers", type=int, default=4, help="item pages read at the same time")
+    parser.add_argument("--downloads-per-window", type=int, default=1000000,
+                        help="the downloader's rate limit (default: effectively none)")
+    parser.add_argument("--window", type=int, default=300, help="rate limit window in seconds")
+    parser.add_argument("--site-rate-limit", action="store_true",
+                        help="make the mock site refuse downloads over the same limit")
+    parser.add_argument("--http-only", action="store_true",
+                        help="log in with a saved session and read everything over HTTP, so Firefox isn't "
+                             "needed (for CI; implies --engine http --catalog-engine http --static-variants)")
+    args = parser.parse_args()
+    if args.http_only:
+        args.engine, args.catalog_engine, args.static_variants = "http", "http", True
+
+    mock = load_script("boxx-mock-site")
+    for files in args.files:
+        print_report(run_once(mock, files, args))
+
+
+if "__main__" == __name__:
+    main()
@@ -1,20 +1,46 @@
 """
 MODULE: boxx-download.py
 """
+import argparse
+import contextlib
+import ctypes
+import ctypes.util
+import concurrent.futures
+import fcntl
+import fnmatch
+import functools
 import glob
+import hashlib
+import json
+import math
+import mimetypes
 import os
+import random
+import re
+import select
 import shutil
+import signal
+import socket
+import socketserver
+import sqlite3
+import struct
+import subprocess
 import sys
+import threading
 import time
 
 from configparser import ConfigParser, NoOptionError
 from pathlib import Path
+from queue import Queue
+from typing import Callable, NamedTuple
+from html.parser import HTMLParser
+from urllib.parse import unquote, urljoin, urlparse
 
+import urllib3
 from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.ui import WebDriverWait
 
 CONFIG = ConfigParser()
@@ -24,15 +50,369 @@ SECTION_SETTINGS = "SETTINGS"
 SECTION_LOGIN = "LOGIN"
 SECTION_URLS = "BOXX SITE URLS"
 SECTION_DIRS = "DIRECTORIES"
+SECTION_WAITS = "WAITS"
+SECTION_METRICS = "METRICS"
+SECTION_FILTERS = "FILTERS"
+SECTION_DAEMON = "DAEMON"
+SECTION_BROWSER = "BROWSER"
+SECTION_INDEX = "INDEX"
 
-DUR_BETW_PGS = int(CONFIG.get(SECTION_SETTINGS, "wait-between-pages"))
 DUR_WAIT_UTL = int(CONFIG.get(SECTION_SETTINGS, "wait-until-duration"))
-DUR_BETW_DLS = int(CONFIG.get(SECTION_SETTINGS, "min-time-between-downloads-in-seconds"))
+RATE_LIMIT_COUNT = int(CONFIG.get(SECTION_SETTINGS, "downloads-per-window", fallback="5"))
+RATE_LIMIT_WINDOW = int(CONFIG.get(SECTION_SETTINGS, "download-window-in-seconds", fallback="300"))
+
+# LONGEST TIME (IN SECONDS) TO WAIT FOR EACH PAGE CONDITION.  SEE wait_for()
+WAIT_CEILINGS = {
+    name: float(CONFIG.get(SECTION_WAITS, name, fallback=str(DUR_WAIT_UTL)))
+    for name in ("login-form", "login", "my-downloads-link", "my-downloads",
+                 "item-page", "member-files", "download-start")
+}
+WAIT_POLL = float(CONFIG.get(SECTION_WAITS, "poll-interval", fallback="0.1"))
+
+CATALOG_TTL = float(CONFIG.get(SECTION_SETTINGS, "catalog-ttl-in-hours", fallback="12")) * 3600
+
+DUR_DL_TIMEOUT = int(CONFIG.get(SECTION_SETTINGS, "download-timeout-in-seconds", fallback="3600"))
+DUR_DL_POLL = float(CONFIG.get(SECTION_SETTINGS, "download-poll-interval-in-seconds", fallback="0.25"))
+DUR_DL_STABLE = float(CONFIG.get(SECTION_SETTINGS, "download-stable-size-in-seconds", fallback="0.2"))
+
+DL_ENGINE = CONFIG.get(SECTION_SETTINGS, "download-engine", fallback="http").lower()
+CATALOG_ENGINE = CONFIG.get(SECTION_SETTINGS, "catalog-engine", fallback="http").lower()
+HTTP_CHUNK_SIZE = int(CONFIG.get(SECTION_SETTINGS, "http-chunk-size-in-kb", fallback="1024")) * 1024
+HTTP_POOL_SIZE = int(CONFIG.get(SECTION_SETTINGS, "http-pool-size", fallback="4"))
+CRAWL_WORKERS = max(1, int(CONFIG.get(SECTION_SETTINGS, "crawl-workers", fallback="4")))
+MOVER_THREADS = int(CONFIG.get(SECTION_SETTINGS, "mover-threads", fallback="2"))
+MOVER_QUEUE_SIZE = int(CONFIG.get(SECTION_SETTINGS, "mover-queue-size", fallback="4"))
+DEDUP_MODE = CONFIG.get(SECTION_SETTINGS, "dedup-mode", fallback="hardlink").lower()
+# HEAD REQUESTS MAY COUNT AGAINST A SITE'S DOWNLOAD LIMIT (OR LOOK LIKE A
+# BOT), SO FILES ARE ONLY PROBED WITH THEM WHEN ASKED TO.
+HEAD_REQUESTS = CONFIG.get(SECTION_SETTINGS, "head-requests", fallback="no").lower() == "yes"
+PLAN_PRIORITY = CONFIG.get(SECTION_SETTINGS, "plan-priority", fallback="catalog")
+
+HTTP_RESUME_ATTEMPTS = int(CONFIG.get(SECTION_SETTINGS, "http-resume-attempts", fallback="3"))
+BROWSER_DOWNLOADS = max(1, int(CONFIG.get(SECTION_SETTINGS, "browser-downloads", fallback="3")))
+RETRY_ATTEMPTS = int(CONFIG.get(SECTION_SETTINGS, "retry-attempts", fallback="3"))
+RETRY_BACKOFF = float(CONFIG.get(SECTION_SETTINGS, "retry-backoff-in-seconds", fallback="30"))
+HTTP_TIMEOUT = urllib3.Timeout(connect=DUR_WAIT_UTL, read=int(
+    CONFIG.get(SECTION_SETTINGS, "http-read-timeout-in-seconds", fallback="120")))
 
 BOXX_SITES = CONFIG.options(SECTION_URLS)
 
+# EACH SITE GETS ITS OWN SUBDIRECTORY OF download-dir WHEN SITES ARE
+# PROCESSED IN PARALLEL.  (SEE run_site())
+# WITH stage-on-base-dir THE BROWSER DOWNLOADS ONTO THE SAME FILESYSTEM
+# AS base-dir SO FILES ARE PUT IN PLACE WITH A RENAME INSTEAD OF A COPY.
+STAGE_ON_BASE_DIR = CONFIG.get(SECTION_DIRS, "stage-on-base-dir", fallback="no").lower() == "yes"
+DOWNLOAD_DIR = os.path.join(CONFIG.get(SECTION_DIRS, "base-dir"), ".incoming") if STAGE_ON_BASE_DIR \
+    else CONFIG.get(SECTION_DIRS, "download-dir")
+STATE_DIR = CONFIG.get(SECTION_DIRS, "state-dir", fallback=".boxx-state")
+MANIFEST_DB = os.path.join(STATE_DIR, "manifest.sqlite")
+# THE PLAN AND HOW FAR IT GOT, FOR --resume.  (SEE journal())
+JOURNAL_FILE = os.path.join(STATE_DIR, "journal.jsonl")
+# PARTIAL HTTP DOWNLOADS ARE KEPT HERE (ON THE SAME FILESYSTEM AS base-dir
+# BY DEFAULT) UNTIL THEY ARE COMPLETE.
+STAGING_DIR = CONFIG.get(SECTION_DIRS, "staging-dir",
+                         fallback=os.path.join(CONFIG.get(SECTION_DIRS, "base-dir"), ".partial"))
+
+# ONE COPY OF EVERY DOWNLOADED FILE, NAMED BY ITS SHA-256.  FILES WITH THE
+# SAME CONTENTS UNDER base-dir ARE LINKS TO IT.  (SEE store_blob())
+BLOB_DIR = CONFIG.get(SECTION_DIRS, "blob-dir",
+                      fallback=os.path.join(CONFIG.get(SECTION_DIRS, "base-dir"), ".blobs"))
+
+# WHERE TO RECORD WHAT HAPPENED.  (AN EMPTY SETTING TURNS IT OFF)
+#   events-file:     ONE JSON OBJECT PER LINE FOR EACH LOGIN, PAGE READ,
+#                    DOWNLOAD, MOVE, RATE LIMIT SLEEP AND FAILURE
+#   prometheus-file: THE LAST RUN'S METRICS FOR node_exporter's TEXTFILE
+#                    COLLECTOR, WRITTEN AT THE END OF EACH RUN
+EVENTS_FILE = CONFIG.get(SECTION_METRICS, "events-file", fallback=os.path.join(STATE_DIR, "events.jsonl"))
+PROMETHEUS_FILE = CONFIG.get(SECTION_METRICS, "prometheus-file", fallback="")
+PROFILE_INTERVAL = float(CONFIG.get(SECTION_METRICS, "profile-interval-in-ms", fallback="10")) / 1000
+LATENCY_BUCKETS = [float(bucket) for bucket in CONFIG.get(
+    SECTION_METRICS, "latency-buckets", fallback="0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600").split(",")]
+
+# WHICH FILES TO DOWNLOAD.  ONE RULE PER LINE, SUCH AS variant:4k-prores
+# OR volume:3-10.  (SEE selected().  --include AND --exclude REPLACE THEM)
+FILTER_INCLUDE = CONFIG.get(SECTION_FILTERS, "include", fallback="").split("\n")
+FILTER_EXCLUDE = CONFIG.get(SECTION_FILTERS, "exclude", fallback="").split("\n")
+FILTER_FIELDS = ("item", "volume", "title", "name", "duration", "variant")
+NUMBER_FIELDS = ("volume", "duration", "width", "height")
+
+# --daemon: HOW OFTEN EACH SITE'S "MY DOWNLOADS" IS CHECKED FOR NEW PURCHASES
+# (GIVE OR TAKE THE JITTER), HOW OFTEN EVERY ITEM IS CHECKED AGAIN AND WHERE
+# THE CONTROL SOCKET (SEE --control) IS.
+DAEMON_INTERVAL = float(CONFIG.get(SECTION_DAEMON, "poll-interval-in-minutes", fallback="60")) * 60
+DAEMON_JITTER = float(CONFIG.get(SECTION_DAEMON, "poll-jitter-in-minutes", fallback="10")) * 60
+DAEMON_FULL_SYNC = float(CONFIG.get(SECTION_DAEMON, "full-sync-in-hours", fallback="24")) * 3600
+CONTROL_SOCKET = CONFIG.get(SECTION_DAEMON, "control-socket", fallback=os.path.join(STATE_DIR, "control.sock"))
+
+# HOW FIREFOX IS SET UP.  (SEE start_browser())
+#   profile-dir:        KEEP THE PROFILE (AND ITS CACHE) HERE BETWEEN RUNS.
+#                       (EMPTY = A NEW PROFILE EVERY TIME)
+#   page-load-strategy: normal, eager (DON'T WAIT FOR IMAGES, STYLESHEETS,
+#                       ...) OR none (DON'T WAIT AT ALL)
+BROWSER_PROFILE_DIR = CONFIG.get(SECTION_BROWSER, "profile-dir", fallback="")
+PAGE_LOAD_STRATEGY = CONFIG.get(SECTION_BROWSER, "page-load-strategy", fallback="eager").lower()
+BLOCK_IMAGES = CONFIG.get(SECTION_BROWSER, "block-images", fallback="yes").lower() == "yes"
+BLOCK_FONTS = CONFIG.get(SECTION_BROWSER, "block-fonts", fallback="yes").lower() == "yes"
+BLOCK_MEDIA = CONFIG.get(SECTION_BROWSER, "block-media", fallback="yes").lower() == "yes"
+DISABLE_PREFETCH = CONFIG.get(SECTION_BROWSER, "disable-prefetch", fallback="yes").lower() == "yes"
+DISABLE_TELEMETRY = CONFIG.get(SECTION_BROWSER, "disable-telemetry", fallback="yes").lower() == "yes"
+
+# THE MEDIA INDEX OF THE FILES UNDER base-dir.  (SEE update_media_index()
+# AND query_media())  EMPTY ffprobe = ONLY INDEX THE NAMES AND SIZES.
+INDEX_ON_MOVE = CONFIG.get(SECTION_INDEX, "index-on-move", fallback="yes").lower() == "yes"
+FFPROBE = CONFIG.get(SECTION_INDEX, "ffprobe", fallback="ffprobe")
+PROBE_WORKERS = max(1, int(CONFIG.get(SECTION_INDEX, "probe-workers", fallback="4")))
+# QUERY FIELDS AND THE MEDIA TABLE'S COLUMN FOR EACH.  (duration IS THE
+# PROBED LENGTH WHEN KNOWN, OTHERWISE THE ONE IN THE FILE'S NAME)
+MEDIA_COLUMNS = {"site": "site", "item": "item", "volume": "volume", "title": "title", "name": "content_name",
+                 "duration": "seconds", "variant": "variant", "codec": "codec", "width": "width", "height": "height"}
+# SAVE NAMES (title-contentname-duration-variant) OF FILES THE CATALOG
+# DOESN'T KNOW.  (SEE member_filename())
+MEDIA_NAME_RE = re.compile(r"^(?P<title>.+)-(?P<name>[^-]+)-(?P<duration>\d+)(?:-(?P<variant>.+))?$")
+
+# THE "MY DOWNLOADS" PAGE OF EACH SITE, ONCE FOUND.  (SEE read_catalog_over_http())
+MY_DOWNLOADS_URLS = {}
+
 VISIBLE_MSG = "Starting browser in VISIBLE mode."
 
+# LOCAL RECORD OF WHAT HAS BEEN DOWNLOADED.
+#   files:      EVERY FILE MOVED INTO PLACE UNDER BASE-DIR
+#   items:      ITEMS WHOSE DOWNLOAD PAGE HAS BEEN READ FROM START TO END
+#   item_files: THE FILES LISTED ON EACH ITEM'S DOWNLOAD PAGE
+# AND A CACHE OF WHAT THE SITES OFFER.
+#   catalogs:        WHEN EACH SITE'S "MY DOWNLOADS" PAGE WAS LAST READ
+#   catalog_items:   THE PURCHASED ITEMS LISTED ON "MY DOWNLOADS"
+#   catalog_entries: THE FILES ON EACH ITEM'S DOWNLOAD PAGE ('' VARIANT
+#                    FOR ITEM MEMBERS WITH A SINGLE FILE)
+#   file_sizes:      THE SIZE THE SITE GAVE FOR EACH OF THEM (FOR THE
+#                    smallest AND largest PRIORITY RULES)
+# AND THE CONTENTS BEHIND EACH (SIZE, ETAG) THE SITES HAVE SENT.
+#   fingerprints:    SHA-256 OF EACH FILE DOWNLOADED OVER HTTP
+# AND HOW FAST EACH SITE'S DOWNLOADS HAVE BEEN.  (FOR THE PLAN'S ESTIMATES)
+#   transfers:       TOTAL BYTES AND TRANSFER SECONDS OF ALL RUNS
+MANIFEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    site TEXT NOT NULL,
+    item TEXT NOT NULL,
+    file TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER,
+    sha256 TEXT,
+    downloaded_at REAL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (site, item, file)
+);
+CREATE TABLE IF NOT EXISTS items (
+    site TEXT NOT NULL,
+    item TEXT NOT NULL,
+    listed_at REAL NOT NULL,
+    PRIMARY KEY (site, item)
+);
+CREATE TABLE IF NOT EXISTS item_files (
+    site TEXT NOT NULL,
+    item TEXT NOT NULL,
+    file TEXT NOT NULL,
+    PRIMARY KEY (site, item, file)
+);
+CREATE TABLE IF NOT EXISTS catalogs (
+    site TEXT NOT NULL PRIMARY KEY,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS catalog_items (
+    site TEXT NOT NULL,
+    item TEXT NOT NULL,
+    url TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (site, item)
+);
+CREATE TABLE IF NOT EXISTS catalog_entries (
+    site TEXT NOT NULL,
+    item TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    content_name TEXT NOT NULL,
+    duration TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    PRIMARY KEY (site, item, position, variant)
+);
+CREATE TABLE IF NOT EXISTS file_sizes (
+    site TEXT NOT NULL,
+    item TEXT NOT NULL,
+    file TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (site, item, file)
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    size INTEGER NOT NULL,
+    etag TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (size, etag)
+);
+CREATE TABLE IF NOT EXISTS transfers (
+    site TEXT NOT NULL PRIMARY KEY,
+    bytes INTEGER NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS media (
+    path TEXT NOT NULL PRIMARY KEY,
+    site TEXT NOT NULL,
+    item TEXT NOT NULL,
+    volume INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    content_name TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    seconds REAL,
+    width INTEGER,
+    height INTEGER,
+    codec TEXT,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS media_by_height ON media (height, seconds);
+CREATE INDEX IF NOT EXISTS media_by_seconds ON media (seconds);
+CREATE INDEX IF NOT EXISTS media_by_site ON media (site, item);
+"""
+MANIFEST = threading.local()
+
+# MOVES FINISHED DOWNLOADS TO base-dir WHILE THE BROWSER CARRIES ON.
+# (SEE get_mover())
+MOVER = None
+
+# WHAT HAPPENED DURING THIS RUN.  (ONE COPY PER WORKER PROCESS WHEN
+# SITES ARE PROCESSED IN PARALLEL)
+#   seconds: TOTAL TIME SPENT IN EACH PHASE (SEE timed())
+#   sites:   FILES, BYTES, FAILURES BY REASON AND PHASE LATENCY HISTOGRAMS
+#            FOR EACH SITE (SEE site_metrics())
+#   linked:  FILES NOT DOWNLOADED BECAUSE THE SAME FILE WAS DOWNLOADED BEFORE
+RUN_STATS = {"downloaded": 0, "skipped": 0, "linked": 0, "failed": [], "waits": {}, "seconds": {}, "sites": {}}
+STATS_LOCK = threading.Lock()
+
+# SPANS FOR --trace, IN CHROME'S TRACE EVENT FORMAT.  (NONE = NOT TRACING.
+# SEE span())  TRACED_THREADS ARE THE (PROCESS, THREAD)s ALREADY NAMED.
+TRACE_EVENTS = None
+TRACED_THREADS = set()
+# STACKS SEEN BY THE SAMPLING PROFILER (--profile) AND HOW OFTEN.
+# (SEE start_profiler())
+PROFILE_SAMPLES = {}
+
+# FAILED DOWNLOADS TO TRY AGAIN AT THE END OF THE PLAN.  (SEE
+# queue_retry() AND retry_failed_downloads())
+RETRY_QUEUE = []
+
+# FILES PUT UNDER base-dir THAT STILL HAVE TO BE ADDED TO THE MEDIA
+# INDEX.  (SEE record_file() AND index_new_files())
+MEDIA_PENDING = []
+
+# ioctl TO SHARE A FILE'S DATA WITH ANOTHER FILE (COPY-ON-WRITE
+# FILESYSTEMS SUCH AS BTRFS AND XFS).  (SEE /usr/include/linux/fs.h)
+FICLONE = 0x40049409
+
+# INOTIFY EVENTS THAT MATTER WHEN WATCHING THE DOWNLOAD DIRECTORY.  (SEE
+# /usr/include/linux/inotify.h)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+IN_EVENT_HEADER = struct.Struct("iIII")
+
+# JAVASCRIPT RUN IN THE BROWSER TO READ A WHOLE PAGE IN ONE ROUND TRIP
+# INSTEAD OF ONE WEBDRIVER CALL PER ELEMENT AND ATTRIBUTE.
+#
+# findDownloadUrl() FINDS THE URL BEHIND A DOWNLOAD ELEMENT WITHOUT
+# CLICKING IT.  IT LOOKS FOR AN ENCLOSING OR CONTAINED LINK FIRST, THEN
+# FOR DATA ATTRIBUTES OR AN ONCLICK HANDLER THAT CARRIES THE URL.
+FIND_DOWNLOAD_URL_JS = """
+const findDownloadUrl = (elem) => {
+    const usable = (href) => href && !href.startsWith("javascript:") && !href.endsWith("#");
+    const absolute = (href) => new URL(href, document.baseURI).href;
+
+    const link = elem.closest("a[href]") || elem.querySelector("a[href]");
+    if (link && usable(link.getAttribute("href"))) {
+        return link.href;
+    }
+    for (const node of [elem, ...elem.querySelectorAll("*")]) {
+        for (const attr of ["data-url", "data-href", "data-download", "download-url"]) {
+            const value = node.getAttribute(attr);
+            if (usable(value)) {
+                return absolute(value);
+            }
+        }
+        const onclick = node.getAttribute("onclick") || "";
+        const match = onclick.match(/['"]([^'"]*[Dd]ownload[^'"]*)['"]/);
+        if (match && usable(match[1])) {
+            return absolute(match[1]);
+        }
+    }
+    return null;
+};
+const textOf = (elem, className) => {
+    const found = elem.getElementsByClassName(className)[0];
+    return found ? found.innerText.trim() : "";
+};
+"""
+
+# "MY DOWNLOADS": EVERY LINK TO AN ITEM'S DOWNLOAD PAGE AND THE VOLUME
+# AND TITLE OF EVERY PURCHASED ITEM.
+MY_DOWNLOADS_JS = FIND_DOWNLOAD_URL_JS + """
+return {
+    links: Array.from(document.getElementsByTagName("a"), (a) => a.href).filter((href) => href),
+    items: Array.from(document.getElementsByClassName("contentsToDisplay"), (card) => ({
+        volume: textOf(card, "ContentExtraInfoSuperTitle"),
+        title: textOf(card, "TitleText"),
+    })),
+};
+"""
+
+# WITH page-load-strategy=none THE BROWSER DOESN'T WAIT FOR A NEW PAGE.  THE
+# PAGE BEING LEFT IS MARKED SO IT ISN'T MISTAKEN FOR THE NEW ONE, AND A PAGE
+# ISN'T READ UNTIL ALL OF ITS HTML IS THERE.  (SEE open_page())
+LEAVE_PAGE_JS = "window.boxxPageLeft = true;"
+PAGE_READY_JS = 'return !window.boxxPageLeft && document.readyState !== "loading";'
+
+# ITEM DOWNLOAD PAGE: THE TITLE, CONTENT NAME AND DURATION OF EACH ITEM MEMBER.
+ITEM_PAGE_JS = FIND_DOWNLOAD_URL_JS + """
+if (window.boxxPageLeft || document.readyState === "loading") {
+    return null;
+}
+return Array.from(document.getElementsByClassName("DownloadPageText"), (block) => ({
+    title: textOf(block, "TitleText"),
+    content_name: textOf(block, "Contentname"),
+    duration: textOf(block, "Duration"),
+}));
+"""
+
+# THE DOWNLOADS SHOWN AFTER CLICKING AN ITEM MEMBER: THE DESCRIPTION
+# AND (WHEN IT CAN BE FOUND) THE URL OF EACH VARIANT.  THE LISTS SHOWN
+# BEFORE THE CLICK ARE MARKED, SO A LIST THAT IS SLOW TO LOAD ISN'T
+# MISTAKEN FOR THE LAST MEMBER'S.  (SEE download_item_files())
+MARK_VARIANTS_JS = """
+for (const wrapper of document.getElementsByClassName("DescriptionWrapper")) {
+    wrapper.dataset.boxxSeen = "true";
+}
+"""
+VARIANTS_JS = FIND_DOWNLOAD_URL_JS + """
+return Array.from(document.querySelectorAll(".DescriptionWrapper:not([data-boxx-seen])"), (wrapper) => ({
+    description: textOf(wrapper, "ContentInfo"),
+    url: findDownloadUrl(wrapper),
+}));
+"""
+
+# ELEMENT HANDLES ARE ONLY LOOKED UP WHEN SOMETHING NEEDS CLICKING.
+MEMBER_TOGGLE_JS = """
+return document.getElementsByClassName("DownloadPageText")[arguments[0]].querySelector("svg");
+"""
+# POINT THE BROWSER'S DOWNLOADS AT ANOTHER DIRECTORY.  (RUN IN THE CHROME
+# CONTEXT.  SEE BrowserDownloads)
+SET_DOWNLOAD_DIR_JS = 'Services.prefs.setStringPref("browser.download.dir", arguments[0]);'
+
+VARIANT_ELEMENT_JS = """
+return document.querySelectorAll(".DescriptionWrapper:not([data-boxx-seen])")[arguments[0]];
+"""
+
 
 def print_error(*args, **kwargs):
     """ Print to standard error. Use the same as print() """
@@ -40,7 +420,300 @@ def print_error(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
 
-def login(browser: webdriver, boxx_site: str) -> None:
+def site_metrics(boxx_site: str) -> dict:
+    """
+    The metrics kept for a boxx site in RUN_STATS, created the first time.
+    Hold STATS_LOCK while changing them.
+
+    param boxx_site: which boxx site.
+    return: files and bytes downloaded, failures by reason and a latency
+                histogram for each phase.
+    """
+    return RUN_STATS["sites"].setdefault(boxx_site, {"files": 0, "bytes": 0, "failures": {}, "phases": {}})
+
+
+def observe_latency(phases: dict, phase: str, seconds: float) -> None:
+    """ Add one observation to a phase's latency histogram. (See LATENCY_BUCKETS) """
+    histogram = phases.setdefault(phase, {"buckets": [0] * len(LATENCY_BUCKETS), "count": 0, "sum": 0.0})
+    for index, bucket in enumerate(LATENCY_BUCKETS):
+        if seconds <= bucket:
+            histogram["buckets"][index] += 1
+            break
+    histogram["count"] += 1
+    histogram["sum"] += seconds
+
+
+def start_tracing() -> None:
+    """ Record spans from now on.  (See span() and write_trace()) """
+    global TRACE_EVENTS
+    TRACE_EVENTS = []
+
+
+@contextlib.contextmanager
+def span(name: str, category: str = "code", **fields):
+    """
+    Record the time spent in a with block as a span of the --trace output.
+    Spans in the same thread nest by time, so a span inside another shows
+    up under it.  (Nothing is recorded unless tracing is on)
+
+    param name: what the time was spent on.
+    param category: phase, wait, webdriver or code.
+    param fields: details shown with the span.
+    """
+    if TRACE_EVENTS is None:
+        yield
+        return
+
+    pid, thread = os.getpid(), threading.current_thread()
+    if (pid, thread.ident) not in TRACED_THREADS:
+        TRACED_THREADS.add((pid, thread.ident))
+        TRACE_EVENTS.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": thread.ident,
+                             "args": {"name": thread.name}})
+    started = time.time_ns()
+    try:
+        yield
+    finally:
+        TRACE_EVENTS.append({"name": name, "cat": category, "ph": "X", "ts": started // 1000,
+                             "dur": (time.time_ns() - started) // 1000, "pid": pid, "tid": thread.ident,
+                             "args": fields})
+
+
+def traced(func):
+    """ Trace each call of a function as a span named after it.  (See span()) """
+    @functools.wraps(func)
+    def traced_call(*args, **kwargs):
+        with span(func.__name__):
+            return func(*args, **kwargs)
+    return traced_call
+
+
+def write_trace(trace_file: str) -> None:
+    """ Save the spans for chrome://tracing or https://ui.perfetto.dev """
+    with open(trace_file, "w", encoding="utf-8") as trace:
+        json.dump({"traceEvents": TRACE_EVENTS, "displayTimeUnit": "ms"}, trace)
+    print(f"Trace of {len(TRACE_EVENTS)} spans written to {trace_file}")
+
+
+def start_profiler(interval: float) -> None:
+    """
+    Sample the Python stack of every thread each interval (of wall clock
+    time, so waiting shows up as well as working).  Only the main thread
+    can do this.  (See stop_profiler())
+
+    param interval: seconds between samples.
+    """
+    def sample(_signum, frame):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()  # pylint: disable=protected-access
+        frames[threading.main_thread().ident] = frame
+        for thread_id, thread_frame in frames.items():
+            stack = []
+            while thread_frame is not None:
+                code = thread_frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                thread_frame = thread_frame.f_back
+            folded = ";".join([names.get(thread_id, str(thread_id))] + stack[::-1])
+            PROFILE_SAMPLES[folded] = PROFILE_SAMPLES.get(folded, 0) + 1
+
+    signal.signal(signal.SIGALRM, sample)
+    signal.setitimer(signal.ITIMER_REAL, interval, interval)
+
+
+def stop_profiler(profile_file: str) -> None:
+    """
+    Stop sampling and save the samples as folded stacks (one "thread;
+    outer;...;inner count" line per stack) for flamegraph.pl or
+    https://www.speedscope.app
+    """
+    signal.setitimer(signal.ITIMER_REAL, 0)
+    with open(profile_file, "w", encoding="utf-8") as profile:
+        for folded, count in sorted(PROFILE_SAMPLES.items()):
+            profile.write(f"{folded} {count}\n")
+    print(f"Profile of {sum(PROFILE_SAMPLES.values())} samples written to {profile_file}")
+
+
+@contextlib.contextmanager
+def timed(phase: str, boxx_site: str | None = None):
+    """
+    Add the time spent in a with block to the phase's total in RUN_STATS
+    and (given a site) to the site's latency histogram for the phase.
+    (Phases can overlap, e.g. "move" runs in the background.)  With --trace
+    it is a span as well.
+
+    param phase: name of the phase.
+    param boxx_site: which boxx site the time was spent on.
+    """
+    started = time.time()
+    try:
+        with span(phase, "phase", site=boxx_site):
+            yield
+    finally:
+        elapsed = time.time() - started
+        with STATS_LOCK:
+            RUN_STATS["seconds"][phase] = RUN_STATS["seconds"].get(phase, 0.0) + elapsed
+            if boxx_site is not None:
+                observe_latency(site_metrics(boxx_site)["phases"], phase, elapsed)
+
+
+def record_event(boxx_site: str | None, event: str, **fields) -> None:
+    """
+    Append an event to the events file (one JSON object per line).
+
+    param boxx_site: which boxx site the event is for.
+    param event: what happened. (login, catalog, item-page, download, ...)
+    param fields: details of the event.
+    """
+    if not EVENTS_FILE:
+        return
+
+    line = json.dumps({"time": round(time.time(), 3), "pid": os.getpid(),
+                       "site": boxx_site, "event": event, **fields})
+    with STATS_LOCK:
+        Path(EVENTS_FILE).parent.mkdir(parents=True, exist_ok=True)
+        with open(EVENTS_FILE, "a", encoding="utf-8") as events_file:
+            events_file.write(line + "\n")
+
+
+def journal(boxx_site: str, entry: str, **fields) -> None:
+    """
+    Append a line to the run journal and make sure it is on disk before
+    carrying on, so --resume knows how far a run got even when the
+    process dies.  (See resume_site())
+
+    param boxx_site: which boxx site it is for.
+    param entry: plan, clicked, completed, moved, item-done or done.
+    param fields: the item, file, ... it is about.
+    """
+    line = json.dumps({"time": round(time.time(), 3), "site": boxx_site, "entry": entry, **fields})
+    with STATS_LOCK:
+        Path(JOURNAL_FILE).parent.mkdir(parents=True, exist_ok=True)
+        with open(JOURNAL_FILE, "a", encoding="utf-8") as journal_file:
+            journal_file.write(line + "\n")
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+
+def rotate_journal() -> None:
+    """ Start a new run journal.  (The last one is kept as journal.jsonl.1) """
+    with contextlib.suppress(FileNotFoundError):
+        os.replace(JOURNAL_FILE, JOURNAL_FILE + ".1")
+
+
+def record_download(boxx_site: str, item: str, filename: str, size: int, seconds: float, engine: str) -> None:
+    """ Count a finished download in RUN_STATS, the events file and the journal. """
+    journal(boxx_site, "completed", item=item, file=filename)
+    with STATS_LOCK:
+        RUN_STATS["downloaded"] += 1
+        metrics = site_metrics(boxx_site)
+        metrics["files"] += 1
+        metrics["bytes"] += size
+    record_event(boxx_site, "download", item=item, file=filename, bytes=size,
+                 seconds=round(seconds, 3), engine=engine)
+
+
+def record_failure(boxx_site: str, reason: str, message: str) -> None:
+    """
+    Report a failure and remember it for the summary at the end of the run.
+
+    param boxx_site: which boxx site it happened on.
+    param reason: short name for the kind of failure. (Counted by site)
+    param message: what failed.
+    """
+    print_error(f"FAIL: {message}")
+    with STATS_LOCK:
+        RUN_STATS["failed"].append(f"{message} ({reason})")
+        failures = site_metrics(boxx_site)["failures"]
+        failures[reason] = failures.get(reason, 0) + 1
+    record_event(boxx_site, "failure", reason=reason, message=message)
+
+
+class RetryEntry(NamedTuple):
+    """ A failed download to try again.  (See queue_retry()) """
+    site: str
+    item: str
+    url: str
+    filename: str | None
+    reason: str
+    message: str
+
+
+def queue_retry(boxx_site: str, item: str, url: str, filename: str | None, reason: str, message: str) -> None:
+    """
+    Report a failed download (see record_failure()) and queue its item to
+    be downloaded again at the end of the site's part of the plan.
+
+    param boxx_site: which boxx site it happened on.
+    param item: the item the file belongs to.
+    param url: the item's download page.
+    param filename: the file that failed. (None = the whole item)
+    param reason: short name for the kind of failure.
+    param message: what failed.
+    """
+    record_failure(boxx_site, reason, message)
+    with STATS_LOCK:
+        RETRY_QUEUE.append(RetryEntry(boxx_site, item, url, filename, reason, message))
+
+
+def wait_for(browser: webdriver, name: str, condition):
+    """
+    Wait until a condition on the page is met instead of sleeping for a
+    fixed time.  The longest wait is set in the [WAITS] section of the
+    .ini file.  How long each wait really took is recorded so the
+    ceilings can be tuned.
+
+    param browser: object to interact with the browser for us.
+    param name: which wait this is. (The option name in [WAITS])
+    param condition: function given the browser.  The wait is over as
+                    soon as it returns something truthy.
+    return: what the condition returned or None if the ceiling was reached.
+    """
+    ceiling = WAIT_CEILINGS[name]
+    started = time.time()
+    try:
+        with span(name, "wait"):
+            result = WebDriverWait(browser, timeout=ceiling, poll_frequency=WAIT_POLL).until(condition)
+    except TimeoutException:
+        result = None
+
+    # KEEP COUNT, TOTAL AND LONGEST WAIT
+    waited = time.time() - started
+    with STATS_LOCK:
+        count, total, longest, timeouts = RUN_STATS["waits"].get(name, (0, 0.0, 0.0, 0))
+        RUN_STATS["waits"][name] = (count + 1, total + waited, max(longest, waited),
+                                    timeouts + (result is None))
+    if result is None:
+        print(f"            ({name}: gave up after {waited:.2f}s)")
+    else:
+        print(f"            ({name}: waited {waited:.2f}s)")
+
+    return result
+
+
+def get_site_url(boxx_site: str) -> str:
+    """
+    The address of a boxx website's home page (without the trailing /).
+    https is used unless the .ini file gives a full url (such as a local
+    test site).
+    """
+    site_url = CONFIG.get(SECTION_URLS, boxx_site).rstrip("/")
+    return site_url if "://" in site_url else "https://" + site_url
+
+
+@traced
+def open_page(browser: webdriver, url: str) -> None:
+    """
+    Point the browser at a page.  With page-load-strategy eager or none this
+    returns before the page is complete, so wait for what is needed next.
+    (See PAGE_READY_JS)
+
+    param browser: the browser object to interact with the website.
+    param url: the page to open.
+    """
+    browser.execute_script(LEAVE_PAGE_JS)
+    browser.get(url)
+
+
+def login(browser: webdriver, boxx_site: str) -> bool:
     """
     Login the user to the appropriate boxx website.
     NOTE: the username is retrieved from the BOXX_USER environment variable
@@ -48,12 +721,14 @@ def login(browser: webdriver, boxx_site: str) -> None:
 
     param browser: the browser object to interact with the website.
     param boxx_site: the boxx_site to download. (Used to lookup website url)
+    return: True if the site let the user in.
     """
     # SET BROWSER TO THE LOGIN FORM
     print("Begin login ...")
-    url = "https://" + CONFIG.get(SECTION_URLS, boxx_site) + "/Login/"
-    browser.get(url)
-    time.sleep(2)
+    started = time.time()
+    url = get_site_url(boxx_site) + "/Login/"
+    open_page(browser, url)
+    wait_for(browser, "login-form", lambda br: br.find_elements(By.ID, "EmailAddressTextBox"))
 
     # ENTER USER'S E-MAIL INTO THE LOGIN FORM
     try:
@@ -83,128 +758,734 @@ def login(browser: webdriver, boxx_site: str) -> None:
     # SIGN USER INTO THE SITE BY CLICKING THE SIGN-IN BUTTON
     login_btn = browser.find_element(By.ID, "SignInButton")
     login_btn.click()
-    time.sleep(DUR_BETW_PGS)
+
+    # WAIT FOR THE SITE TO SEND THE USER AWAY FROM THE LOGIN PAGE
+    logged_in = wait_for(browser, "login", lambda br: "/login" not in br.current_url.lower()
+                         or br.find_elements(By.LINK_TEXT, "My Downloads")) is not None
     print("Login complete.")
+    record_event(boxx_site, "login", ok=logged_in, seconds=round(time.time() - started, 3))
+    return logged_in
+
+
+def get_session_file(boxx_site: str) -> str:
+    """ Path of the file holding the saved login session for a boxx site. """
+    return os.path.join(STATE_DIR, "sessions", f"{boxx_site}.json")
+
+
+def save_session(browser: webdriver, boxx_site: str) -> None:
+    """
+    Save the browser's cookies (and user agent) for a boxx site so later
+    runs can skip the login form, or skip the browser entirely while
+    reading the site's catalog.  Only the current user can read the file.
+
+    param browser: logged in browser object pointing at the boxx site.
+    param boxx_site: Which boxx website the session is for.
+    """
+    session_filenm = get_session_file(boxx_site)
+    os.makedirs(os.path.dirname(session_filenm), mode=0o700, exist_ok=True)
+    fd = os.open(session_filenm + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as session_file:
+        json.dump(browser_session(browser), session_file)
+    os.replace(session_filenm + ".tmp", session_filenm)
+
+
+def browser_session(browser: webdriver) -> dict:
+    """ The cookies and user agent of the browser's session with the site it is on. """
+    return {"cookies": browser.get_cookies(), "user_agent": browser.execute_script("return navigator.userAgent;")}
+
+
+def load_session(boxx_site: str) -> dict | None:
+    """
+    Read the saved session for a boxx site, leaving out expired cookies.
+
+    param boxx_site: Which boxx website to read the session for.
+    return: the session's cookies and user agent or None if there is no
+                saved session.
+    """
+    try:
+        with open(get_session_file(boxx_site), encoding="utf-8") as session_file:
+            session = json.load(session_file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    # SESSIONS SAVED BY EARLIER VERSIONS ARE JUST THE LIST OF COOKIES.
+    if isinstance(session, list):
+        session = {"cookies": session, "user_agent": None}
 
+    now = time.time()
+    session["cookies"] = [cookie for cookie in session["cookies"] if cookie.get("expiry", now + 1) > now]
+    return session if session["cookies"] else None
 
-def get_item_download_pages(browser: webdriver) -> [(str, str)]:
+
+def session_valid(cookies: [dict], boxx_site: str) -> bool:
+    """
+    Check the saved cookies still work with one plain HTTP request for the
+    site's home page.  A logged in user sees the "My Downloads" link there.
+
+    param cookies: the saved cookies for the site.
+    param boxx_site: Which boxx website the cookies are for.
+    return: True if the site still accepts the session.
+    """
+    headers = {"Cookie": "; ".join(f"{cookie['name']}={cookie['value']}" for cookie in cookies)}
+    try:
+        resp = urllib3.PoolManager(timeout=HTTP_TIMEOUT).request(
+            "GET", get_site_url(boxx_site) + "/", headers=headers, redirect=False)
+    except urllib3.exceptions.HTTPError:
+        return False
+
+    return resp.status == 200 and b"My Downloads" in resp.data
+
+
+def start_session(browser: webdriver, boxx_site: str) -> None:
+    """
+    Get the browser logged in to a boxx site.  A saved session is used when
+    the site still accepts it, otherwise the user is logged in with the
+    login form and the new session is saved.
+
+    param browser: the browser object to interact with the website.
+    param boxx_site: the boxx_site to download. (Used to lookup website url)
+    """
+    session = load_session(boxx_site)
+    if session is not None and session_valid(session["cookies"], boxx_site):
+        print("Reusing saved login session ...")
+
+        # COOKIES CAN ONLY BE SET FOR THE SITE THE BROWSER IS ON.  LOAD
+        # A SMALL PAGE FROM THE SITE FIRST, THEN THE HOME PAGE WITH THE
+        # SESSION IN PLACE.
+        open_page(browser, get_site_url(boxx_site) + "/favicon.ico")
+        wait_for(browser, "login", lambda br: br.execute_script(PAGE_READY_JS))
+        for cookie in session["cookies"]:
+            browser.add_cookie(cookie)
+        open_page(browser, get_site_url(boxx_site) + "/")
+        record_event(boxx_site, "login", ok=True, reused=True)
+        return
+
+    if login(browser, boxx_site):
+        save_session(browser, boxx_site)
+
+
+@traced
+def get_item_download_pages(browser: webdriver, boxx_site: str) -> [(str, str)]:
     """
     Each purchased item has a page that lists each downloadable file. Get
     the list of such pages.  This requires the browser to currently be pointing to
     the "My Downloads" page.
 
     param browser: browser object that interacts with the browser for us.
+    param boxx_site: which boxx site the browser is on.
     return: list of pairs.  Each pair is the url for the file to download and
                 the name of the directory to save the file into.
     """
-    # TRACK DOWNLOADABLE ITEMS IN THESE LISTS
-    download_urls = []
-    item_names = []
-
     # SEND BROWSER TO "MY DOWNLOADS" PAGE.
     print("Following My Downloads link ...")
-    download_lnk = WebDriverWait(browser, timeout=DUR_WAIT_UTL).until(
-        lambda br: br.find_element(By.LINK_TEXT, "My Downloads")
-    )
+    started = time.time()
+    download_lnks = wait_for(browser, "my-downloads-link",
+                             lambda br: br.find_elements(By.LINK_TEXT, "My Downloads"))
+    if download_lnks is None:
+        record_failure(boxx_site, "catalog", f"{boxx_site.upper()} no My Downloads link found at {browser.current_url}")
+        return []
+
+    download_lnks[0].click()
+    wait_for(browser, "my-downloads", lambda br: br.execute_script(PAGE_READY_JS)
+             and br.find_elements(By.CLASS_NAME, "contentsToDisplay"))
+
+    # READ THE WHOLE PAGE IN ONE TRIP TO THE BROWSER.
+    print("    Reading purchased items available for download.")
+    page = browser.execute_script(MY_DOWNLOADS_JS)
+    item_pgs = item_pages_from(page["links"], page["items"])
+    record_event(boxx_site, "catalog", items=len(item_pgs), seconds=round(time.time() - started, 3))
+    return item_pgs
 
-    download_lnk.click()
-    time.sleep(DUR_BETW_PGS)
+
+def item_pages_from(links: [str], cards: [dict]) -> [(str, str)]:
+    """
+    Turn what was read from the "My Downloads" page into the list of item
+    download pages.
+
+    param links: the (absolute) href of every link on the page.
+    param cards: the volume and title of each purchased item.
+    return: list of pairs.  Each pair is the url for the file to download and
+                the name of the directory to save the file into.
+    """
+    # TRACK DOWNLOADABLE ITEMS IN THESE LISTS
+    download_urls = []
+    item_names = []
 
     # EACH PURCHASED ITEM HAS A DOWNLOAD PAGE TO ALLOW DOWNLOAD
     # THE FILES ASSOCIATED WITH THE PURCHASE.
     #
     # GET THE URLS FOR EACH OF THOSE PAGES
-    print("    Reading purchased items available for download.")
-    elems = browser.find_elements(By.TAG_NAME, "a")
-    for elem in elems:
-        href = elem.get_attribute('href')
-        if href is not None:
-            if "|" in href:
-                new_href = href.replace("boxx.com/0~", "boxx.com/Downloads?path=0~")
-                download_urls.append(new_href)
+    for href in links:
+        if "|" in href:
+            new_href = href.replace("/0~", "/Downloads?path=0~", 1)
+            download_urls.append(new_href)
 
     # GET THE NAME OF EACH PURCHASED ITEM
-    elems = browser.find_elements(By.CLASS_NAME, "contentsToDisplay")
-    for elem in elems:
-        volume = int(elem.find_element(By.CLASS_NAME, "ContentExtraInfoSuperTitle").text
-                         .replace("VOLUME ", "")
-                         .replace(":", "")
+    for card in cards:
+        volume = int(card["volume"]
+                     .replace("VOLUME ", "")
+                     .replace(":", "")
                      )
-        item = elem.find_element(By.CLASS_NAME, "TitleText").text.lower().replace(" ", "-")
+        item = card["title"].lower().replace(" ", "-")
         item_names.append(f"{volume:03d}-{item}")
 
     # RETURN A LIST OF PAIRS (URL AND ITEM NAME)
     #   ONE FOR EACH DOWNLOAD PAGE FOUND.
-    return zip(download_urls, item_names)
+    return list(zip(download_urls, item_names))
+
+
+class HtmlElement:
+    """ An element of a page read over HTTP.  (See parse_html()) """
+
+    def __init__(self, tag: str, attrs: dict, parent: "HtmlElement | None" = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children = []
+
+    def iter(self):
+        """ This element and every element inside it, in page order. """
+        yield self
+        for child in self.children:
+            if isinstance(child, HtmlElement):
+                yield from child.iter()
+
+    def by_class(self, class_name: str) -> list["HtmlElement"]:
+        """ The elements inside this one (or this one) with a CSS class. """
+        return [elem for elem in self.iter() if class_name in elem.attrs.get("class", "").split()]
+
+    def text(self) -> str:
+        """ The element's text with runs of white space collapsed. (Like innerText) """
+        parts = []
+        for child in self.children:
+            parts.append(child.text() if isinstance(child, HtmlElement) else child)
+        return " ".join("".join(parts).split())
+
+    def text_of(self, class_name: str) -> str:
+        """ Text of the first element inside this one with a CSS class.  (Like textOf() in the JS) """
+        found = self.by_class(class_name)
+        return found[0].text() if found else ""
+
+
+class HtmlTreeBuilder(HTMLParser):
+    """ Builds a tree of HtmlElements from a page, forgiving unclosed tags. """
+    VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+                 "source", "track", "wbr"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = HtmlElement("#document", {})
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        elem = HtmlElement(tag, {name: value or "" for name, value in attrs}, self.current)
+        self.current.children.append(elem)
+        if tag not in self.VOID_TAGS:
+            self.current = elem
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(HtmlElement(tag, {name: value or "" for name, value in attrs}, self.current))
+
+    def handle_endtag(self, tag):
+        # CLOSE EVERYTHING LEFT OPEN INSIDE THE ELEMENT BEING CLOSED
+        elem = self.current
+        while elem is not self.root and elem.tag != tag:
+            elem = elem.parent
+        if elem is not self.root:
+            self.current = elem.parent
+
+    def handle_data(self, data):
+        if self.current.tag not in ("script", "style"):
+            self.current.children.append(data)
+
+
+def parse_html(page: str) -> HtmlElement:
+    """ Parse a page read over HTTP into a tree of HtmlElements. """
+    builder = HtmlTreeBuilder()
+    builder.feed(page)
+    builder.close()
+    return builder.root
+
+
+def find_download_url(elem: HtmlElement, page_url: str) -> str | None:
+    """
+    Find the url behind a download element without clicking it.  (The same
+    search as findDownloadUrl() in FIND_DOWNLOAD_URL_JS)
 
+    param elem: the download element.
+    param page_url: url of the page, for relative links.
+    return: the absolute url or None if it can't be found.
+    """
+    def usable(href: str | None) -> bool:
+        return bool(href) and not href.startswith("javascript:") and not href.endswith("#")
+
+    link = elem
+    while link is not None and not (link.tag == "a" and "href" in link.attrs):
+        link = link.parent
+    if link is None:
+        link = next((node for node in elem.iter() if node.tag == "a" and "href" in node.attrs), None)
+    if link is not None and usable(link.attrs["href"]):
+        return urljoin(page_url, link.attrs["href"])
+
+    for node in elem.iter():
+        for attr in ("data-url", "data-href", "data-download", "download-url"):
+            if usable(node.attrs.get(attr)):
+                return urljoin(page_url, node.attrs[attr])
+        match = re.search(r"""['"]([^'"]*[Dd]ownload[^'"]*)['"]""", node.attrs.get("onclick", ""))
+        if match and usable(match.group(1)):
+            return urljoin(page_url, match.group(1))
+    return None
 
-def element_found(browser: webdriver, class_name: str) -> [WebElement]:
+
+@traced
+def fetch_page(http: urllib3.PoolManager, url: str) -> tuple[str, HtmlElement] | None:
     """
-    Look for a specific class of element on the current page of the browser.
-    If none is found, intercept the exception and return None
+    Read a page of a boxx site over HTTP with the saved login session.
 
-    param browser: object to interact with the browser for us.
-    param class_name: Class name of objects to search for.
-    return: A list of the elements of the given class or None if none
-                are found.
+    param http: connection pool holding the user's login session.
+    param url: the page to read.
+    return: the url the page ended up at and the parsed page, or None if
+                it could not be read (or the site asked for a login).
+    """
+    try:
+        resp = http.request("GET", url)
+    except urllib3.exceptions.HTTPError as err:
+        print(f"            - Could not read {url} ({err})")
+        return None
+
+    final_url = resp.geturl() or url
+    if resp.status != 200 or "/login" in urlparse(final_url).path.lower():
+        return None
+
+    return final_url, parse_html(resp.data.decode("utf-8", errors="replace"))
+
+
+def read_catalog_over_http(http: urllib3.PoolManager, boxx_site: str) -> list[(str, str)] | None:
+    """
+    Read a boxx site's "My Downloads" page without the browser.  The page
+    is found by following the "My Downloads" link on the home page, the
+    same as in the browser.
+
+    param http: connection pool holding the user's login session.
+    param boxx_site: which boxx site to read.
+    return: list of pairs like get_item_download_pages() or None if the
+                page can't be read this way. (The browser is used instead)
+    """
+    print("Reading My Downloads over HTTP ...")
+    started = time.time()
+
+    # ONCE THE PAGE HAS BEEN FOUND IT IS READ STRAIGHT AWAY.
+    page = fetch_page(http, MY_DOWNLOADS_URLS[boxx_site]) if boxx_site in MY_DOWNLOADS_URLS else None
+    if page is None:
+        home = fetch_page(http, get_site_url(boxx_site) + "/")
+        if home is None:
+            return None
+
+        home_url, home_page = home
+        link = next((elem for elem in home_page.iter()
+                     if elem.tag == "a" and elem.text() == "My Downloads" and "href" in elem.attrs), None)
+        if link is None:
+            return None
+
+        page = fetch_page(http, urljoin(home_url, link.attrs["href"]))
+        if page is None:
+            return None
+
+    # NO ITEMS MEANS THE PAGE IS BUILT BY JAVASCRIPT.  LEAVE IT TO THE BROWSER.
+    page_url, root = page
+    cards = [{"volume": card.text_of("ContentExtraInfoSuperTitle"), "title": card.text_of("TitleText")}
+             for card in root.by_class("contentsToDisplay")]
+    if not cards:
+        return None
+
+    links = [urljoin(page_url, elem.attrs["href"]) for elem in root.iter()
+             if elem.tag == "a" and elem.attrs.get("href")]
+    item_pgs = item_pages_from(links, cards)
+    MY_DOWNLOADS_URLS[boxx_site] = page_url
+    record_event(boxx_site, "catalog", items=len(item_pgs), seconds=round(time.time() - started, 3), engine="http")
+    return item_pgs
+
+
+def read_item_page_over_http(http: urllib3.PoolManager, url: str) -> list[dict] | None:
+    """
+    Read an item's download page without the browser.
+
+    param http: connection pool holding the user's login session.
+    param url: url of the item's download page.
+    return: the title, content name and duration of each item member (like
+                ITEM_PAGE_JS) along with the variants found on the page
+                without clicking (often none), or None if the page can't
+                be read.
+    """
+    page = fetch_page(http, url)
+    if page is None:
+        return None
+
+    page_url, root = page
+    return [{
+        "title": block.text_of("TitleText"),
+        "content_name": block.text_of("Contentname"),
+        "duration": block.text_of("Duration"),
+        "variants": [{"description": wrapper.text_of("ContentInfo"), "url": find_download_url(wrapper, page_url)}
+                     for wrapper in block.by_class("DescriptionWrapper")],
+    } for block in root.by_class("DownloadPageText")]
+
+
+def member_name_parts(member: dict) -> (str, str, str):
+    """ The title, content name and duration of an item member as used in file names. """
+    ttl = member["title"].lower().replace(" ", "-")
+    cnt_name = member["content_name"].lower().replace(" ", "")
+    dur = member["duration"].lower().replace(" : ", "")
+    return ttl, cnt_name, dur
+
+
+def member_filename(ttl: str, cnt_name: str, dur: str, descr: str = "") -> str:
+    """ Name (without extension) of an item member's file.  (descr is '' for single files) """
+    return f"{ttl}-{cnt_name}-{dur}-{descr}" if descr else f"{ttl}-{cnt_name}-{dur}"
+
+
+class FileRule(NamedTuple):
+    """
+    One --include, --exclude or --query rule.  Names (item, title, name,
+    variant, site, codec) are matched against a glob pattern, numbers
+    (volume, duration in seconds, width, height) against the range low to
+    high.
+    """
+    field: str
+    pattern: str
+    low: float
+    high: float
+
+
+class FileSelector(NamedTuple):
+    """ The files wanted: those matching the include rules and none of the exclude rules. """
+    include: [FileRule]
+    exclude: [FileRule]
+
+
+def duration_seconds(text: str) -> int | None:
     """
+    Seconds in a duration, either as written in a rule ("90" or "1:30") or
+    as used in file names ("0130", the digits of "01 : 30").
+    """
+    if ":" in text:
+        parts = text.split(":")
+    elif len(text) > 2 and text.isdigit():
+        parts = [text[max(0, end - 2):end] for end in range(len(text) % 2 or 2, len(text) + 1, 2)]
+    else:
+        parts = [text]
+
     try:
-        return browser.find_elements(By.CLASS_NAME, class_name)
-    except NoSuchElementException:
+        return sum(int(part.strip()) * 60 ** power for power, part in enumerate(reversed(parts)))
+    except ValueError:
+        return None
+
+
+def parse_rule(text: str, fields: tuple = FILTER_FIELDS) -> FileRule:
+    """
+    Read a file selection rule, written as field:pattern.
+        item:*night*     title:*sunset*     name:mc001*     variant:4k-prores
+        volume:3-10      volume:>=12        duration:<=5    duration:0:05-0:30
+
+    param text: the rule.
+    param fields: the fields rules may use.  (--query also has site, codec,
+                    width and height)
+    return: the rule, ready for selected().
+    """
+    field, colon, pattern = text.partition(":")
+    field, pattern = field.strip().lower(), pattern.strip()
+    if not colon or field not in fields or not pattern:
+        raise ValueError(f"not a filter rule: {text}  (use field:pattern with a field of {', '.join(fields)})")
+
+    if field not in NUMBER_FIELDS:
+        return FileRule(field, pattern.lower().replace(" ", "-"), 0, 0)
+
+    # NUMBERS ARE COMPARED (<=5, >10, ...) OR MATCHED TO A RANGE (3-10)
+    number = duration_seconds if field == "duration" else lambda value: int(value) if value.isdigit() else None
+    for operator in ("<=", ">=", "<", ">", "="):
+        if pattern.startswith(operator):
+            value = number(pattern[len(operator):].strip())
+            if value is None:
+                break
+            low, high = {"<=": (0, value), ">=": (value, math.inf), "<": (0, math.nextafter(value, 0)),
+                         ">": (math.nextafter(value, math.inf), math.inf), "=": (value, value)}[operator]
+            return FileRule(field, pattern, low, high)
+    else:
+        low, _, high = pattern.partition("-")
+        low, high = number(low.strip()), number((high or low).strip())
+        if low is not None and high is not None:
+            return FileRule(field, pattern, low, high)
+    raise ValueError(f"not a number or range: {text}")
+
+
+def selected(selector: FileSelector, **fields) -> bool:
+    """
+    Does the selector want a file?  Only the rules for the given fields are
+    checked, so items can be left out before their page is read and item
+    members before they are clicked.  Rules for the same field are
+    alternatives; rules for different fields must all match.
+
+    param selector: the include and exclude rules.
+    param fields: what is known about the file: item, volume, title, name,
+                    duration (seconds) and variant.  (Single files have no
+                    variant, so variant rules don't apply to them)
+    return: True if the file should be downloaded.
+    """
+    def matches(rule: FileRule) -> bool:
+        value = fields[rule.field]
+        if rule.field in NUMBER_FIELDS:
+            return value is not None and rule.low <= value <= rule.high
+        return fnmatch.fnmatchcase(value.lower(), rule.pattern)
+
+    if any(matches(rule) for rule in selector.exclude if rule.field in fields):
+        return False
+
+    included = {}
+    for rule in selector.include:
+        if rule.field in fields:
+            included[rule.field] = included.get(rule.field, False) or matches(rule)
+    return all(included.values())
+
+
+def member_fields(ttl: str, cnt_name: str, dur: str) -> dict:
+    """ What selected() can check about an item member.  (See member_name_parts()) """
+    return {"title": ttl, "name": cnt_name, "duration": duration_seconds(dur)}
+
+
+def list_item_files_over_http(http: urllib3.PoolManager, url: str, boxx_site: str,
+                              item_name: str, selector: FileSelector) -> list[tuple] | None:
+    """
+    Work out an item's files from its download page read over HTTP, and
+    record them like download_item_files() does.  The variants of an item
+    member usually only show up once it is clicked, so the ones cached
+    from an earlier visit with the browser are used when the member is
+    unchanged.  Item members the selector doesn't want don't need their
+    variants known.
+
+    param http: connection pool holding the user's login session.
+    param url: url of the item's download page.
+    param boxx_site: which boxx site the item is from.
+    param item_name: the item's name.
+    param selector: the files wanted.
+    return: (position, title, content name, duration, variant, url) of each
+                file on the page ('' variant for single files, None url when
+                it isn't on the page), or None if the browser is needed to
+                list them.
+    """
+    started = time.time()
+    with timed("item-pages", boxx_site):
+        members = read_item_page_over_http(http, url)
+    if not members:
         return None
 
+    # EVERY MEMBER'S FILES MUST BE KNOWN BEFORE THE ITEM CAN BE LISTED.
+    cached = load_catalog_entries(boxx_site, item_name)
+    entries = []
+    unlisted = False
+    for position, member in enumerate(members):
+        ttl, cnt_name, dur = member_name_parts(member)
+        if member["variants"]:
+            variants = [(variant["description"].lower().replace(" ", "-"), variant["url"])
+                        for variant in member["variants"]]
+        elif (position, ttl, cnt_name, dur) in cached:
+            variants = [(descr, None) for descr in cached[(position, ttl, cnt_name, dur)]]
+        elif not selected(selector, item=item_name, **member_fields(ttl, cnt_name, dur)):
+            unlisted = True
+            continue
+        else:
+            return None
+        entries.extend((position, ttl, cnt_name, dur, descr, dl_url) for descr, dl_url in variants)
+    record_event(boxx_site, "item-page", item=item_name, members=len(members),
+                 seconds=round(time.time() - started, 3), engine="http")
+
+    with open_manifest() as manifest:
+        forget_item_listing(manifest, boxx_site, item_name)
+    for position, ttl, cnt_name, dur, descr, _ in entries:
+        record_listed_file(boxx_site, item_name, member_filename(ttl, cnt_name, dur, descr))
+        record_catalog_entry(boxx_site, item_name, position, ttl, cnt_name, dur, descr)
+    if not unlisted:
+        record_item_listed(boxx_site, item_name)
+    return entries
+
+
+@traced
+def crawl_item_page(http: urllib3.PoolManager, url: str, boxx_site: str,
+                    item_name: str, selector: FileSelector) -> list[tuple] | None:
+    """
+    list_item_files_over_http() for one of the threads reading item pages
+    at the same time.  (See plan_site())  The thread's manifest connection
+    is closed afterwards.
+    """
+    try:
+        return list_item_files_over_http(http, url, boxx_site, item_name, selector)
+    finally:
+        close_manifest()
+
 
-def download_page_found(browser: webdriver) -> [WebElement]:
-    """ Search for DownloadPageText class objects """
-    return element_found(browser, "DownloadPageText")
+class DownloadEvent(NamedTuple):
+    """ A finished download found in the browser's download directory. """
+    filename: str
+    size: int
+    elapsed: float
 
 
-def wait_for_download_to_complete() -> int:
+def inotify_watch(dir_name: str) -> int | None:
     """
-    Ensure the download is complete.  This is done by checking for
-    a file with the extension of .part.  If a .part file exists, then
-    the download is not complete.
+    Ask the kernel to report changes to a directory.
 
-    In that case log the info, wait and check again and again ...
+    param dir_name: the directory to watch.
+    return: the inotify file descriptor to read events from or None if
+                inotify is not available (the caller should poll instead).
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        inotify_fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+
+    if inotify_fd < 0:
+        return None
+
+    if libc.inotify_add_watch(inotify_fd, os.fsencode(dir_name), IN_WATCH_MASK) < 0:
+        os.close(inotify_fd)
+        return None
 
-    return: The number of files in the download directory once
-                the download is complete.
+    return inotify_fd
+
+
+class DownloadWatcher:
+    """
+    Watch the browser's download directory until a download finishes.
+
+    Firefox creates an empty placeholder with the file's name plus a .part
+    file, writes into the .part file and renames it over the placeholder
+    when the download is complete.  A file is finished once it has no .part
+    file next to it and it has been closed (inotify) or its size stops
+    changing (polling fallback).
     """
-    # VARIABLE SETUP
-    complete = False
-    dl_dir = CONFIG.get(SECTION_DIRS, "download-dir")
 
-    # LOOP UNTIL DOWNLOAD IS COMPLETE
-    while not complete:
-        complete = True
-        files = os.listdir(dl_dir)
+    def __init__(self, dl_dir: str, started: float | None = None):
+        """
+        param dl_dir: the directory the browser downloads into.
+        param started: when the download was started. (Default: now)
+        """
+        self.dl_dir = dl_dir
+        self.started = started or time.time()
+        self.closed = set()
+        self.first_seen = {}
+        self.inotify_fd = inotify_watch(dl_dir)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """ Stop watching the download directory. """
+        if self.inotify_fd is not None:
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
+
+    def read_events(self) -> None:
+        """
+        Remember which files have been closed or renamed into place since
+        the last call.  (Only called once inotify has something to read)
+        """
+        # FILES CLOSED OR RENAMED INTO PLACE ARE DONE BEING WRITTEN.
+        buf = os.read(self.inotify_fd, 64 * 1024)
+        pos = 0
+        while pos < len(buf):
+            _, mask, _, name_len = IN_EVENT_HEADER.unpack_from(buf, pos)
+            pos += IN_EVENT_HEADER.size
+            name = os.fsdecode(buf[pos:pos + name_len].rstrip(b"\0"))
+            pos += name_len
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self.closed.add(name)
+            elif mask & (IN_CREATE | IN_MODIFY):
+                self.closed.discard(name)
+
+    def check(self) -> DownloadEvent | None:
+        """
+        Look through the download directory for a finished download.
+        return: the finished download or None if there isn't one (yet).
+        """
+        files = list_download_files(self.dl_dir)
         for filenm in files:
-            if ".part" in filenm:
-                print(f"            *** Waiting for download: {filenm} ***")
-                time.sleep(DUR_WAIT_UTL)
-                complete = False
+            self.first_seen.setdefault(filenm, time.time())
+            if filenm.endswith(".part") or f"{filenm}.part" in files:
+                continue
+
+            full_pth = os.path.join(self.dl_dir, filenm)
+            try:
+                size = os.path.getsize(full_pth)
+                # NOT CLOSED (OR NO INOTIFY)?  MAKE SURE NOTHING IS STILL WRITING.
+                if filenm not in self.closed:
+                    with span("stable-size-sleep", "wait"):
+                        time.sleep(DUR_DL_STABLE)
+                    if os.path.getsize(full_pth) != size:
+                        continue
+
+            except FileNotFoundError:
+                continue
+
+            # THE EMPTY PLACEHOLDER MAY SHOW UP BEFORE ITS .PART FILE DOES.
+            if size > 0:
+                return DownloadEvent(filenm, size, time.time() - self.started)
+
+        return None
+
+
+@traced
+def wait_for_any_download(watchers: [DownloadWatcher], timeout: float) -> (DownloadWatcher, DownloadEvent | None):
+    """
+    Block until one of several downloads, each in its own directory, is
+    complete.  Without inotify the directories are polled.
+
+    param watchers: a watcher for each download in flight.
+    param timeout: longest time (in seconds) each download may take, counted
+                    from when it was started.
+    return: the watcher whose download finished, and the finished download
+                (None when the download took too long).
+    """
+    while True:
+        for watcher in watchers:
+            event = watcher.check()
+            if event is not None:
+                return watcher, event
+        for watcher in watchers:
+            if time.time() >= watcher.started + timeout:
+                return watcher, None
+
+        # SLEEP UNTIL SOMETHING CHANGES IN ONE OF THE DIRECTORIES.
+        give_up = min(watcher.started for watcher in watchers) + timeout
+        inotify_fds = [watcher.inotify_fd for watcher in watchers if watcher.inotify_fd is not None]
+        ready, _, _ = select.select(inotify_fds, [], [], max(min(DUR_DL_POLL, give_up - time.time()), 0))
+        for watcher in watchers:
+            if watcher.inotify_fd in ready:
+                watcher.read_events()
 
-    # RETURN THE NUMBER OF FILES IN THE DOWNLOAD DIR
-    #   AFTER THE DOWNLOAD IS COMPLETE.  (1 IS GOOD,
-    #   0 MEANS NOTHING WAS DOWNLOADED, AND 2+ MEANS
-    #   WE HAVE AN EXTRA FILE WE SHOULD NOT HAVE).
-    return len(os.listdir(dl_dir))
+
+def list_download_files(dl_dir: str) -> [str]:
+    """ Names of the files (not directories) in the download directory. """
+    return [entry.name for entry in os.scandir(dl_dir) if entry.is_file()]
 
 
 def clean_download_dir() -> None:
     """ Remove all .part files from the download directory before """
     try:
         # FIND DOWNLOAD TO DIRECTORY FROM CONFIG SETTINGS
-        dl_dir = CONFIG.get(SECTION_DIRS, "download-dir")
+        dl_dir = DOWNLOAD_DIR
         print("Empty the download directory. (", dl_dir, ")")
 
-        # FIND ALL FILES IN THE DOWNLOAD DIRECTORY AND DELETE THEM.
-        dir_counts = os.listdir(dl_dir)
-        for pth in dir_counts:
-            full_pth = os.path.join(dl_dir, pth)
-            if os.path.isfile(full_pth):
-                print("    -- deleting", pth, "from", dl_dir)
-                os.remove(full_pth)
+        # FIND ALL FILES IN THE DOWNLOAD DIRECTORY (AND THE DIRECTORIES
+        # OF THE DOWNLOADS IN FLIGHT, SEE BrowserDownloads) AND DELETE THEM.
+        for pth_dir in [dl_dir] + glob.glob(os.path.join(glob.escape(dl_dir), ".inflight", "*")):
+            for pth in os.listdir(pth_dir):
+                full_pth = os.path.join(pth_dir, pth)
+                if os.path.isfile(full_pth):
+                    print("    -- deleting", pth, "from", pth_dir)
+                    os.remove(full_pth)
         print("Download directory is now empty.")
 
     except FileNotFoundError:
@@ -212,57 +1493,698 @@ def clean_download_dir() -> None:
         pass
 
 
-def process_download(save_to: str, boxx_site: str, save_filename: str) -> None:
+def quarantine_download_files(boxx_site: str, item: str, filename: str, dl_dir: str) -> str | None:
+    """
+    Move whatever a failed download left in its download directory out of
+    the way, so the next download finds the directory empty.
+
+    param boxx_site: which boxx site the download was from.
+    param item: the item the file belongs to.
+    param filename: the file that failed.
+    param dl_dir: the directory the browser downloaded it into.
+    return: the directory the files were moved to. (None = nothing was left)
+    """
+    leftovers = list_download_files(dl_dir)
+    if not leftovers:
+        return None
+
+    quarantine_dir = os.path.join(DOWNLOAD_DIR, ".quarantine",
+                                  f"{time.strftime('%Y%m%d-%H%M%S')}-{boxx_site}-{clean(item)}-{clean(filename)}")
+    Path(quarantine_dir).mkdir(parents=True, exist_ok=True)
+    for leftover in leftovers:
+        try:
+            os.rename(os.path.join(dl_dir, leftover), os.path.join(quarantine_dir, leftover))
+        except FileNotFoundError:
+            # FIREFOX RENAMED OR REMOVED IT IN THE MEANTIME.
+            pass
+    print(f"            - Moved {len(leftovers)} leftover files to {quarantine_dir}")
+    return quarantine_dir
+
+
+def discard_download(boxx_site: str, dl_dir: str, started: float) -> None:
+    """
+    Throw away a download the browser started that isn't wanted (its file
+    is already there), and give back its download slot.
+
+    param boxx_site: which boxx site the download is from.
+    param dl_dir: the directory the browser downloads it into.
+    param started: the slot claimed for it. (See wait_for_download_slot())
+    """
+    # LET THE DOWNLOAD FINISH, SO FIREFOX DOESN'T RECREATE THE FILE
+    # AFTER IT IS DELETED.
+    with DownloadWatcher(dl_dir, started) as watcher:
+        wait_for_any_download([watcher], DUR_DL_TIMEOUT)
+    for filenm in list_download_files(dl_dir):
+        try:
+            os.remove(os.path.join(dl_dir, filenm))
+        except FileNotFoundError:
+            pass
+    release_download_slot(boxx_site, started)
+
+
+def get_rate_limit_file(boxx_site: str) -> str:
+    """ Path of the file holding the recent download times for a boxx site. """
+    return os.path.join(STATE_DIR, "rate-limit", f"{boxx_site}.json")
+
+
+def load_download_history(boxx_site: str) -> [float]:
+    """
+    Read the start times of the downloads from a boxx site that are still
+    inside the rate limit window.  The times are kept on disk so back to
+    back runs share the same window.
+
+    param boxx_site: Which boxx website to read the history for.
+    return: download start times (oldest first) within the current window.
+    """
+    try:
+        with open(get_rate_limit_file(boxx_site), encoding="utf-8") as hist_file:
+            history = json.load(hist_file)
+
+    except (FileNotFoundError, ValueError):
+        history = []
+
+    cutoff = time.time() - RATE_LIMIT_WINDOW
+    return sorted(started for started in history if started > cutoff)
+
+
+def save_download_history(boxx_site: str, history: [float]) -> None:
+    """ Write the download start times for a boxx site to disk. """
+    hist_filenm = get_rate_limit_file(boxx_site)
+    Path(hist_filenm).parent.mkdir(parents=True, exist_ok=True)
+    with open(hist_filenm + ".tmp", "w", encoding="utf-8") as hist_file:
+        json.dump(history, hist_file)
+    os.replace(hist_filenm + ".tmp", hist_filenm)
+
+
+def wait_for_download_slot(boxx_site: str) -> float:
+    """
+    BUSYBOXX LIMITS DOWNLOADS TO AVOID OVERTAXING THEIR SERVERS.
+    WAIT UNTIL ANOTHER DOWNLOAD FITS THEIR GUIDELINES (CURRENTLY NO MORE
+    THAN 5 DOWNLOADS IN 5 MINUTES) AND CLAIM THE SLOT.
+
+    param boxx_site: Which boxx website the download is from.
+    return: the time the slot was claimed. (Used to release it again.)
+    """
+    history = load_download_history(boxx_site)
+
+    # THE WINDOW IS FULL.  WAIT FOR THE OLDEST DOWNLOAD THAT COUNTS
+    # AGAINST THE LIMIT TO FALL OUT OF IT.
+    if len(history) >= RATE_LIMIT_COUNT:
+        wait = history[-RATE_LIMIT_COUNT] + RATE_LIMIT_WINDOW - time.time()
+        if wait > 0:
+            print(f"            - Waiting {wait:.0f}s for the {boxx_site} download limit.")
+            with timed("rate-limit-sleep", boxx_site):
+                time.sleep(wait)
+            record_event(boxx_site, "rate-limit-sleep", seconds=round(wait, 3))
+
+    return claim_download_slot(boxx_site)
+
+
+def claim_download_slot(boxx_site: str) -> float:
+    """
+    Count a download against the site's limit without waiting.  (For a
+    download the site started without being asked, see
+    download_item_files())
+
+    param boxx_site: Which boxx website the download is from.
+    return: the time the slot was claimed. (Used to release it again.)
+    """
+    started = time.time()
+    history = load_download_history(boxx_site)
+    history.append(started)
+    save_download_history(boxx_site, history)
+    return started
+
+
+def release_download_slot(boxx_site: str, started: float) -> None:
+    """
+    Give back a slot claimed by wait_for_download_slot() when no download
+    happened after all.
+
+    param boxx_site: Which boxx website the slot was claimed for.
+    param started: the time returned by wait_for_download_slot()
+    """
+    history = load_download_history(boxx_site)
+    if started in history:
+        history.remove(started)
+        save_download_history(boxx_site, history)
+
+
+@traced
+def process_download(dl_dir: str, event: DownloadEvent | None, save_to: str, boxx_site: str,
+                     save_filename: str, url: str) -> None:
     """
-    Wait for the download to complete, then move the newly downloaded file to
-    the destination directory
+    Move a finished download to the destination directory.  (See
+    BrowserDownloads, which waits for it)
 
+    param dl_dir: the directory the browser downloaded the file into.
+    param event: the finished download. (None = it took too long)
     param save_to: The name of the individual item from the boxx site.
     param boxx_site: Which boxx website is the download from.
     param save_filename: Name to give the file once it is moved.
+    param url: the item's download page. (To try again if the download fails)
     """
-    # BUSYBOXX LIMITS DOWNLOADS TO AVOID OVERTAXING THEIR SERVERS.
-    # WAIT LONG ENOUGH TO MEET THERE GUIDELINES (CURRENTLY NO MORE
-    # THAN 5 DOWNLOADS IN 5 MINUTES).  THIS ALSO GIVES THE FILE ENOUGH
-    # TIME TO DOWNLOAD.
-    time.sleep(DUR_BETW_DLS)
-
-    # WAIT FOR DOWNLOAD
-    dl_cnt = wait_for_download_to_complete()
+    # RETURN THE NUMBER OF FILES IN THE DOWNLOAD DIR
+    #   AFTER THE DOWNLOAD IS COMPLETE.  (1 IS GOOD,
+    #   0 MEANS NOTHING WAS DOWNLOADED, AND 2+ MEANS
+    #   WE HAVE AN EXTRA FILE WE SHOULD NOT HAVE).
+    dl_cnt = len(list_download_files(dl_dir)) if event is not None else 0
 
     # CHECK THE NUMBER OF DOWNLOAD FILES. IF IT IS NOT 1, WE HAVE
-    # AN ERROR.  CURRENTLY, WE HALT DOWNLOADS AND EXIT PROGRAM.
-    # ALTERNATE POSSIBILITY WOULD BE TO LOG THE PROBLEM AND CONTINUE
-    # ON TO THE NEXT FILE.
+    # AN ERROR.  MOVE WHATEVER WAS DOWNLOADED OUT OF THE WAY SO THE
+    # NEXT DOWNLOAD CAN BE COUNTED, AND TRY THIS ONE AGAIN AT THE END
+    # OF THE PLAN.
     if dl_cnt != 1:
         print(f"        DOWNLOADING ERROR. {dl_cnt} FILES FOUND (1 expected)")
-        print_error(f"FAIL: {boxx_site.upper()} {save_to} {save_filename}")
-
-        # Maybe: track files that could not be downloaded to inform
-        #   the user of later and CONTINUE to next file.
-        # browser.quit()
-        # sys.exit(1)
+        reason = "timeout" if event is None else "no-files" if dl_cnt == 0 else "extra-files"
+        quarantine_dir = quarantine_download_files(boxx_site, save_to, save_filename, dl_dir)
+        queue_retry(boxx_site, save_to, url, save_filename, reason,
+                    f"{boxx_site.upper()} {save_to} {save_filename}"
+                    + (f" (left over files in {quarantine_dir})" if quarantine_dir else ""))
 
     # DOWNLOAD APPEARS TO BE SUCCESSFUL. MOVE THE DOWNLOAD INTO
     # THE PERMANENT STORAGE LOCATION WHICH WILL LEAVE THE DOWNLOAD
     # DIRECTORY EMPTY AGAIN.
     else:
+        print(f"            - Downloaded {event.filename} ({event.size} bytes in {event.elapsed:.1f}s)")
         print("            - Moving download to "
-              + f"{build_save_location(boxx_site, save_to, save_filename)}"
+              + f"{build_save_location(boxx_site, save_to, save_filename, event.filename)}"
               )
-        rename_and_move_dl_file(save_to, boxx_site, save_filename)
+        rename_and_move_dl_file(save_to, boxx_site, save_filename, event.filename, dl_dir)
+        record_download(boxx_site, save_to, save_filename, event.size, event.elapsed, "browser")
+
+
+class BrowserDownloads:
+    """
+    The browser downloads in flight for one item page, up to
+    browser-downloads at a time.  Before each click the browser is pointed
+    at a download directory of its own (a subdirectory of .inflight), so
+    every file is matched to the click that started it and is moved as
+    soon as it finishes.  When the browser won't let its download directory
+    be changed, the downloads go into the download directory one at a time.
+    """
+
+    def __init__(self, browser: webdriver, boxx_site: str, url: str):
+        """
+        param browser: object to interact with the browser for us.
+        param boxx_site: which boxx site the downloads are from.
+        param url: the item's download page. (To try again if a download fails)
+        """
+        self.browser = browser
+        self.boxx_site = boxx_site
+        self.url = url
+        self.slots = BROWSER_DOWNLOADS
+        self.in_flight = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        # AN ERROR LEAVES THE DOWNLOADS BEHIND.  (clean_download_dir()
+        # CLEARS THEM OUT ON THE NEXT RUN)
+        if exc_type is None:
+            self.finish_all()
+        for watcher, _, _ in self.in_flight.values():
+            watcher.close()
+
+    def next_dir(self) -> str:
+        """
+        Make room for one more download (waiting for one in flight to
+        finish when needed) and point the browser's downloads at a free
+        directory.  Call it before the click that may start a download.
+
+        return: the directory the next download goes into.
+        """
+        while len(self.in_flight) >= self.slots:
+            self.finish_one()
+        if self.slots == 1:
+            return DOWNLOAD_DIR
+
+        dl_dir = next(dl_dir for dl_dir in (os.path.join(DOWNLOAD_DIR, ".inflight", str(slot))
+                                            for slot in range(self.slots))
+                      if dl_dir not in self.in_flight)
+        Path(dl_dir).mkdir(parents=True, exist_ok=True)
+        try:
+            with self.browser.context(self.browser.CONTEXT_CHROME):
+                self.browser.execute_script(SET_DOWNLOAD_DIR_JS, os.path.abspath(dl_dir))
+        except WebDriverException as err:
+            print_error(f"Can't change the browser's download directory ({err.msg}), "
+                        "downloading one file at a time.")
+            self.slots = 1
+            self.finish_all()
+            return DOWNLOAD_DIR
+        return dl_dir
+
+    def add(self, dl_dir: str, item: str, filename: str, started: float) -> None:
+        """
+        Keep track of a download the browser started.
+
+        param dl_dir: the directory it goes into. (See next_dir())
+        param item: the item the file belongs to.
+        param filename: name to give the file once it is moved.
+        param started: when the download was started.
+        """
+        self.in_flight[dl_dir] = (DownloadWatcher(dl_dir, started), item, filename)
+
+    def finish_one(self) -> None:
+        """ Wait for one of the downloads in flight to finish, then hand it to the mover. """
+        with timed("transfer", self.boxx_site):
+            watcher, event = wait_for_any_download([watcher for watcher, _, _ in self.in_flight.values()],
+                                                   DUR_DL_TIMEOUT)
+        _, item, filename = self.in_flight.pop(watcher.dl_dir)
+        watcher.close()
+        process_download(watcher.dl_dir, event, item, self.boxx_site, filename, self.url)
+
+    def finish_all(self) -> None:
+        """ Wait for every download in flight. """
+        while self.in_flight:
+            self.finish_one()
+
+
+def build_http_session(session: dict) -> urllib3.PoolManager:
+    """
+    Build a pooled HTTP client that shares the browser's login session.
+    (See load_session())
+
+    param session: the cookies and user agent of a logged in browser.
+    return: HTTP connection pool that sends the browser's cookies.
+    """
+    headers = {"Cookie": "; ".join(f"{cookie['name']}={cookie['value']}" for cookie in session["cookies"])}
+    if session.get("user_agent"):
+        headers["User-Agent"] = session["user_agent"]
+    return urllib3.PoolManager(maxsize=max(HTTP_POOL_SIZE, CRAWL_WORKERS), headers=headers, timeout=HTTP_TIMEOUT)
+
+
+def filename_from_response(resp: urllib3.HTTPResponse, url: str) -> str:
+    """
+    Work out the name the server gave the file.  Use the content-disposition
+    header when there is one, otherwise the last part of the url's path.
+
+    param resp: the response for the file being downloaded.
+    param url: the url the file is downloaded from.
+    return: the name of the file (with an extension when one can be found).
+    """
+    disposition = resp.headers.get("Content-Disposition", "")
+    match = re.search(r"filename\*=(?:UTF-8'')?([^;]+)", disposition, re.IGNORECASE) \
+        or re.search(r'filename="?([^";]+)"?', disposition, re.IGNORECASE)
+    if match:
+        dl_filename = unquote(match.group(1).strip())
+    else:
+        dl_filename = unquote(os.path.basename(urlparse(url).path))
+
+    # NO EXTENSION?  GUESS ONE FROM THE CONTENT TYPE.
+    if "." not in dl_filename:
+        content_type = resp.headers.get("Content-Type", "").split(";")[0].strip()
+        dl_filename += mimetypes.guess_extension(content_type) or ""
+
+    return dl_filename
+
+
+def get_staged_path(boxx_site: str, item: str, filename: str) -> str:
+    """
+    Where a partial download of a file is kept (without extension).  The
+    partial data is in <path>.part and what is known about the download
+    is in <path>.json.
+
+    param boxx_site: Boxx website the item is from
+    param item: the item's name
+    param filename: name of the file (without extension) within the <item> dir.
+    return: path of the staged file without extension.
+    """
+    key = hashlib.sha1(f"{boxx_site}/{item}/{clean(filename)}".encode()).hexdigest()
+    return os.path.join(STAGING_DIR, key)
+
+
+def load_staged_info(staged: str) -> dict | None:
+    """ Read what is known about a partial download.  (None if there isn't one) """
+    try:
+        with open(staged + ".json", encoding="utf-8") as info_file:
+            return json.load(info_file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def save_staged_info(staged: str, info: dict) -> None:
+    """ Write what is known about a partial download. """
+    with open(staged + ".json.tmp", "w", encoding="utf-8") as info_file:
+        json.dump(info, info_file, indent=2)
+    os.replace(staged + ".json.tmp", staged + ".json")
+
+
+def discard_staged(staged: str) -> None:
+    """ Throw away a partial download. """
+    for ext in (".part", ".json"):
+        try:
+            os.remove(staged + ext)
+        except FileNotFoundError:
+            pass
+
+
+def content_range_start(resp: urllib3.HTTPResponse) -> int | None:
+    """
+    Where the part a 206 response sends starts in the file.
+
+    return: the first byte's offset, or None if Content-Range doesn't say.
+    """
+    match = re.match(r"bytes (\d+)-", resp.headers.get("Content-Range", ""))
+    return int(match.group(1)) if match else None
 
 
-def download_item_files(browser: webdriver, url: str, boxx_site: str, item_name: str, file: str) -> None:
+@traced
+def stream_download(http: urllib3.PoolManager, url: str, save_to: str,
+                    boxx_site: str, save_filename: str) -> str | None:
+    """
+    Stream a file from the boxx site into the staging directory, then move
+    it to its permanent storage location once it is complete.  A partial
+    download left by an earlier attempt (or run) is resumed with a range
+    request as long as the site still has the same version of the file.
+
+    param http: connection pool holding the user's login session.
+    param url: url of the file to download.
+    param save_to: The name of the individual item from the boxx site.
+    param boxx_site: Which boxx website is the download from.
+    param save_filename: Name to give the file once it is saved.
+    return: The full path of the saved file or None if the download failed.
+    """
+    Path(STAGING_DIR).mkdir(parents=True, exist_ok=True)
+    staged = get_staged_path(boxx_site, save_to, save_filename)
+    part_filenm = staged + ".part"
+
+    # PICK UP WHERE THE LAST ATTEMPT LEFT OFF.  IF-RANGE MAKES THE SITE
+    # SEND THE WHOLE FILE AGAIN IF IT HAS CHANGED SINCE THEN.
+    info = load_staged_info(staged)
+    offset = os.path.getsize(part_filenm) if info and os.path.exists(part_filenm) else 0
+    # HEADERS GIVEN TO request() REPLACE THE POOL'S, SO START FROM THOSE
+    # (THEY CARRY THE LOGIN SESSION).
+    headers = dict(http.headers)
+    if offset > 0 and (info.get("etag") or info.get("last_modified")):
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = info.get("etag") or info["last_modified"]
+        print(f"            - Resuming download at {offset} bytes.")
+    else:
+        offset = 0
+
+    # THE LAST ATTEMPT GOT EVERY BYTE BUT STOPPED BEFORE MOVING THE FILE.
+    if offset > 0 and offset == info.get("expected_size"):
+        return promote_staged(staged, info, hash_file(part_filenm))
+
+    resp = http.request("GET", url, headers=headers, preload_content=False)
+    try:
+        # THE SITE REFUSED THE RANGE (416 / 412), OR SENT A PART THAT DOESN'T
+        # START WHERE THE STAGED ONE ENDS.  THROW THE STAGED PART AWAY AND
+        # DOWNLOAD THE WHOLE FILE.
+        if offset > 0 and (resp.status in (412, 416)
+                           or resp.status == 206 and content_range_start(resp) != offset):
+            print(f"            - Site can't resume at {offset} bytes (status {resp.status}).  Starting over.")
+            resp.drain_conn()
+            resp.release_conn()
+            discard_staged(staged)
+            return stream_download(http, url, save_to, boxx_site, save_filename)
+
+        # AN HTML PAGE INSTEAD OF A FILE MEANS THE SESSION WAS NOT ACCEPTED.
+        content_type = resp.headers.get("Content-Type", "")
+        if resp.status not in (200, 206) or content_type.startswith("text/html") \
+                or resp.status == 206 and content_range_start(resp) != offset:
+            print(f"            - HTTP download failed. (status {resp.status}, {content_type})")
+            return None
+
+        # 200 MEANS THE SITE IGNORED THE RANGE.  START OVER.
+        if resp.status == 200:
+            offset = 0
+            expected_size = int(resp.headers.get("Content-Length", -1))
+        else:
+            expected_size = int(resp.headers.get("Content-Range", "*/-1").split("/")[-1])
+
+        # REMEMBER WHAT IS BEING DOWNLOADED BEFORE THE FIRST BYTE IS WRITTEN.
+        dl_filename = filename_from_response(resp, url) if resp.status == 200 or info is None \
+            else info["dl_filename"]
+        info = {
+            "site": boxx_site,
+            "item": save_to,
+            "file": save_filename,
+            "url": url,
+            "dl_filename": dl_filename,
+            "target": build_save_location(boxx_site, save_to, save_filename, dl_filename),
+            "expected_size": expected_size,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }
+        save_staged_info(staged, info)
+
+        # THE CHECKSUM COVERS THE BYTES FROM EARLIER ATTEMPTS TOO.
+        digest = hashlib.sha256()
+        if offset > 0:
+            with open(part_filenm, "rb") as earlier:
+                for chunk in iter(lambda: earlier.read(HTTP_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+
+        with open(part_filenm, "ab" if offset > 0 else "wb") as out:
+            for chunk in resp.stream(HTTP_CHUNK_SIZE):
+                digest.update(chunk)
+                out.write(chunk)
+
+    finally:
+        resp.release_conn()
+
+    # ONLY A COMPLETE FILE IS MOVED INTO PLACE.  A SHORT FILE WAS CUT
+    # OFF AND IS KEPT TO BE RESUMED.
+    size = os.path.getsize(part_filenm)
+    if size < expected_size:
+        raise urllib3.exceptions.IncompleteRead(size, expected_size - size)
+
+    if 0 <= expected_size != size:
+        print(f"            - Download is {size} bytes, expected {expected_size}.  Discarding it.")
+        discard_staged(staged)
+        return None
+
+    return promote_staged(staged, info, digest.hexdigest())
+
+
+def promote_staged(staged: str, info: dict, sha256: str) -> str:
+    """
+    Move a complete download from the staging directory to its permanent
+    storage location.
+
+    param staged: path of the staged file without extension.
+    param info: what is known about the download. (See stream_download())
+    param sha256: checksum of the file's contents.
+    return: The full path of the saved file.
+    """
+    dst_filenm = info["target"]
+    shutil.move(staged + ".part", dst_filenm)
+    discard_staged(staged)
+    if info.get("etag") and info["expected_size"] >= 0:
+        record_fingerprint(info["expected_size"], info["etag"], sha256)
+    store_blob(dst_filenm, sha256)
+    record_file(info["site"], info["item"], info["file"], dst_filenm, sha256)
+    return dst_filenm
+
+
+@traced
+def fetch_file(http: urllib3.PoolManager | None, url: str | None,
+               save_to: str, boxx_site: str, save_filename: str) -> bool:
+    """
+    Download a file over HTTP instead of through the browser.  A download
+    that is cut off is resumed (up to http-resume-attempts times).
+
+    param http: connection pool holding the user's login session. (None to
+                    always use the browser)
+    param url: where the file is downloaded from. (None if it isn't known)
+    param save_to: The name of the individual item from the boxx site.
+    param boxx_site: Which boxx website is the download from.
+    param save_filename: Name to give the file once it is saved.
+    return: True if the file was downloaded.  False means the browser should
+                be used to download the file instead.
+    """
+    if http is None:
+        return False
+
+    if url is None:
+        print("            - No download url found, using the browser.")
+        return False
+
+    # THE SAME FILE MAY HAVE BEEN DOWNLOADED ALREADY (FROM ANOTHER SITE
+    # OR VOLUME).
+    if link_known_file(http, url, save_to, boxx_site, save_filename):
+        return True
+
+    dst_filenm = None
+    started = time.time()
+    for _ in range(HTTP_RESUME_ATTEMPTS):
+        wait_for_download_slot(boxx_site)
+        try:
+            with timed("transfer", boxx_site):
+                dst_filenm = stream_download(http, url, save_to, boxx_site, save_filename)
+            break
+
+        except (urllib3.exceptions.HTTPError, OSError) as err:
+            # THE PARTIAL FILE IS KEPT SO THE NEXT ATTEMPT CAN RESUME IT.
+            print(f"            - HTTP download interrupted. ({err})")
+            record_event(boxx_site, "http-interrupted", item=save_to, file=save_filename, error=str(err))
+
+    if dst_filenm is None:
+        print("            - Retrying download with the browser.")
+        return False
+
+    print(f"            - Saved to {dst_filenm}")
+    record_download(boxx_site, save_to, save_filename, os.path.getsize(dst_filenm), time.time() - started, "http")
+    return True
+
+
+def get_blob_path(sha256: str) -> str:
+    """ Where the copy of the file with this checksum is kept. """
+    return os.path.join(BLOB_DIR, sha256[:2], sha256)
+
+
+def share_file(src_filenm: str, dst_filenm: str) -> None:
+    """
+    Make dst_filenm have the same contents as src_filenm without copying
+    them: a reflink (copy-on-write clone) with dedup-mode=reflink where the
+    filesystem supports it, otherwise a hardlink.  Any file already at
+    dst_filenm is replaced all at once.
+
+    param src_filenm: the existing file.
+    param dst_filenm: the file to create or replace.
+    """
+    tmp_filenm = dst_filenm + ".link"
+    if DEDUP_MODE == "reflink":
+        try:
+            with open(src_filenm, "rb") as src, open(tmp_filenm, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            os.replace(tmp_filenm, dst_filenm)
+            return
+        except OSError:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_filenm)
+
+    os.link(src_filenm, tmp_filenm)
+    os.replace(tmp_filenm, dst_filenm)
+
+
+@traced
+def store_blob(file_path: str, sha256: str) -> None:
+    """
+    Add a file that was just put in place to the blob store.  If a file
+    with the same contents is already there, the new file becomes a link
+    to it (saving the space); otherwise the file becomes the blob.
+
+    param file_path: full path of the file under base-dir.
+    param sha256: checksum of the file's contents.
+    """
+    if DEDUP_MODE == "off":
+        return
+
+    blob = get_blob_path(sha256)
+    try:
+        if not os.path.exists(blob):
+            Path(blob).parent.mkdir(parents=True, exist_ok=True)
+            share_file(file_path, blob)
+        elif not os.path.samefile(blob, file_path):
+            share_file(blob, file_path)
+            print(f"            - Same contents as an earlier download.  Now shares {blob}")
+
+    # DEDUPLICATION ONLY SAVES SPACE.  THE FILE ITSELF IS IN PLACE EITHER WAY.
+    except OSError as err:
+        print(f"            - Could not add {file_path} to {BLOB_DIR} ({err})")
+
+
+def record_fingerprint(size: int, etag: str, sha256: str) -> None:
+    """ Remember the contents the site sends for a (size, ETag). """
+    with open_manifest() as manifest:
+        manifest.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?)", (size, etag, sha256))
+
+
+def link_known_file(http: urllib3.PoolManager, url: str, save_to: str,
+                    boxx_site: str, save_filename: str) -> bool:
+    """
+    Skip a download whose contents were downloaded before.  A HEAD request
+    gets the file's size and (strong) ETag.  When those match a file
+    already in the blob store, the file is linked into place instead.
+    (Only with head-requests=Yes)
+
+    param http: connection pool holding the user's login session.
+    param url: url of the file to download.
+    param save_to: The name of the individual item from the boxx site.
+    param boxx_site: Which boxx website is the download from.
+    param save_filename: Name to give the file once it is saved.
+    return: True if the file was put in place without downloading it.
+    """
+    if DEDUP_MODE == "off" or not HEAD_REQUESTS:
+        return False
+
+    try:
+        resp = http.request("HEAD", url)
+    except urllib3.exceptions.HTTPError:
+        return False
+
+    etag = resp.headers.get("ETag", "")
+    size = int(resp.headers.get("Content-Length", -1))
+    if resp.status != 200 or not etag or etag.startswith("W/") or size < 0:
+        return False
+
+    row = open_manifest().execute("SELECT sha256 FROM fingerprints WHERE size = ? AND etag = ?",
+                                  (size, etag)).fetchone()
+    if row is None or not os.path.exists(get_blob_path(row[0])):
+        return False
+
+    dst_filenm = build_save_location(boxx_site, save_to, save_filename, filename_from_response(resp, url))
+    try:
+        share_file(get_blob_path(row[0]), dst_filenm)
+    except OSError as err:
+        print(f"            - Could not link {dst_filenm} to {get_blob_path(row[0])} ({err})")
+        return False
+
+    print(f"            - Already downloaded once.  Linked {dst_filenm}")
+    record_file(boxx_site, save_to, save_filename, dst_filenm, row[0])
+    with STATS_LOCK:
+        RUN_STATS["linked"] += 1
+    record_event(boxx_site, "linked", item=save_to, file=save_filename, bytes=size, sha256=row[0])
+    return True
+
+
+def resume_staged_downloads(http: urllib3.PoolManager | None, boxx_site: str) -> None:
+    """
+    Finish the partial downloads an earlier run left behind for a boxx site.
+    Partial downloads whose file has been downloaded some other way since
+    are thrown away.
+
+    param http: connection pool holding the user's login session.
+    param boxx_site: Which boxx website to resume downloads for.
+    """
+    if http is None or not os.path.isdir(STAGING_DIR):
+        return
+
+    for info_filenm in glob.glob(os.path.join(STAGING_DIR, "*.json")):
+        staged = info_filenm[:-len(".json")]
+        info = load_staged_info(staged)
+        if info is None or info["site"] != boxx_site:
+            continue
+
+        if file_exists(boxx_site, info["item"], info["file"]):
+            discard_staged(staged)
+            continue
+
+        print(f"    Resuming partial download of {info['item']} {info['file']} ...")
+        ensure_save_dir_exists(boxx_site, info["item"])
+        fetch_file(http, info["url"], info["item"], boxx_site, info["file"])
+
+
+@traced
+def download_item_files(browser: webdriver, http: urllib3.PoolManager | None, url: str,
+                        boxx_site: str, item_name: str, file: str, selector: FileSelector) -> None:
     """
     Download all files from the current "item".
         I know the function is kinda long, but IO tends to do that.
 
     param browser: object to interact with the browser for us
+    param http: connection pool to download files with. (None means download
+                    everything through the browser)
     param url: url for the item to download.  Each "item" will have many downloadable files.
     param boxx_site: which boxx site to visit?
     param item_name: the name of this item which becomes the name of the directory to
                     save the file(s) into.
+    param file: skip the item's files until one's title contains this. (None = skip none)
+    param selector: the files wanted.  Item members it doesn't want are not clicked.
     """
     # SKIP ALL FILES UNTIL THIS STRING APPEARS IN THE NAME OF
     # THE FILE TO DOWNLOAD (NONE = SKIP NONE)
@@ -270,81 +2192,173 @@ def download_item_files(browser: webdriver, url: str, boxx_site: str, item_name:
 
     # POINT THE BROWSER AT THE PROPER PAGE TO DOWNLOAD FILES FOR
     # THE PURCHASE WE ARE PROCESSING.
-    browser.get(url)
+    started = time.time()
+    with timed("item-pages", boxx_site):
+        open_page(browser, url)
+
+        # WAIT UNTIL THE PAGE DOWNLOADS, THEN READ EVERY ITEM MEMBER
+        # ON IT IN ONE TRIP TO THE BROWSER.
+        members = wait_for(browser, "item-page", lambda br: br.execute_script(ITEM_PAGE_JS))
+    if members is None:
+        queue_retry(boxx_site, item_name, url, None, "item-page",
+                    f"{boxx_site.upper()} {item_name} download page did not load")
+        return
+    record_event(boxx_site, "item-page", item=item_name, members=len(members),
+                 seconds=round(time.time() - started, 3))
+
+    # READING THE WHOLE PAGE?  START ITS CACHED FILE LIST OVER.
+    # (WHAT WAS CACHED STILL TELLS WHICH MEMBERS HAVE A SINGLE FILE, SO
+    # THOSE ALREADY DOWNLOADED AREN'T CLICKED.)
+    known_members = load_catalog_entries(boxx_site, item_name)
+    if file is None:
+        with open_manifest() as manifest:
+            forget_item_listing(manifest, boxx_site, item_name)
+    unlisted = False
+
+    # PROCESS EACH ITEM FROM THE DOWNLOAD PAGE.  UP TO browser-downloads
+    # FILES DOWNLOAD AT ONCE, EACH IN ITS OWN DIRECTORY.
+    with BrowserDownloads(browser, boxx_site, url) as downloads:
+        for position, member in enumerate(members):
+            # GET INFO TO USE IN FILE'S NAME SO IT CAN BE EASILY FOUND
+            ttl, cnt_name, dur = member_name_parts(member)
+
+            # SKIP FILES AS LONG AS FIRST_FILE_CONTAINS HAS A VALUE
+            if first_file_contains is not None:
+                # IF WE MATCH REMOVE FILTER
+                if first_file_contains in ttl:
+                    first_file_contains = None
+                # IF WE DON'T MATCH, KEEP ON SKIPPING
+                else:
+                    print(f"            {first_file_contains} not found in {ttl}.  -SKIPPED-")
+                    continue
+
+            # DON'T CLICK ITEM MEMBERS THE FILTERS LEAVE OUT.  (THEIR FILES
+            # AREN'T LISTED, SO THE ITEM'S PAGE IS READ AGAIN NEXT TIME)
+            if not selected(selector, item=item_name, **member_fields(ttl, cnt_name, dur)):
+                print(f"            {ttl} left out by the filters.  -SKIPPED-")
+                unlisted = True
+                continue
 
-    # WAIT UNTIL THE PAGE DOWNLOADS
-    dl_elems = WebDriverWait(browser, timeout=DUR_WAIT_UTL).until(download_page_found)
-
-    # PROCESS EACH ITEM FROM THE DOWNLOAD PAGE
-    for dl_elem in dl_elems:
-        # GET INFO TO USE IN FILE'S NAME SO IT CAN BE EASILY FOUND
-        ttl = dl_elem.find_element(By.CLASS_NAME, "TitleText").text.lower().replace(" ", "-")
-        cnt_name = dl_elem.find_element(By.CLASS_NAME, "Contentname").text.lower().replace(" ", "")
-        dur = dl_elem.find_element(By.CLASS_NAME, "Duration").text.lower().replace(" : ", "")
-
-        # EACH ITEM HAS AN SVG IMAGE THAT MUST BE CLICKED.
-        # ONCE CLICKED, A LIST OF DOWNLOADS FOR THIS MEMBER OF OUR PURCHASE
-        # WILL BE LISTED.
-        dl_img = dl_elem.find_element(By.TAG_NAME, "svg")
-
-        # SKIP FILES AS LONG AS FIRST_FILE_CONTAINS HAS A VALUE
-        if first_file_contains is not None:
-            # IF WE MATCH REMOVE FILTER
-            if first_file_contains in ttl:
-                first_file_contains = None
-            # IF WE DON'T MATCH, KEEP ON SKIPPING
-            else:
-                print(f"            {first_file_contains} not found in {ttl}.  -SKIPPED-")
+            # A SINGLE FILE MEMBER WHOSE FILE IS ALREADY THERE?  CLICKING IT
+            # WOULD ONLY DOWNLOAD THE FILE AGAIN.
+            filename = member_filename(ttl, cnt_name, dur)
+            if known_members.get((position, ttl, cnt_name, dur)) == [""] \
+                    and file_exists(boxx_site, item_name, filename):
+                record_listed_file(boxx_site, item_name, filename)
+                record_catalog_entry(boxx_site, item_name, position, ttl, cnt_name, dur)
+                print(f"        Downloading single: {filename} ...")
+                print("            - already exists, skipping single download.")
+                with STATS_LOCK:
+                    RUN_STATS["skipped"] += 1
                 continue
 
-        # CLICK BUTTON TO BRING UP DOWNLOADS FOR ITEM MEMBER
-        dl_img.click()
-        time.sleep(2)
-
-        # COLLECT THE DOWNLOADS FOR THIS ITEM MEMBER.
-        item_wrappers = browser.find_elements(By.CLASS_NAME, "DescriptionWrapper")
-
-        # SOME OF THE PURCHASES ONLY HAVE A SINGLE FILE FOR EACH
-        # ITEM MEMBER.  WHEN THAT IS THE CASE, THE DOWNLOAD WILL
-        # START IMMEDIATELY.  THESE CASES REQUIRE SLIGHTLY DIFFERENT
-        # PROCESSING
-        if len(item_wrappers) > 0:
-            downloads = []
-
-            # COLLECT LIST IF FILES TO DOWNLOAD
-            for elem in item_wrappers:
-                descr = elem.find_element(By.CLASS_NAME, "ContentInfo")\
-                            .text.lower().replace(" ", "-")
-                save_filename = f"{ttl}-{cnt_name}-{dur}-{descr}"
-                downloads.append((save_filename, elem))
-
-            # DOWNLOAD EACH FILE FOR THIS ITEM MEMBER
-            for filename, elem in sorted(downloads):
-                print(f"        Downloading: {filename} ...")
-                if not file_exists(boxx_site, item_name, filename):
-                    # THE FILE WAS NOT PREVIOUSLY DOWNLOADED, SO
-                    # CLICK TO DOWNLOAD THE FILE THEN PROCESS IT
-                    # (AKA: MOVE IT TO ITS PERMANENT LOCATION)
-                    elem.click()
-                    time.sleep(2)
-                    process_download(item_name, boxx_site, filename)
+            # EACH ITEM HAS AN SVG IMAGE THAT MUST BE CLICKED.
+            # ONCE CLICKED, A LIST OF DOWNLOADS FOR THIS MEMBER OF OUR PURCHASE
+            # WILL BE LISTED.  THE CLICK STARTS A DOWNLOAD WHEN THE MEMBER HAS
+            # A SINGLE FILE, SO IT NEEDS A PLACE TO DOWNLOAD TO, AND A
+            # DOWNLOAD SLOT WHEN THE CACHED PAGE SAYS IT HAS A SINGLE FILE.
+            # (LISTING THE VARIANTS DOESN'T COUNT AGAINST THE LIMIT)
+            dl_dir = downloads.next_dir()
+            single = known_members.get((position, ttl, cnt_name, dur)) == [""]
+            slot = wait_for_download_slot(boxx_site) if single else None
+            browser.execute_script(MARK_VARIANTS_JS)
+            browser.execute_script(MEMBER_TOGGLE_JS, position).click()
+
+            # WAIT FOR THE LIST OF DOWNLOADS TO SHOW UP OR FOR THE
+            # DOWNLOAD TO START.  THEN COLLECT THE DOWNLOADS FOR THIS
+            # ITEM MEMBER.
+            wait_for(browser, "member-files", lambda br: br.execute_script(VARIANTS_JS)
+                     or list_download_files(dl_dir))
+            variants = browser.execute_script(VARIANTS_JS)
+
+            # NEITHER SHOWED UP IN TIME?  DON'T WAIT FOR A DOWNLOAD THAT MAY
+            # NEVER COME.  TRY THE MEMBER AGAIN LATER.
+            if not variants and not list_download_files(dl_dir):
+                if slot is not None:
+                    release_download_slot(boxx_site, slot)
+                unlisted = True
+                queue_retry(boxx_site, item_name, url, member_filename(ttl, cnt_name, dur), "member-files",
+                            f"{boxx_site.upper()} {item_name} {ttl} showed no files")
+                continue
 
-                else:
-                    # THE FILE HAS ALREADY BEEN DOWNLOADED.  HOORAY!
-                    # WE CAN MOVE ON THE NEXT FILE.
-                    print("            - already exists, skipping download.")
+            # SOME OF THE PURCHASES ONLY HAVE A SINGLE FILE FOR EACH
+            # ITEM MEMBER.  WHEN THAT IS THE CASE, THE DOWNLOAD WILL
+            # START IMMEDIATELY.  THESE CASES REQUIRE SLIGHTLY DIFFERENT
+            # PROCESSING
+            if len(variants) > 0:
+                # NOTHING WAS DOWNLOADED BY THE CLICK.
+                if slot is not None:
+                    release_download_slot(boxx_site, slot)
+                variant_files = []
+
+                # COLLECT LIST IF FILES TO DOWNLOAD
+                for index, variant in enumerate(variants):
+                    descr = variant["description"].lower().replace(" ", "-")
+                    save_filename = member_filename(ttl, cnt_name, dur, descr)
+                    variant_files.append((save_filename, index, variant["url"]))
+                    record_listed_file(boxx_site, item_name, save_filename)
+                    record_catalog_entry(boxx_site, item_name, position, ttl, cnt_name, dur, descr)
+
+                # DOWNLOAD EACH FILE FOR THIS ITEM MEMBER
+                for filename, index, dl_url in sorted(variant_files):
+                    if not selected(selector, variant=variants[index]["description"].lower().replace(" ", "-")):
+                        print(f"        {filename} left out by the filters.  -SKIPPED-")
+                        continue
+
+                    print(f"        Downloading: {filename} ...")
+                    if not file_exists(boxx_site, item_name, filename):
+                        # THE FILE WAS NOT PREVIOUSLY DOWNLOADED.  STREAM IT
+                        # STRAIGHT TO ITS PERMANENT LOCATION WHEN POSSIBLE.
+                        # OTHERWISE CLICK TO DOWNLOAD THE FILE THEN PROCESS
+                        # IT (AKA: MOVE IT TO ITS PERMANENT LOCATION)
+                        if not fetch_file(http, dl_url, item_name, boxx_site, filename):
+                            dl_dir = downloads.next_dir()
+                            started = wait_for_download_slot(boxx_site)
+                            journal(boxx_site, "clicked", item=item_name, file=filename, member=ttl)
+                            browser.execute_script(VARIANT_ELEMENT_JS, index).click()
+                            if wait_for(browser, "download-start", lambda br: list_download_files(dl_dir)):
+                                downloads.add(dl_dir, item_name, filename, started)
+                            else:
+                                # NOTHING WAS DOWNLOADED, SO THE SLOT IS FREE FOR THE RETRY.
+                                release_download_slot(boxx_site, started)
+                                quarantine_download_files(boxx_site, item_name, filename, dl_dir)
+                                queue_retry(boxx_site, item_name, url, filename, "did-not-start",
+                                            f"{boxx_site.upper()} {item_name} {filename} did not start")
+
+                    else:
+                        # THE FILE HAS ALREADY BEEN DOWNLOADED.  HOORAY!
+                        # WE CAN MOVE ON THE NEXT FILE.
+                        print("            - already exists, skipping download.")
+                        with STATS_LOCK:
+                            RUN_STATS["skipped"] += 1
+
+            # THIS ITEM MEMBER ONLY HAS A SINGLE FILE TO DOWNLOAD
+            else:
+                # THE SITE STARTED THE DOWNLOAD WITHOUT BEING ASKED.  IT
+                # STILL COUNTS AGAINST THE LIMIT.
+                if slot is None:
+                    slot = claim_download_slot(boxx_site)
+                filename = member_filename(ttl, cnt_name, dur)
+                record_listed_file(boxx_site, item_name, filename)
+                record_catalog_entry(boxx_site, item_name, position, ttl, cnt_name, dur)
+                print(f"        Downloading single: {filename} ...")
 
-        # THIS ITEM MEMBER ONLY HAS A SINGLE FILE TO DOWNLOAD
-        else:
-            filename = f"{ttl}-{cnt_name}-{dur}"
-            print(f"        Downloading single: {filename} ...")
+                if not file_exists(boxx_site, item_name, filename):
+                    journal(boxx_site, "clicked", item=item_name, file=filename, member=ttl)
+                    downloads.add(dl_dir, item_name, filename, slot)
 
-            if not file_exists(boxx_site, item_name, filename):
-                process_download(item_name, boxx_site, filename)
+                else:
+                    # FILE PREVIOUSLY DOWNLOADED (BUT THE PAGE HADN'T BEEN
+                    # CACHED), SO THE CLICK DOWNLOADED IT AGAIN.  THROW THE
+                    # COPY AWAY AND SKIP TO NEXT FILE.
+                    print("            - already exists, skipping single download.")
+                    discard_download(boxx_site, dl_dir, slot)
+                    with STATS_LOCK:
+                        RUN_STATS["skipped"] += 1
 
-            else:
-                # FILE PREVIOUSLY DOWNLOADED, SKIP TO NEXT FILE.
-                print("            - already exists, skipping single download.")
+    # EVERY FILE ON THE PAGE HAS BEEN LISTED UNLESS SOME WERE SKIPPED.
+    if file is None and not unlisted:
+        record_item_listed(boxx_site, item_name)
 
 
 def clean(file_name: str) -> str:
@@ -354,21 +2368,27 @@ def clean(file_name: str) -> str:
                     .replace("\\", "")
 
 
-def build_save_location(boxx_site: str, item_name: str, save_file: str) -> str:
+def build_save_location(boxx_site: str, item_name: str, save_file: str,
+                        dl_filename: str | None = None, dl_dir: str | None = None) -> str:
     """
     Generate the final resting place and name of the downloaded file.
-    ASSUMPTION: there is a single file in the browser's download
-        directory, AND this is the most recent download that will
-        be saved elsewhere.
+    ASSUMPTION: unless dl_filename is given, there is a single file in
+        the browser's download directory, AND this is the most recent
+        download that will be saved elsewhere.
 
     param boxx_site: The specific busy-boxx site (and product type)
     param item_name: Name of the purchased item
     param save_file: Base name for the file when it is renamed.
+    param dl_filename: Name the site gave the file. (None = look in the
+                    browser's download directory)
+    param dl_dir: the directory the browser downloaded it into. (Default:
+                    download-dir)
     return: The full path to save the file into permanently.
     """
     # GET THE NAME OF THE FILE THE BROWSER DOWNLOADED.  IT WILL BE
     # THE ONLY FILE IN THE DOWNLOADS DIRECTORY.
-    dl_filename = get_downloaded_filename()
+    if dl_filename is None:
+        dl_filename = get_downloaded_filename(dl_dir or DOWNLOAD_DIR)
 
     # GET THE EXTENSION OF THE DOWNLOAD FILE AND USE IT FOR THE STORED FILE
     file_ext = dl_filename[dl_filename.find("."):]
@@ -382,57 +2402,219 @@ def build_save_location(boxx_site: str, item_name: str, save_file: str) -> str:
     return os.path.join(dst_dir, clean_save_file) + file_ext
 
 
-def get_downloaded_filename() -> str | None:
+def get_downloaded_filename(dl_dir: str) -> str | None:
     """
-    Look into the browser's download directory (check the .ini file
+    Look into a browser download directory (check the .ini file
     for "download-dir" in the "DIRECTORIES" section) and return the
     name of the first file you find there.  There should only be a
     single file.
 
+    param dl_dir: the directory the browser downloaded into.
     return: The filename of the file in the download dir OR None
                 if it is empty for some reason.
     """
-    # FIND BROWSER'S DOWNLOAD DIR
-    dl_dir = CONFIG.get(SECTION_DIRS, "download-dir")
-
     # GET A LIST OF ALL FILES IN THE DOWNLOAD DIR
-    files = os.listdir(dl_dir)
+    files = list_download_files(dl_dir)
 
     # RETURN THE NAME OF THE FIRST FILE FOUND OR NONE IF IT IS EMPTY
     if len(files) > 0:
         return files[0]
 
-    return None
+    return None
+
+
+@traced
+def rename_and_move_dl_file(item_name: str, boxx_site: str, save_name: str,
+                            dl_filename: str | None = None, dl_dir: str | None = None) -> None:
+    """
+    Move a file from the downloaded location to the permanent storage location.
+    Rename the file from the browser chosen filename into a longer, more
+    descriptive name in the process.
+
+    The file is first renamed into the outbox (a subdirectory of the download
+    directory, so the download directory is empty again right away) and then
+    moved by a background mover thread.
+
+    param item_name: The name of the individual item from the boxx site.
+    param boxx_site: Which boxx website is the download from.
+    param save_name: Name to give the file once it is moved.
+    param dl_filename: Name of the finished download. (None = the only file
+                    in the browser's download directory)
+    param dl_dir: the directory the browser downloaded it into. (Default:
+                    download-dir)
+    """
+    # FIND THE FULL PATH TO THE DOWNLOADED FILE
+    dl_dir = dl_dir or DOWNLOAD_DIR
+    if dl_filename is None:
+        dl_filename = get_downloaded_filename(dl_dir)
+    src_filenm = os.path.join(dl_dir, dl_filename)
+
+    # CALCULATE THE PATH TO MOVE THE DOWNLOADED FILE TO
+    dst_filenm = build_save_location(boxx_site, item_name, save_name, dl_filename)
+
+    # HAND THE FILE TO THE MOVER.  THE JOB IS WRITTEN (ALL AT ONCE) BEFORE
+    # THE FILE GOES INTO THE OUTBOX, SO A CRASH NEVER LEAVES A FILE THERE
+    # WITHOUT ONE.
+    outbox_filenm = os.path.join(get_outbox_dir(), f"{time.time_ns()}-{dl_filename}")
+    job = {
+        "src": outbox_filenm,
+        "dst": dst_filenm,
+        "size": os.path.getsize(src_filenm),
+        "site": boxx_site,
+        "item": item_name,
+        "file": save_name,
+    }
+    with open(outbox_filenm + ".json.tmp", "w", encoding="utf-8") as job_file:
+        json.dump(job, job_file)
+        job_file.flush()
+        os.fsync(job_file.fileno())
+    os.replace(outbox_filenm + ".json.tmp", outbox_filenm + ".json")
+    os.rename(src_filenm, outbox_filenm)
+    record_event(boxx_site, "move-queued", item=item_name, file=save_name, bytes=job["size"])
+    queue_move(job)
+
+
+def get_outbox_dir() -> str:
+    """ Where finished browser downloads wait for the mover. """
+    outbox_dir = os.path.join(DOWNLOAD_DIR, ".outbox")
+    Path(outbox_dir).mkdir(parents=True, exist_ok=True)
+    return outbox_dir
+
+
+def move_into_place(job: dict) -> None:
+    """
+    Check a finished download, then move it to its permanent storage
+    location and add it to the manifest.  Across filesystems the file is
+    copied next to its final name and renamed so it appears all at once.
+
+    param job: the file to move. (See rename_and_move_dl_file())
+    """
+    src_filenm, dst_filenm = job["src"], job["dst"]
+    if os.path.getsize(src_filenm) != job["size"]:
+        raise OSError(f"{src_filenm} changed size while waiting to be moved")
+
+    # CHECKSUM IT FIRST WHILE IT IS STILL LOCAL
+    started = time.time()
+    with timed("move", job["site"]):
+        sha256 = hash_file(src_filenm)
+        if os.stat(src_filenm).st_dev == os.stat(os.path.dirname(dst_filenm)).st_dev:
+            os.replace(src_filenm, dst_filenm)
+        else:
+            shutil.copyfile(src_filenm, dst_filenm + ".part")
+            os.replace(dst_filenm + ".part", dst_filenm)
+            os.remove(src_filenm)
+
+    os.remove(src_filenm + ".json")
+    store_blob(dst_filenm, sha256)
+    record_file(job["site"], job["item"], job["file"], dst_filenm, sha256)
+    record_event(job["site"], "moved", item=job["item"], file=job["file"], bytes=job["size"],
+                 seconds=round(time.time() - started, 3))
+
+
+def move_or_report(job: dict) -> None:
+    """ Move a finished download into place, reporting it if that fails. """
+    try:
+        move_into_place(job)
+    except Exception as err:  # pylint: disable=broad-except
+        # ANYTHING THAT GOES WRONG MOVING ONE FILE IS REPORTED, SO THE
+        # MOVER KEEPS GOING.
+        record_failure(job["site"], "move", f"{job['site'].upper()} {job['item']} {job['file']} not moved: {err}")
+
+
+def mover_thread(jobs: Queue) -> None:
+    """
+    Background thread that moves finished downloads into place until it
+    is given None.
+
+    param jobs: queue of files to move.
+    """
+    while (job := jobs.get()) is not None:
+        try:
+            move_or_report(job)
+        finally:
+            jobs.task_done()
+
+    close_manifest()
+    jobs.task_done()
 
 
-def rename_and_move_dl_file(item_name: str, boxx_site: str, save_name: str) -> None:
+def queue_move(job: dict) -> None:
     """
-    Move a file from the downloaded location to the permanent storage location.
-    Rename the file from the browser chosen filename into a longer, more
-    descriptive name in the process.
+    Hand a finished download to the background mover, starting the mover
+    threads the first time.  The queue is bounded so the browser can't get
+    too far ahead of the movers.  (With mover-threads=0 the file is moved
+    right away instead.)
 
-    param item_name: The name of the individual item from the boxx site.
-    param boxx_site: Which boxx website is the download from.
-    param save_name: Name to give the file once it is moved.
+    param job: the file to move. (See rename_and_move_dl_file())
     """
-    # FIND THE FULL PATH TO THE DOWNLOADED FILE
-    dl_dir = CONFIG.get(SECTION_DIRS, "download-dir")
-    src_filenm = os.path.join(dl_dir, get_downloaded_filename())
+    global MOVER
+
+    if MOVER_THREADS < 1:
+        move_or_report(job)
+        return
+
+    if MOVER is None:
+        MOVER = Queue(maxsize=max(MOVER_QUEUE_SIZE, 1))
+        for _ in range(MOVER_THREADS):
+            threading.Thread(target=mover_thread, args=(MOVER,), daemon=True).start()
+
+    MOVER.put(job)
+
+
+def requeue_outbox() -> None:
+    """ Queue the files an earlier run left in the outbox to be moved again. """
+    for job_filenm in glob.glob(os.path.join(get_outbox_dir(), "*.json")):
+        try:
+            with open(job_filenm, encoding="utf-8") as job_file:
+                job = json.load(job_file)
+        except ValueError as err:
+            # CAN'T TELL WHERE IT GOES.  MOVE IT (AND ITS FILE) OUT OF THE WAY.
+            quarantine_dir = os.path.join(DOWNLOAD_DIR, ".quarantine",
+                                          f"{time.strftime('%Y%m%d-%H%M%S')}-outbox")
+            Path(quarantine_dir).mkdir(parents=True, exist_ok=True)
+            for pth in (job_filenm, job_filenm[:-len(".json")]):
+                if os.path.exists(pth):
+                    os.rename(pth, os.path.join(quarantine_dir, os.path.basename(pth)))
+            print_error(f"Unreadable outbox job {job_filenm} ({err}), moved to {quarantine_dir}")
+            continue
+        if os.path.exists(job["src"]):
+            print(f"    Moving {job['dst']} left over from an earlier run.")
+            queue_move(job)
+        else:
+            os.remove(job_filenm)
+
+
+def finish_moves() -> None:
+    """ Wait for the background mover to finish every file queued so far. """
+    if MOVER is not None:
+        MOVER.join()
 
-    # CALCULATE THE PATH TO MOVE THE DOWNLOADED FILE TO
-    dst_filenm = build_save_location(boxx_site, item_name, save_name)
 
-    # MOVE THE FILE
-    shutil.move(src_filenm, dst_filenm)
+def stop_mover() -> None:
+    """ Finish the queued moves, then stop the mover threads. """
+    global MOVER
 
+    if MOVER is not None:
+        finish_moves()
+        for _ in range(MOVER_THREADS):
+            MOVER.put(None)
+        MOVER.join()
+        MOVER = None
+    index_new_files()
 
-def start_browser() -> webdriver:
+
+@traced
+def start_browser(profile: str = "default") -> webdriver:
     """
-    Start the web browser.
+    Start the web browser.  The settings in the [BROWSER] section keep it
+    from loading what isn't needed to find and download the files.
+
+    param profile: name of the profile to use under profile-dir.  (Each
+                    browser running at the same time needs its own)
     return: the web browser object to allow program to interact with browser.
     """
     # FIND THE DOWNLOAD DIR FOR THE BROWSER TO USE
-    dl_dir = CONFIG.get(SECTION_DIRS, "download-dir")
+    dl_dir = DOWNLOAD_DIR
 
     # SETUP THE BROWSER'S OPTIONS
     opts = Options()
@@ -454,13 +2636,549 @@ def start_browser() -> webdriver:
     # THIS ONE SPECIFIES THE DIRECTORY
     opts.set_preference("browser.download.dir", dl_dir)
 
+    # SEVERAL DOWNLOADS AT ONCE NEED TO CHANGE THAT DIRECTORY BEFORE EACH
+    # ONE, WHICH NEEDS ACCESS TO FIREFOX ITSELF.  (SEE BrowserDownloads)
+    if BROWSER_DOWNLOADS > 1:
+        opts.add_argument("-remote-allow-system-access")
+
     # ALWAYS DOWNLOAD .MP4 FILES.
     opts.set_preference("media.play-stand-alone", False)
 
+    # KEEP THE PROFILE (LOGINS, CACHE, ...) FROM ONE RUN TO THE NEXT
+    if BROWSER_PROFILE_DIR:
+        profile_dir = os.path.abspath(os.path.join(BROWSER_PROFILE_DIR, profile))
+        Path(profile_dir).mkdir(parents=True, exist_ok=True)
+        opts.add_argument("-profile")
+        opts.add_argument(profile_dir)
+
+    # DON'T WAIT FOR (OR LOAD) WHAT ISN'T NEEDED TO FIND THE FILES
+    opts.page_load_strategy = PAGE_LOAD_STRATEGY
+    if BLOCK_IMAGES:
+        opts.set_preference("permissions.default.image", 2)
+    if BLOCK_FONTS:
+        opts.set_preference("gfx.downloadable_fonts.enabled", False)
+        opts.set_preference("browser.display.use_document_fonts", 0)
+    if BLOCK_MEDIA:
+        opts.set_preference("media.autoplay.default", 5)
+        opts.set_preference("media.preload.default", 0)
+        opts.set_preference("media.preload.auto", 0)
+    if DISABLE_PREFETCH:
+        opts.set_preference("network.prefetch-next", False)
+        opts.set_preference("network.dns.disablePrefetch", True)
+        opts.set_preference("network.predictor.enabled", False)
+        opts.set_preference("network.http.speculative-parallel-limit", 0)
+        opts.set_preference("browser.urlbar.speculativeConnect.enabled", False)
+    if DISABLE_TELEMETRY:
+        opts.set_preference("toolkit.telemetry.enabled", False)
+        opts.set_preference("toolkit.telemetry.unified", False)
+        opts.set_preference("datareporting.healthreport.uploadEnabled", False)
+        opts.set_preference("datareporting.policy.dataSubmissionEnabled", False)
+        opts.set_preference("app.update.auto", False)
+        opts.set_preference("app.normandy.enabled", False)
+        opts.set_preference("browser.ping-centre.telemetry", False)
+        opts.set_preference("browser.newtabpage.activity-stream.feeds.telemetry", False)
+        opts.set_preference("browser.shell.checkDefaultBrowser", False)
+
     # START THE BROWSER AND RETURN THE OBJECT FOR FUTURE INTERACTIONS
     return webdriver.Firefox(options=opts)
 
 
+class LazyBrowser:
+    """
+    Stands in for the browser until something really needs it.  The browser
+    is started (and logged in to the current site) the first time it is
+    used, so runs that find nothing new never start it.
+    """
+
+    def __init__(self, profile: str = "default"):
+        self.browser = None
+        self.profile = profile
+        self.boxx_site = None
+        self.logged_in_site = None
+
+    def use_site(self, boxx_site: str) -> None:
+        """ Switch to another boxx site.  (The login happens when the browser is next used) """
+        self.boxx_site = boxx_site
+
+    def start(self) -> webdriver:
+        """
+        Start the browser if it isn't running, and log it in to the current
+        site if it isn't yet.
+
+        return: the browser, pointing at the site's home page after a login.
+        """
+        if self.browser is None:
+            with timed("start-browser", self.boxx_site):
+                self.browser = start_browser(self.profile)
+
+        # LOG IN THROUGH THIS STAND-IN, SO --trace SHOWS THE BROWSER CALLS.
+        # (THE SITE COUNTS AS LOGGED IN ALREADY, SO THOSE CALLS DON'T
+        # START ANOTHER LOGIN)
+        if self.logged_in_site != self.boxx_site:
+            self.logged_in_site = self.boxx_site
+            try:
+                with timed("login", self.boxx_site):
+                    start_session(self, self.boxx_site)
+            except BaseException:
+                self.logged_in_site = None
+                raise
+
+        return self.browser
+
+    def expire_login(self) -> None:
+        """ Log in again the next time the browser is used.  (The site stopped accepting the session) """
+        self.logged_in_site = None
+
+    def quit(self) -> None:
+        """ Close the browser, if it was ever started. """
+        if self.browser is not None:
+            self.browser.quit()
+            self.browser = None
+            self.logged_in_site = None
+
+    def __getattr__(self, name):
+        # WITH --trace EACH CALL TO THE BROWSER IS A SPAN.
+        attr = getattr(self.start(), name)
+        if TRACE_EVENTS is None or not callable(attr):
+            return attr
+
+        def traced_call(*args, **kwargs):
+            with span(f"webdriver.{name}", "webdriver"):
+                return attr(*args, **kwargs)
+        return traced_call
+
+
+def open_manifest(rebuild: bool = False) -> sqlite3.Connection:
+    """
+    Open the manifest of downloaded files, creating it from the files
+    already under base-dir the first time.  Each thread gets its own
+    connection.
+
+    param rebuild: recreate the list of downloaded files from base-dir
+                    even if the manifest already exists.
+    return: connection to the manifest database.
+    """
+    manifest = getattr(MANIFEST, "conn", None)
+    if manifest is None:
+        Path(STATE_DIR).mkdir(parents=True, exist_ok=True)
+        is_new = not os.path.exists(MANIFEST_DB)
+        manifest = MANIFEST.conn = sqlite3.connect(MANIFEST_DB, timeout=60)
+        manifest.execute("PRAGMA journal_mode=WAL")
+        manifest.executescript(MANIFEST_SCHEMA)
+        if is_new or rebuild:
+            rebuild_manifest()
+
+    return manifest
+
+
+def close_manifest() -> None:
+    """ Close this thread's manifest connection.  (It is opened again when next needed.) """
+    manifest = getattr(MANIFEST, "conn", None)
+    if manifest is not None:
+        manifest.close()
+        MANIFEST.conn = None
+
+
+@traced
+def hash_file(file_path: str) -> str:
+    """ Return the sha256 checksum of a file. """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as in_file:
+        for chunk in iter(lambda: in_file.read(HTTP_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def record_file(boxx_site: str, item: str, filename: str, file_path: str,
+                sha256: str | None = None) -> None:
+    """
+    Add a file that was just moved into place to the manifest.
+
+    param boxx_site: Boxx website the item is from
+    param item: the item's name - used as a dir name for saving
+    param filename: name of the file (without extension) within the <item> dir.
+    param file_path: full path of the file under base-dir.
+    param sha256: checksum of the file's contents. (None if not known)
+    """
+    now = time.time()
+    with open_manifest() as manifest:
+        manifest.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (boxx_site, item, clean(filename), file_path,
+                          os.path.getsize(file_path), sha256, now, now))
+    journal(boxx_site, "moved", item=item, file=filename)
+    if INDEX_ON_MOVE:
+        MEDIA_PENDING.append((boxx_site, item, file_path))
+
+
+def record_listed_file(boxx_site: str, item: str, filename: str) -> None:
+    """ Remember that a file is listed on an item's download page. """
+    with open_manifest() as manifest:
+        manifest.execute("INSERT OR IGNORE INTO item_files VALUES (?, ?, ?)",
+                         (boxx_site, item, clean(filename)))
+
+
+def record_item_listed(boxx_site: str, item: str) -> None:
+    """ Remember that every file on an item's download page has been listed. """
+    with open_manifest() as manifest:
+        manifest.execute("INSERT OR REPLACE INTO items VALUES (?, ?, ?)",
+                         (boxx_site, item, time.time()))
+
+
+def item_complete(boxx_site: str, item: str, selector: FileSelector | None = None) -> bool:
+    """
+    Has every file listed on the item's download page been downloaded?
+    Items whose page was never read from start to end are not complete.
+
+    param boxx_site: Boxx website the item is from
+    param item: the item's name
+    param selector: only the files it wants need to be there. (None = every file)
+    return: True if there is nothing left to download for the item.
+    """
+    if selector is not None and (selector.include or selector.exclude):
+        listed = open_manifest().execute("SELECT 1 FROM items WHERE site = ? AND item = ?",
+                                         (boxx_site, item)).fetchone()
+        return listed is not None and all(
+            file_exists(boxx_site, item, member_filename(ttl, cnt_name, dur, descr))
+            for (_, ttl, cnt_name, dur), variants in load_catalog_entries(boxx_site, item).items()
+            for descr in variants
+            if selected(selector, item=item, **member_fields(ttl, cnt_name, dur),
+                        **({"variant": descr} if descr else {})))
+
+    row = open_manifest().execute(
+        """
+        SELECT COUNT(*) FROM items
+        WHERE site = ? AND item = ? AND NOT EXISTS (
+            SELECT 1 FROM item_files
+            LEFT JOIN files USING (site, item, file)
+            WHERE item_files.site = items.site AND item_files.item = items.item
+              AND files.file IS NULL)
+        """, (boxx_site, item)).fetchone()
+    return row[0] > 0
+
+
+def rebuild_manifest() -> None:
+    """
+    Recreate the manifest's list of downloaded files from a single scan of
+    base-dir.  Checksums are not calculated for files found this way.
+    """
+    print("Rebuilding the manifest of downloaded files ...")
+    base_dir = CONFIG.get(SECTION_DIRS, "base-dir")
+    rows = []
+    for boxx_site in BOXX_SITES:
+        try:
+            items = [entry for entry in os.scandir(os.path.join(base_dir, boxx_site)) if entry.is_dir()]
+        except FileNotFoundError:
+            continue
+
+        for item in items:
+            for entry in os.scandir(item.path):
+                if not entry.is_file() or entry.name.endswith((".part", ".link")):
+                    continue
+
+                # THE EXTENSION STARTS AT THE FIRST "." OF THE NAME THE SITE
+                # GAVE THE FILE, SO ANY "." COULD BE WHERE THE SAVE NAME ENDS.
+                # (THE SAME FILES file_exists() USED TO MATCH WITH GLOB.)
+                stat = entry.stat()
+                dots = [pos for pos, char in enumerate(entry.name) if char == "."]
+                for dot in dots:
+                    rows.append((boxx_site, item.name, entry.name[:dot], entry.path,
+                                 stat.st_size, None, stat.st_mtime, time.time()))
+
+    with open_manifest() as manifest:
+        manifest.execute("DELETE FROM files")
+        manifest.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    print(f"Manifest rebuilt. ({len(rows)} entries)")
+
+
+def probe_media(file_path: str) -> dict:
+    """
+    Read a media file's container metadata with ffprobe.  (Runs in the
+    worker processes of index_media_files())
+
+    param file_path: the file to look at.
+    return: the width, height and codec of the first video stream and the
+                length in seconds.  (Empty when ffprobe can't read it)
+    """
+    if not FFPROBE:
+        return {}
+    try:
+        output = subprocess.run([FFPROBE, "-v", "error", "-select_streams", "v:0",
+                                 "-show_entries", "stream=codec_name,width,height:format=duration",
+                                 "-of", "json", file_path],
+                                capture_output=True, timeout=60, check=True).stdout
+        info = json.loads(output or "{}")
+    except (OSError, subprocess.SubprocessError, json.JSONDecodeError):
+        return {}
+
+    stream = (info.get("streams") or [{}])[0]
+    duration = info.get("format", {}).get("duration")
+    return {"width": stream.get("width"), "height": stream.get("height"), "codec": stream.get("codec_name"),
+            "seconds": float(duration) if duration else None}
+
+
+def media_name_fields(name: str, members: dict) -> dict:
+    """
+    Split a downloaded file's name into the parts it was built from (see
+    member_filename()).  Names the item's cached download page lists are
+    looked up; any other name is split where its duration is.
+
+    param name: the file's name (with its extension).
+    param members: the item's save names and their parts. (See media_members())
+    return: the title, content name, duration (in seconds) and variant.
+    """
+    # THE EXTENSION STARTS AT THE FIRST "." OF THE NAME THE SITE GAVE THE
+    # FILE, SO ANY "." COULD BE WHERE THE SAVE NAME ENDS.
+    for dot in [pos for pos, char in enumerate(name) if char == "."] + [len(name)]:
+        if name[:dot] in members:
+            return members[name[:dot]]
+
+    match = MEDIA_NAME_RE.match(name.split(".", 1)[0])
+    if match is None:
+        return {"title": name.split(".", 1)[0], "name": "", "duration": None, "variant": ""}
+    return {"title": match["title"], "name": match["name"], "duration": duration_seconds(match["duration"]),
+            "variant": match["variant"] or ""}
+
+
+def media_members(boxx_site: str, item: str) -> dict:
+    """ The save names on an item's cached download page, and the parts of each. (See media_name_fields()) """
+    members = {}
+    for (_, ttl, cnt_name, dur), descrs in load_catalog_entries(boxx_site, item).items():
+        for descr in descrs:
+            members[clean(member_filename(ttl, cnt_name, dur, descr))] = {
+                "title": ttl, "name": cnt_name, "duration": duration_seconds(dur), "variant": descr}
+    return members
+
+
+def media_row(boxx_site: str, item: str, file_path: str, stat: os.stat_result,
+              members: dict, probe: dict) -> tuple:
+    """ A row of the media table.  (See MANIFEST_SCHEMA) """
+    fields = media_name_fields(os.path.basename(file_path), members)
+    seconds = probe.get("seconds") if probe.get("seconds") is not None else fields["duration"]
+    return (file_path, boxx_site, item, item_volume(item), fields["title"], fields["name"], fields["variant"],
+            seconds, probe.get("width"), probe.get("height"), probe.get("codec"),
+            stat.st_size, stat.st_mtime, time.time())
+
+
+def index_media_files(files: [tuple]) -> list:
+    """
+    Probe files (probe-workers at a time) and build their rows of the
+    media index.
+
+    param files: the site, item, path and os.stat() of each file.
+    return: the rows for the media table. (See media_row())
+    """
+    members = {}
+    for boxx_site, item, _, _ in files:
+        if (boxx_site, item) not in members:
+            members[(boxx_site, item)] = media_members(boxx_site, item)
+
+    # ffprobe IS STARTED FOR EACH FILE.  RUN SEVERAL AT ONCE (WHEN THERE
+    # IS ANYTHING TO PROBE).
+    if files and FFPROBE and shutil.which(FFPROBE) is not None:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(PROBE_WORKERS, len(files))) as probers:
+            probes = list(probers.map(probe_media, [file_path for _, _, file_path, _ in files], chunksize=8))
+    else:
+        probes = [{}] * len(files)
+    return [media_row(boxx_site, item, file_path, stat, members[(boxx_site, item)], probe)
+            for (boxx_site, item, file_path, stat), probe in zip(files, probes)]
+
+
+def index_new_files() -> None:
+    """
+    Add the files put under base-dir since the last call to the media
+    index.  (They are probed here, at the end of the run, rather than
+    holding up the download or the move that put them there.)
+    """
+    pending = MEDIA_PENDING[:]
+    del MEDIA_PENDING[:len(pending)]
+    files = []
+    for boxx_site, item, file_path in pending:
+        try:
+            files.append((boxx_site, item, file_path, os.stat(file_path)))
+        except OSError:
+            continue
+    if not files:
+        return
+
+    rows = index_media_files(files)
+    with open_manifest() as manifest:
+        manifest.executemany("INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def update_media_index() -> None:
+    """
+    Bring the media index up to date with a single scan of base-dir.  Only
+    files that are new, or whose size or modification time changed, are
+    probed (probe-workers at a time).  Files that are gone are dropped.
+    """
+    started = time.time()
+    print("Updating the media index ...")
+    if FFPROBE and shutil.which(FFPROBE) is None:
+        print_error(f"{FFPROBE} not found.  Only the names and sizes of the files are indexed.")
+
+    base_dir = CONFIG.get(SECTION_DIRS, "base-dir")
+    manifest = open_manifest()
+    indexed = {path: (size, mtime) for path, size, mtime in manifest.execute("SELECT path, size, mtime FROM media")}
+    found, changed = set(), []
+    for boxx_site in BOXX_SITES:
+        try:
+            items = [entry for entry in os.scandir(os.path.join(base_dir, boxx_site)) if entry.is_dir()]
+        except FileNotFoundError:
+            continue
+
+        for item in items:
+            for entry in os.scandir(item.path):
+                if not entry.is_file() or entry.name.endswith((".part", ".link")):
+                    continue
+                stat = entry.stat()
+                found.add(entry.path)
+                if indexed.get(entry.path) != (stat.st_size, stat.st_mtime):
+                    changed.append((boxx_site, item.name, entry.path, stat))
+
+    rows = index_media_files(changed)
+    gone = [(path,) for path in indexed if path not in found]
+    with manifest:
+        manifest.executemany("INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        manifest.executemany("DELETE FROM media WHERE path = ?", gone)
+    print(f"Media index updated: {len(found)} files, {len(rows)} indexed, {len(gone)} dropped "
+          f"({time.time() - started:.1f}s).")
+
+
+def media_query_sql(selector: FileSelector) -> (str, list):
+    """
+    Turn --query rules into a WHERE clause for the media table, so the
+    lookup uses the table's indexes.  Rules for the same field are
+    alternatives; rules for different fields must all match.  (The same as
+    selected())
+
+    param selector: the query's rules.
+    return: the WHERE clause and its parameters.
+    """
+    def condition(rule: FileRule) -> (str, list):
+        column = MEDIA_COLUMNS[rule.field]
+        if rule.field not in NUMBER_FIELDS:
+            return f"lower({column}) GLOB ?", [rule.pattern]
+        if rule.high == math.inf:
+            return f"{column} >= ?", [rule.low]
+        return f"{column} BETWEEN ? AND ?", [rule.low, rule.high]
+
+    by_field = {}
+    for rule in selector.include:
+        by_field.setdefault(rule.field, []).append(condition(rule))
+    clauses, params = ["1"], []
+    for conditions in by_field.values():
+        clauses.append("(" + " OR ".join(sql for sql, _ in conditions) + ")")
+        params.extend(param for _, rule_params in conditions for param in rule_params)
+    for rule in selector.exclude:
+        sql, rule_params = condition(rule)
+        clauses.append(f"NOT coalesce({sql}, 0)")
+        params.extend(rule_params)
+    return " AND ".join(clauses), params
+
+
+def query_media(selector: FileSelector) -> None:
+    """
+    List the indexed files the rules select.  (See update_media_index())
+
+    param selector: the query's rules.
+    """
+    started = time.time()
+    where, params = media_query_sql(selector)
+    rows = open_manifest().execute(
+        f"SELECT path, width, height, codec, seconds, size FROM media WHERE {where} ORDER BY path", params).fetchall()
+    for path, width, height, codec, seconds, size in rows:
+        resolution = f"{width}x{height}" if width and height else "?x?"
+        length = f"{seconds:.1f}s" if seconds is not None else "?s"
+        print(f"{path}  {resolution} {codec or '?'} {length} {size / (1024 * 1024):.1f} MB")
+    print(f"{len(rows)} files ({(time.time() - started) * 1000:.0f} ms)")
+    if not open_manifest().execute("SELECT 1 FROM media LIMIT 1").fetchone():
+        print("The media index is empty.  (--index builds it)")
+
+
+def load_catalog(boxx_site: str) -> list[(str, str)] | None:
+    """
+    Get the purchased items of a boxx site from the catalog cache.
+
+    param boxx_site: Boxx website to get the items for.
+    return: list of pairs (url and item name) like get_item_download_pages()
+                or None if the cache is missing or older than catalog-ttl-in-hours.
+    """
+    manifest = open_manifest()
+    row = manifest.execute("SELECT fetched_at FROM catalogs WHERE site = ?", (boxx_site,)).fetchone()
+    if row is None or row[0] < time.time() - CATALOG_TTL:
+        return None
+
+    return manifest.execute("SELECT url, item FROM catalog_items WHERE site = ? ORDER BY position",
+                            (boxx_site,)).fetchall()
+
+
+def save_catalog(boxx_site: str, item_pgs: [(str, str)]) -> None:
+    """
+    Store the purchased items just read from a boxx site's "My Downloads"
+    page.  Items whose url changed lose their cached file list so their
+    download page is read again.
+
+    param boxx_site: Boxx website the items are from.
+    param item_pgs: list of pairs (url and item name) from get_item_download_pages()
+    """
+    with open_manifest() as manifest:
+        cached = dict(manifest.execute("SELECT item, url FROM catalog_items WHERE site = ?",
+                                       (boxx_site,)).fetchall())
+        new_items = [item for url, item in item_pgs if item not in cached]
+        changed = [item for url, item in item_pgs if item in cached and cached[item] != url]
+        print(f"    {len(item_pgs)} items: {len(new_items)} new, {len(changed)} changed since last time.")
+
+        for item in changed:
+            forget_item_listing(manifest, boxx_site, item)
+
+        manifest.execute("DELETE FROM catalog_items WHERE site = ?", (boxx_site,))
+        manifest.executemany("INSERT OR REPLACE INTO catalog_items VALUES (?, ?, ?, ?)",
+                             [(boxx_site, item, url, pos) for pos, (url, item) in enumerate(item_pgs)])
+        manifest.execute("INSERT OR REPLACE INTO catalogs VALUES (?, ?)", (boxx_site, time.time()))
+
+
+def forget_item_listing(manifest: sqlite3.Connection, boxx_site: str, item: str) -> None:
+    """ Drop what is known about an item's download page so it is read again. """
+    for table in ("items", "item_files", "catalog_entries", "file_sizes"):
+        manifest.execute(f"DELETE FROM {table} WHERE site = ? AND item = ?", (boxx_site, item))
+
+
+def load_catalog_entries(boxx_site: str, item: str) -> dict:
+    """
+    The files cached for an item's download page, by item member.
+
+    param boxx_site: Boxx website the item is from
+    param item: the item's name
+    return: the variant descriptions ('' for a single file) of each item
+                member, keyed by (position, title, content name, duration).
+    """
+    entries = {}
+    for position, ttl, cnt_name, dur, descr in open_manifest().execute(
+            """
+            SELECT position, title, content_name, duration, variant FROM catalog_entries
+            WHERE site = ? AND item = ? ORDER BY position, variant
+            """, (boxx_site, item)):
+        entries.setdefault((position, ttl, cnt_name, dur), []).append(descr)
+    return entries
+
+
+def record_catalog_entry(boxx_site: str, item: str, position: int, ttl: str,
+                         cnt_name: str, dur: str, descr: str = "") -> None:
+    """
+    Cache a file offered on an item's download page.
+
+    param boxx_site: Boxx website the item is from
+    param item: the item's name
+    param position: where the item member is on the download page.
+    param ttl, cnt_name, dur: title, content name and duration of the item member.
+    param descr: description of the file's variant. ('' when the item member
+                    only has one file)
+    """
+    with open_manifest() as manifest:
+        manifest.execute("INSERT OR REPLACE INTO catalog_entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (boxx_site, item, position, ttl, cnt_name, dur, descr))
+
+
 def ensure_save_dir_exists(boxx_site: str, item: str) -> bool:
     """
     Make sure the directory to save items from this item exists.
@@ -475,12 +3193,13 @@ def ensure_save_dir_exists(boxx_site: str, item: str) -> bool:
 
     # AN EXISTING, BUT EMPTY DIRECTORY IS CONSIDERED NOT EXISTING.
     if exist_before:
-        file_list = os.listdir()
+        file_list = os.listdir(pth)
         exist_before = len(file_list) > 0
 
     return exist_before
 
 
+@traced
 def file_exists(boxx_site: str, item: str, filename: str) -> bool:
     """
     Does the file for this file already exist?
@@ -491,10 +3210,9 @@ def file_exists(boxx_site: str, item: str, filename: str) -> bool:
     return: True if the file already exists (and, therefore doesn't
                 need to be downloaded).
     """
-    dst_dir = get_save_dir(boxx_site, item)
-    path = os.path.join(dst_dir, clean(filename)) + ".*"
-    filenames = glob.glob(path)
-    return len(filenames) > 0
+    row = open_manifest().execute("SELECT 1 FROM files WHERE site = ? AND item = ? AND file = ?",
+                                  (boxx_site, item, clean(filename))).fetchone()
+    return row is not None
 
 
 def get_save_dir(boxx_site: str, item: str) -> str:
@@ -512,7 +3230,8 @@ def get_save_dir(boxx_site: str, item: str) -> str:
 def usage() -> None:
     """ Display simple usage to stdout and exit program. """
     print("USAGE:")
-    print("    boxx-download.bash [site] [product] [file]")
+    print("    boxx-download.bash [options] [site] [product] [file]")
+    print("    boxx-download.bash --help")
     print()
     print("EXAMPLES:")
     print("    boxx-download.bash")
@@ -541,38 +3260,81 @@ def verify_boxx_site(site: str) -> None:
         usage()
 
 
-def read_command_line() -> (str, str, str):
+def read_command_line() -> argparse.Namespace:
     """
     Parse and verify the command line arguments looking for a
     site and item provided by the user.
 
     If the command line is invalid, print usage and quit program.
 
-    return: A triple of the site, item, and file number
-                provided on the command-line.
-                None indicates the user did not provide a
-                value and wants them all.
+    return: The parsed command line.  site, item and file are
+                None when the user did not provide a value
+                and wants them all.
     """
-    site = None
-    item = None
-    file = None
-
-    if len(sys.argv) > 5:
-        print("Too many command line arguments.")
-        print()
-        usage()
+    parser = argparse.ArgumentParser(prog="boxx-download.bash",
+                                     usage="%(prog)s [options] [site] [product] [file]")
+    parser.add_argument("site", nargs="?", help="only visit this boxx site")
+    parser.add_argument("item", nargs="?", help="only download this product")
+    parser.add_argument("file", nargs="?", help="skip the product's files until one contains this")
+    parser.add_argument("--rebuild-manifest", action="store_true",
+                        help="rebuild the manifest of downloaded files from base-dir")
+    parser.add_argument("--refresh-catalog", action="store_true",
+                        help='read "My Downloads" again even if the cached list is recent')
+    parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="process up to N boxx sites at the same time, each with its own browser")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only show what would be downloaded and about how long it would take")
+    parser.add_argument("--priority", default=PLAN_PRIORITY, metavar="RULES",
+                        help="download order, e.g. newest,smallest (newest, oldest, smallest, largest, catalog)")
+    parser.add_argument("--first", nargs="+", default=[], metavar="ITEM",
+                        help="download these items before anything else")
+    parser.add_argument("--include", action="append", metavar="RULE",
+                        help="only download matching files, e.g. variant:4k-prores or volume:3-10 (repeatable)")
+    parser.add_argument("--exclude", action="append", metavar="RULE",
+                        help="don't download matching files, e.g. title:*teaser* or duration:<=5 (repeatable)")
+    parser.add_argument("--resume", action="store_true",
+                        help="carry on with the last run's plan where it stopped (without planning again)")
+    parser.add_argument("--index", action="store_true",
+                        help="bring the media index of base-dir up to date, then stop")
+    parser.add_argument("--query", nargs="+", metavar="RULE",
+                        help="list the indexed files matching the rules (see [FILTERS]), then stop")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="save where the time went as a Chrome trace (for https://ui.perfetto.dev)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="sample the Python stacks while running and save them as folded stacks")
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep running, checking for new purchases every poll-interval-in-minutes")
+    parser.add_argument("--control", choices=["status", "pause", "resume", "trigger", "stop"],
+                        help="send a command to the running daemon")
+    args = parser.parse_args()
+
+    if args.daemon and args.dry_run:
+        parser.error("--daemon and --dry-run can't be used together")
+
+    # THE COMMAND LINE'S RULES REPLACE THE ONES IN THE [FILTERS] SECTION
+    try:
+        args.selector = FileSelector(
+            [parse_rule(rule) for rule in args.include or FILTER_INCLUDE if rule.strip()],
+            [parse_rule(rule) for rule in args.exclude or FILTER_EXCLUDE if rule.strip()])
+    except ValueError as exc:
+        parser.error(str(exc))
 
-    if len(sys.argv) >= 2:
-        site = sys.argv[1]
-        verify_boxx_site(site)
+    # --query HAS A FEW MORE FIELDS: WHAT THE MEDIA INDEX KNOWS
+    try:
+        args.query = FileSelector([parse_rule(rule, tuple(MEDIA_COLUMNS)) for rule in args.query], []) \
+            if args.query else None
+    except ValueError as exc:
+        parser.error(str(exc))
 
-    if len(sys.argv) >= 3:
-        item = sys.argv[2]
+    args.priority = [rule.strip() for rule in args.priority.split(",") if rule.strip()]
+    for rule in args.priority:
+        if rule not in ("newest", "oldest", "smallest", "largest", "catalog"):
+            parser.error(f"unknown priority rule: {rule}")
 
-    if len(sys.argv) == 4:
-        file = sys.argv[3]
+    if args.site is not None:
+        verify_boxx_site(args.site)
 
-    return site, item, file
+    return args
 
 
 def filter_items(all_item_pgs: [(str, str)], valid_items: [str]) -> [(str, str)]:
@@ -593,17 +3355,1070 @@ def filter_items(all_item_pgs: [(str, str)], valid_items: [str]) -> [(str, str)]
     return filtered_list
 
 
+class PlanEntry(NamedTuple):
+    """
+    A file the plan will download, or an item whose files can only be
+    listed by the browser (filename None).
+    """
+    site: str
+    item: str
+    url: str
+    filename: str | None
+    dl_url: str | None
+    files: float
+    size: float
+
+
+def open_site(browser: LazyBrowser, boxx_site: str, args: argparse.Namespace,
+              http: urllib3.PoolManager | None = None) -> (urllib3.PoolManager, [(str, str)]):
+    """
+    Get a login session for a boxx site and its list of purchased items.
+    With catalog-engine=http the saved session is used without the browser
+    and "My Downloads" is read over HTTP.
+
+    param browser: object to interact with the browser for us.
+    param boxx_site: which boxx site to visit.
+    param args: the command line. (See read_command_line())
+    param http: the session from the daemon's last poll of the site.  When
+                    the site still accepts it, reading "My Downloads" is the
+                    only request made.
+    return: connection pool holding the login session, and the item pages.
+    """
+    print()
+    print(f"*** *** *** PLANNING {boxx_site.upper()} *** *** ***")
+    print()
+    with STATS_LOCK:
+        site_metrics(boxx_site)
+    browser.use_site(boxx_site)
+    if http is not None and CATALOG_ENGINE == "http":
+        with timed("my-downloads", boxx_site):
+            item_pgs = read_catalog_over_http(http, boxx_site)
+        if item_pgs is not None:
+            save_catalog(boxx_site, item_pgs)
+            return http, item_pgs
+
+    http = open_session(browser, boxx_site)
+
+    # GET A LIST OF ALL PURCHASED ITEMS.  READ "MY DOWNLOADS" ONLY
+    # WHEN THE CACHED LIST IS TOO OLD.
+    item_pgs = None if args.refresh_catalog else load_catalog(boxx_site)
+    if item_pgs is None:
+        with timed("my-downloads", boxx_site):
+            if CATALOG_ENGINE == "http":
+                item_pgs = read_catalog_over_http(http, boxx_site)
+            if item_pgs is None:
+                item_pgs = get_item_download_pages(browser, boxx_site)
+        save_catalog(boxx_site, item_pgs)
+    else:
+        print(f"    Using {len(item_pgs)} cached items. (--refresh-catalog to read them again)")
+
+    return http, item_pgs
+
+
+def open_session(browser: LazyBrowser, boxx_site: str) -> urllib3.PoolManager:
+    """
+    Get a login session for a boxx site.  With catalog-engine=http the
+    last run's session is used without the browser while the site still
+    accepts it.
+
+    param browser: object to interact with the browser for us.
+    param boxx_site: which boxx site to visit.
+    return: connection pool holding the login session.
+    """
+    # PICK UP THE LAST RUN'S SESSION.  THE BROWSER ONLY LOGS IN WHEN
+    # THE SITE NO LONGER ACCEPTS IT (OR THE PAGES NEED THE BROWSER).
+    with timed("login", boxx_site):
+        session = load_session(boxx_site) if CATALOG_ENGINE == "http" else None
+        if session is not None and not session_valid(session["cookies"], boxx_site):
+            browser.expire_login()
+            session = None
+    if session is not None:
+        print("Reusing saved login session (without the browser) ...")
+        record_event(boxx_site, "login", ok=True, reused=True, engine="http")
+    else:
+        session = browser_session(browser)
+    return build_http_session(session)
+
+
+def resume_site(boxx_site: str) -> tuple[list[PlanEntry], dict] | None:
+    """
+    Read what is left of the site's last plan from the run journal.  Files
+    that were downloaded and items the browser finished are left out.  An
+    item the browser was part way through continues with the item member
+    it was downloading.
+
+    param boxx_site: which boxx site to resume.
+    return: the rest of the plan, and the item member to start each
+                browser item at (see download_item_files()).  None when the
+                last plan was finished (or there isn't one).
+    """
+    plan = None
+    try:
+        with open(JOURNAL_FILE, encoding="utf-8") as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # THE LAST LINE OF A RUN THAT DIED WHILE WRITING IT.
+                    continue
+                if record["site"] != boxx_site:
+                    continue
+                if record["entry"] == "plan":
+                    plan = {"entries": record["plan"], "clicked": [], "finished": set(), "items": set(), "done": False}
+                elif plan is None:
+                    continue
+                elif record["entry"] == "clicked":
+                    plan["clicked"].append((record["item"], record["file"], record["member"]))
+                elif record["entry"] in ("completed", "moved"):
+                    plan["finished"].add((record["item"], record["file"]))
+                elif record["entry"] == "item-done":
+                    plan["items"].add(record["item"])
+                elif record["entry"] == "done":
+                    plan["done"] = True
+    except FileNotFoundError:
+        return None
+    if plan is None or plan["done"]:
+        return None
+
+    entries = [PlanEntry(boxx_site, *row) for row in plan["entries"]]
+    entries = [entry for entry in entries if entry.item not in plan["items"]
+               and (entry.item, entry.filename) not in plan["finished"]]
+
+    # START EACH UNFINISHED BROWSER ITEM AT THE FIRST MEMBER WHOSE
+    # DOWNLOAD DIDN'T FINISH, OR THE LAST ONE CLICKED.
+    start_at = {}
+    for item, filename, member in plan["clicked"]:
+        if start_at.get(item, (None, False))[1]:
+            continue
+        start_at[item] = (member, (item, filename) not in plan["finished"])
+    return entries, {(boxx_site, item): member for item, (member, _) in start_at.items()}
+
+
+def journal_plan(plan: [PlanEntry], site_list: [str]) -> None:
+    """ Write each site's part of a new plan to the run journal. """
+    for boxx_site in site_list:
+        journal(boxx_site, "plan", plan=[entry[1:] for entry in plan if entry.site == boxx_site])
+
+
+@traced
+def plan_site(browser: LazyBrowser, boxx_site: str, args: argparse.Namespace,
+              http: urllib3.PoolManager | None = None, only_new: bool = False) \
+        -> (urllib3.PoolManager, [PlanEntry]):
+    """
+    List every file that is missing from a single boxx site, without
+    downloading anything.  Items whose files are all in the manifest are
+    not looked at again.
+
+    param browser: object to interact with the browser for us.
+    param boxx_site: which boxx site to visit.
+    param args: the command line. (See read_command_line())
+    param http: the session from the daemon's last poll of the site. (See open_site())
+    param only_new: only plan the items that weren't in the cached catalog.
+    return: connection pool holding the login session, and the site's
+                part of the plan (in catalog order).
+    """
+    known = {item for _, item in open_manifest().execute(
+        "SELECT url, item FROM catalog_items WHERE site = ?", (boxx_site,))} if only_new else set()
+    http, item_pgs = open_site(browser, boxx_site, args, http)
+    file_size, item_files = estimate_file_size(boxx_site), estimate_item_files(boxx_site)
+
+    item_pgs_left = []
+    complete = left_out = old = 0
+    for (url, item) in filter_items(item_pgs, [args.item]):
+        if item in known:
+            old += 1
+            continue
+
+        # ITEMS THE FILTERS DON'T WANT ARE LEFT OUT BEFORE THEIR PAGE IS READ
+        if not selected(args.selector, item=item, volume=item_volume(item)):
+            left_out += 1
+            continue
+        if args.item is None and item_complete(boxx_site, item, args.selector):
+            complete += 1
+            continue
+        item_pgs_left.append((url, item))
+
+    # READ THE ITEM PAGES crawl-workers AT A TIME.  (THE DOWNLOAD LIMIT ONLY
+    # APPLIES TO FILES, NOT PAGES)  THE FILES OF ITEMS THE HTTP PAGE DOESN'T
+    # SHOW (OR WHEN ONLY SOME OF THE FILES ARE WANTED) ARE LISTED BY THE
+    # BROWSER WHEN THE PLAN GETS TO THEM.
+    plan = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=CRAWL_WORKERS) as crawlers:
+        if args.file is None and CATALOG_ENGINE == "http":
+            listings = crawlers.map(lambda item_pg: crawl_item_page(http, item_pg[0], boxx_site, item_pg[1],
+                                                                    args.selector), item_pgs_left)
+        else:
+            listings = [None] * len(item_pgs_left)
+
+        for (url, item), files in zip(item_pgs_left, listings):
+            plan.extend(plan_item(boxx_site, url, item, files, args.selector, file_size, item_files))
+
+        # ORDERING BY SIZE NEEDS THE SIZE OF EACH FILE, NOT THE AVERAGE.
+        if {"smallest", "largest"} & set(args.priority):
+            plan = list(crawlers.map(lambda entry: measure_plan_entry(http, entry), plan))
+
+    print((f"    {len(item_pgs) - old} new purchases: " if only_new else "    ")
+          + f"{complete} items already downloaded, {len({entry.item for entry in plan})} with files missing"
+          + (f", {left_out} left out by the filters." if left_out else "."))
+    return http, plan
+
+
+def plan_item(boxx_site: str, url: str, item: str, files: list[tuple] | None, selector: FileSelector,
+              file_size: float, item_files: float) -> [PlanEntry]:
+    """
+    The plan's entries for one item: each wanted file that is missing, or
+    the whole item when its files aren't known.
+
+    param boxx_site: which boxx site the item is from.
+    param url: url of the item's download page.
+    param item: the item's name.
+    param files: what list_item_files_over_http() found. (None = not known)
+    param selector: the files wanted.
+    param file_size: average size of a file.  (For the estimates)
+    param item_files: average number of files of an item.
+    return: the item's part of the plan.
+    """
+    if files is None:
+        return [PlanEntry(boxx_site, item, url, None, None, item_files, item_files * file_size)]
+
+    plan = []
+    for _, ttl, cnt_name, dur, descr, dl_url in files:
+        filename = member_filename(ttl, cnt_name, dur, descr)
+        if not selected(selector, item=item, **member_fields(ttl, cnt_name, dur),
+                        **({"variant": descr} if descr else {})):
+            continue
+        if file_exists(boxx_site, item, filename):
+            with STATS_LOCK:
+                RUN_STATS["skipped"] += 1
+        else:
+            plan.append(PlanEntry(boxx_site, item, url, filename, dl_url, 1, file_size))
+    return plan
+
+
+def remote_file_size(http: urllib3.PoolManager, boxx_site: str, item: str, filename: str,
+                     dl_url: str) -> int | None:
+    """
+    The size the site gives for a file.  The size is taken from the cache
+    (until the item's page is read again), a partial download of the file
+    or the same clip downloaded from another item or site.  Otherwise the
+    site is asked with a HEAD request, but only with head-requests=Yes.
+
+    param http: connection pool holding the user's login session.
+    param boxx_site: which boxx site the file is from.
+    param item: the item the file belongs to.
+    param filename: the file's name. (See member_filename())
+    param dl_url: url of the file.
+    return: the file's size in bytes. (None = the site didn't say)
+    """
+    manifest = open_manifest()
+    row = manifest.execute("SELECT size FROM file_sizes WHERE site = ? AND item = ? AND file = ?",
+                           (boxx_site, item, clean(filename))).fetchone()
+    if row is not None:
+        return row[0]
+
+    # AN EARLIER ATTEMPT THAT WAS CUT OFF ALREADY GOT THE SIZE.
+    info = load_staged_info(get_staged_path(boxx_site, item, filename))
+    if info and info.get("expected_size", -1) >= 0:
+        return info["expected_size"]
+    row = manifest.execute("SELECT size FROM files WHERE file = ? AND size IS NOT NULL",
+                           (clean(filename),)).fetchone()
+    if row is not None:
+        return row[0]
+    if not HEAD_REQUESTS:
+        return None
+
+    try:
+        resp = http.request("HEAD", dl_url)
+    except urllib3.exceptions.HTTPError:
+        return None
+    size = int(resp.headers.get("Content-Length", -1))
+    if resp.status != 200 or size < 0:
+        return None
+    with manifest:
+        manifest.execute("INSERT OR REPLACE INTO file_sizes VALUES (?, ?, ?, ?)",
+                         (boxx_site, item, clean(filename), size))
+    return size
+
+
+def measure_plan_entry(http: urllib3.PoolManager | None, entry: PlanEntry) -> PlanEntry:
+    """
+    Replace the estimated size of a plan entry with the file's real size
+    when the site will say what it is.  (For one of the threads reading
+    item pages, see plan_site())  The thread's manifest connection is
+    closed afterwards.
+    """
+    if http is None or entry.dl_url is None:
+        return entry
+    try:
+        size = remote_file_size(http, entry.site, entry.item, entry.filename, entry.dl_url)
+    finally:
+        close_manifest()
+    return entry if size is None else entry._replace(size=size)
+
+
+def item_volume(item: str) -> int:
+    """ The volume number at the start of an item's name. (See item_pages_from()) """
+    prefix = item.split("-", 1)[0]
+    return int(prefix) if prefix.isdigit() else 0
+
+
+def order_plan(plan: [PlanEntry], rules: [str], first: [str]) -> [PlanEntry]:
+    """
+    Put the plan in the order it will be downloaded.  Items named with
+    --first come first, then the priority rules decide, in turn:
+        newest / oldest:    highest / lowest volume number first
+        smallest / largest: smallest / largest file first (the size the
+                            site gave for the file, see measure_plan_entry(),
+                            or else the site's average)
+        catalog:            the order of the "My Downloads" page (the default)
+
+    param plan: every missing file, in catalog order.
+    param rules: the priority rules to apply.
+    param first: items to download before anything else.
+    return: the plan in download order.
+    """
+    rule_keys = {
+        "newest": lambda entry: -item_volume(entry.item),
+        "oldest": lambda entry: item_volume(entry.item),
+        "smallest": lambda entry: entry.size / max(entry.files, 1),
+        "largest": lambda entry: -entry.size / max(entry.files, 1),
+        "catalog": lambda entry: 0,
+    }
+    return sorted(plan, key=lambda entry: (entry.item not in first,
+                                           *(rule_keys[rule](entry) for rule in rules)))
+
+
+def estimate_file_size(boxx_site: str) -> float:
+    """ Average size of the files downloaded so far from a site (or any site). """
+    manifest = open_manifest()
+    size = manifest.execute("SELECT AVG(size) FROM files WHERE site = ?", (boxx_site,)).fetchone()[0] \
+        or manifest.execute("SELECT AVG(size) FROM files").fetchone()[0]
+    return size or 0.0
+
+
+def estimate_item_files(boxx_site: str) -> float:
+    """ Average number of files on an item's download page. """
+    row = open_manifest().execute(
+        "SELECT COUNT(*) * 1.0 / COUNT(DISTINCT item) FROM item_files WHERE site = ?", (boxx_site,)).fetchone()
+    return row[0] or 1.0
+
+
+def load_throughput(boxx_site: str) -> float | None:
+    """ Bytes per second the site's downloads have averaged. (None if not known yet) """
+    row = open_manifest().execute("SELECT bytes, seconds FROM transfers WHERE site = ?", (boxx_site,)).fetchone()
+    return row[0] / row[1] if row and row[1] > 0 else None
+
+
+def record_throughput() -> None:
+    """ Add this run's bytes and transfer time for each site to the throughput history. """
+    with open_manifest() as manifest:
+        for boxx_site, metrics in RUN_STATS["sites"].items():
+            seconds = metrics["phases"].get("transfer", {}).get("sum", 0.0)
+            if metrics["bytes"] > 0 and seconds > 0:
+                manifest.execute(
+                    """
+                    INSERT INTO transfers VALUES (?, ?, ?)
+                    ON CONFLICT (site) DO UPDATE SET bytes = bytes + excluded.bytes,
+                                                     seconds = seconds + excluded.seconds
+                    """, (boxx_site, metrics["bytes"], seconds))
+
+
+def format_bytes(size: float) -> str:
+    """ A size for people to read.  (0 means nothing has been downloaded to go by yet) """
+    if size <= 0:
+        return "size unknown"
+    for unit in ("bytes", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"about {size:.0f} {unit}" if unit == "bytes" else f"about {size:.1f} {unit}"
+        size /= 1024
+    return f"about {size:.1f} TB"
+
+
+def format_duration(seconds: float) -> str:
+    """ A duration for people to read. """
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m {seconds:02d}s"
+
+
+def print_plan(plan: [PlanEntry], jobs: int, dry_run: bool) -> None:
+    """
+    Show how much is left to download and about how long it will take.
+    The download limit allows so many downloads per window (less the ones
+    already used) and the transfer time comes from the site's past
+    throughput, so the estimate is the larger of the two.  Sizes are
+    averages of the files downloaded before.
+
+    param plan: the ordered plan.
+    param jobs: how many sites are processed at the same time.
+    param dry_run: list every entry of the plan too.
+    """
+    etas = []
+    print()
+    print(f"*** *** *** PLAN: {sum(entry.files for entry in plan):.0f} files to download, "
+          f"{format_bytes(sum(entry.size for entry in plan))} *** *** ***")
+    for boxx_site in dict.fromkeys(entry.site for entry in plan):
+        entries = [entry for entry in plan if entry.site == boxx_site]
+        files = sum(entry.files for entry in entries)
+        size = sum(entry.size for entry in entries)
+        throughput = load_throughput(boxx_site)
+        transfer = size / throughput if throughput else 0.0
+        available = max(0, RATE_LIMIT_COUNT - len(load_download_history(boxx_site)))
+        limit = math.ceil(max(0.0, files - available) / RATE_LIMIT_COUNT) * RATE_LIMIT_WINDOW
+        etas.append(max(transfer, limit))
+        unlisted = sum(entry.filename is None for entry in entries)
+        print(f"    {boxx_site}: {files:.0f} files{' (estimated)' if unlisted else ''}, "
+              f"{format_bytes(size)}, about {format_duration(etas[-1])} "
+              f"(download limit {format_duration(limit)}, transfer "
+              + (f"{format_duration(transfer)} at {format_bytes(throughput)}/s)" if throughput else "unknown)"))
+        if unlisted:
+            print(f"        {unlisted} items whose files are listed by the browser when their turn comes.")
+
+    if etas:
+        total = sum(etas) if jobs <= 1 else max(max(etas), sum(etas) / jobs)
+        print(f"    About {format_duration(total)} in all.")
+
+    if dry_run:
+        for number, entry in enumerate(plan, 1):
+            print(f"    {number:5d}. {entry.site} {entry.item} {entry.filename or '(every missing file)'}")
+
+
+@traced
+def execute_plan(browser: LazyBrowser, plan: [PlanEntry], sessions: dict, args: argparse.Namespace,
+                 pause_point: Callable[[], bool] | None = None, start_at: dict | None = None) -> None:
+    """
+    Download the plan's files in order.  Files with a known url are
+    streamed over HTTP; the others (and items whose files aren't listed)
+    are downloaded by the browser a whole item at a time.
+
+    param browser: object to interact with the browser for us.
+    param plan: the ordered plan.
+    param sessions: connection pool holding the login session of each site.
+    param args: the command line. (See read_command_line())
+    param pause_point: called before each download.  It may wait (while the
+                    daemon is paused) and returns False to stop early.
+    param start_at: the item member to start each browser item at, by
+                    (site, item).  (See resume_site())
+    """
+    start_at = start_at or {}
+    # FINISH ANY DOWNLOADS AN EARLIER RUN DIDN'T
+    for boxx_site, http in sessions.items():
+        resume_staged_downloads(http if DL_ENGINE == "http" else None, boxx_site)
+    with STATS_LOCK:
+        RETRY_QUEUE.clear()
+
+    # EACH SITE'S FAILED DOWNLOADS ARE TRIED AGAIN RIGHT AFTER ITS LAST
+    # ENTRY IN THE PLAN.
+    last_entries = {entry.site: number for number, entry in enumerate(plan, 1)}
+    done_items = set()
+    for number, entry in enumerate(plan, 1):
+        if pause_point is not None and not pause_point():
+            print("    Stopping before the rest of the plan.")
+            return
+        if (entry.site, entry.item) not in done_items:
+            download_plan_entry(browser, entry, number, len(plan), sessions, args, start_at, done_items)
+
+        if last_entries[entry.site] == number:
+            if not retry_failed_downloads(browser, sessions, args, pause_point, entry.site):
+                return
+            journal(entry.site, "done")
+
+    # SITES WITH NOTHING TO DOWNLOAD ARE DONE TOO.
+    for boxx_site in sessions:
+        if boxx_site not in last_entries:
+            journal(boxx_site, "done")
+
+
+def download_plan_entry(browser: LazyBrowser, entry: PlanEntry, number: int, total: int, sessions: dict,
+                        args: argparse.Namespace, start_at: dict, done_items: set) -> None:
+    """
+    Download one entry of the plan.  (See execute_plan())
+
+    param number, total: where the entry is in the plan.  (For the progress)
+    param done_items: the (site, item)s the browser has been through.  The
+                    entry's item is added when the browser downloads it.
+    """
+    # DOWNLOAD FILES OVER HTTP WITH THE BROWSER'S SESSION
+    # WHEN CONFIGURED TO.  THE BROWSER IS STILL USED FOR FILES
+    # WHOSE URLS CAN'T BE FOUND.
+    dl_http = sessions[entry.site] if DL_ENGINE == "http" else None
+    browser.use_site(entry.site)
+    ensure_save_dir_exists(entry.site, entry.item)
+    if entry.filename is not None:
+        print(f"    [{number}/{total}] {entry.site} {entry.item}")
+        print(f"        Downloading: {entry.filename} ...")
+        if file_exists(entry.site, entry.item, entry.filename) \
+                or fetch_file(dl_http, entry.dl_url, entry.item, entry.site, entry.filename):
+            return
+
+    # THE BROWSER DOWNLOADS EVERYTHING STILL MISSING FROM THE ITEM.
+    print(f"    [{number}/{total}] {entry.site} {entry.item} (with the browser)")
+    print(f"        *** Download url: {entry.url} ***")
+    print(f"        *** Save to: {get_save_dir(entry.site, entry.item)} ***")
+    download_item_files(browser, dl_http, entry.url, entry.site, entry.item,
+                        start_at.get((entry.site, entry.item), args.file), args.selector)
+    done_items.add((entry.site, entry.item))
+    journal_item_done(entry.site, entry.item)
+
+
+@traced
+def retry_failed_downloads(browser: LazyBrowser, sessions: dict, args: argparse.Namespace,
+                           pause_point: Callable[[], bool] | None = None, boxx_site: str | None = None) -> bool:
+    """
+    Download the items of the site's failed downloads in RETRY_QUEUE
+    again, up to retry-attempts times.  The wait before each attempt doubles,
+    starting at retry-backoff-in-seconds.  The downloads still take a
+    slot in the site's download limit.  Whatever fails again is queued
+    again, and is left in RUN_STATS["failed"] once the attempts run out.
+
+    param browser: object to interact with the browser for us.
+    param sessions: connection pool holding the login session of each site.
+    param args: the command line. (See read_command_line())
+    param pause_point: see execute_plan().
+    param boxx_site: the site whose downloads to retry.  (None for all sites)
+    return: False when pause_point stopped the retries early.
+    """
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        with STATS_LOCK:
+            retries = [entry for entry in RETRY_QUEUE if boxx_site in (None, entry.site)]
+            RETRY_QUEUE[:] = [entry for entry in RETRY_QUEUE if entry not in retries]
+        if not retries:
+            return True
+
+        delay = RETRY_BACKOFF * 2 ** (attempt - 1)
+        print(f"    Retrying {len(retries)} failed downloads in {format_duration(delay)} "
+              f"(attempt {attempt} of {RETRY_ATTEMPTS}).")
+        with timed("retry-backoff"):
+            time.sleep(delay)
+
+        # ONE VISIT TO EACH ITEM'S PAGE DOWNLOADS ALL OF ITS MISSING FILES.
+        for item_site, item, url in dict.fromkeys((entry.site, entry.item, entry.url) for entry in retries):
+            if pause_point is not None and not pause_point():
+                print("    Stopping before the rest of the retries.")
+                return False
+
+            # THE ITEM'S EARLIER FAILURES ONLY STAND IF THEY HAPPEN AGAIN.
+            with STATS_LOCK:
+                for entry in retries:
+                    if (entry.site, entry.item) == (item_site, item):
+                        RUN_STATS["failed"].remove(f"{entry.message} ({entry.reason})")
+            record_event(item_site, "retry", item=item, attempt=attempt)
+
+            print(f"    [retry {attempt}/{RETRY_ATTEMPTS}] {item_site} {item} (with the browser)")
+            browser.use_site(item_site)
+            download_item_files(browser, sessions[item_site] if DL_ENGINE == "http" else None,
+                                url, item_site, item, args.file, args.selector)
+            journal_item_done(item_site, item)
+    return True
+
+
+def journal_item_done(boxx_site: str, item: str) -> None:
+    """
+    Journal that the browser is done with an item, unless some of its
+    files are waiting to be tried again.  (--resume would skip them)
+    """
+    with STATS_LOCK:
+        failed = any((entry.site, entry.item) == (boxx_site, item) for entry in RETRY_QUEUE)
+    if not failed:
+        journal(boxx_site, "item-done", item=item)
+
+
+def sync_sites(browser: LazyBrowser, site_list: [str], args: argparse.Namespace, sessions: dict,
+               only_new: bool = False, pause_point: Callable[[], bool] | None = None) -> None:
+    """
+    Plan every site first, then download the missing files in priority order.
+
+    param browser: object to interact with the browser for us.
+    param site_list: the boxx sites to visit.
+    param args: the command line. (See read_command_line())
+    param sessions: connection pool holding the login session of each site.
+                    Sessions from an earlier call are used again (and the
+                    new ones are put here).
+    param only_new: only plan the items that weren't in the cached catalog.
+    param pause_point: see execute_plan().
+    """
+    # WITH --resume, SITES WHOSE LAST PLAN DIDN'T FINISH CARRY ON WITH
+    # IT WITHOUT READING ANY PAGES.  THE OTHERS ARE PLANNED AS USUAL.
+    resumed, start_at, planned, plan = [], {}, [], []
+    for boxx_site in site_list:
+        left = resume_site(boxx_site) if args.resume else None
+        if left is not None:
+            print(f"*** *** *** RESUMING {boxx_site.upper()}: {len(left[0])} plan entries left *** *** ***")
+            sessions[boxx_site] = sessions.get(boxx_site) or open_session(browser, boxx_site)
+            resumed.extend(left[0])
+            start_at.update(left[1])
+        else:
+            sessions[boxx_site], site_plan = plan_site(browser, boxx_site, args, sessions.get(boxx_site), only_new)
+            planned.append(boxx_site)
+            plan.extend(site_plan)
+    plan = order_plan(plan, args.priority, args.first)
+    print_plan(resumed + plan, 1, args.dry_run)
+    if not args.dry_run:
+        journal_plan(plan, planned)
+        execute_plan(browser, resumed + plan, sessions, args, pause_point, start_at)
+
+
+def sync_site(browser: LazyBrowser, boxx_site: str, args: argparse.Namespace) -> None:
+    """
+    Plan and download everything that is missing from a single boxx site.
+
+    param browser: object to interact with the browser for us.
+    param boxx_site: which boxx site to visit.
+    param args: the command line. (See read_command_line())
+    """
+    sync_sites(browser, [boxx_site], args, {})
+
+
+def run_site(boxx_site: str, args: argparse.Namespace) -> dict:
+    """
+    Worker process for a single boxx site.  The site gets its own browser
+    and its own subdirectory of download-dir so it doesn't interfere with
+    the other sites.  (Each site already has its own download limit.)
+
+    param boxx_site: which boxx site to visit.
+    param args: the command line. (See read_command_line())
+    return: RUN_STATS for the site (with its --trace spans).
+    """
+    global DOWNLOAD_DIR
+
+    # A WORKER PROCESS MAY BE REUSED FOR ANOTHER SITE.  START FRESH.
+    RUN_STATS.update(downloaded=0, skipped=0, linked=0, failed=[], waits={}, seconds={}, sites={})
+    if args.trace:
+        start_tracing()
+    DOWNLOAD_DIR = os.path.join(os.path.join(CONFIG.get(SECTION_DIRS, "base-dir"), ".incoming")
+                                if STAGE_ON_BASE_DIR else CONFIG.get(SECTION_DIRS, "download-dir"),
+                                boxx_site)
+    Path(DOWNLOAD_DIR).mkdir(parents=True, exist_ok=True)
+    clean_download_dir()
+    requeue_outbox()
+
+    browser = LazyBrowser(boxx_site)
+    try:
+        sync_site(browser, boxx_site, args)
+
+    # REPORT THE PROBLEM TO THE PARENT INSTEAD OF LOSING THE
+    # WORK ALREADY DONE FOR THIS SITE.
+    except Exception as err:  # pylint: disable=broad-except
+        record_failure(boxx_site, "stopped", f"{boxx_site.upper()} stopped early: {err!r}")
+
+    finally:
+        browser.quit()
+        stop_mover()
+
+    # THE SPANS GO BACK WITH THE STATS.  (SEE merge_stats())
+    return dict(RUN_STATS, trace=TRACE_EVENTS or [])
+
+
+def run_sites_in_parallel(site_list: [str], args: argparse.Namespace) -> None:
+    """
+    Process several boxx sites at once, one worker process per site, and
+    combine their results.
+
+    param site_list: the boxx sites to visit.
+    param args: the command line. (See read_command_line())
+    """
+    # THE WORKERS OPEN THE MANIFEST FOR THEMSELVES.
+    close_manifest()
+
+    print(f"Processing {len(site_list)} sites, {args.jobs} at a time.")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(run_site, boxx_site, args): boxx_site
+                   for boxx_site in site_list}
+        for future in concurrent.futures.as_completed(futures):
+            boxx_site = futures[future]
+            try:
+                stats = future.result()
+            except Exception as err:  # pylint: disable=broad-except
+                stats = {"downloaded": 0, "skipped": 0, "linked": 0,
+                         "failed": [f"{boxx_site.upper()} worker died: {err!r}"],
+                         "waits": {}, "seconds": {},
+                         "sites": {boxx_site: {"files": 0, "bytes": 0, "failures": {"worker-died": 1}, "phases": {}}}}
+                print_error(f"FAIL: {boxx_site.upper()} worker died: {err!r}")
+                record_event(boxx_site, "failure", reason="worker-died", message=stats["failed"][0])
+
+            merge_stats(stats)
+            print(f"=== {boxx_site.upper()} finished: {stats['downloaded']} downloaded, "
+                  f"{stats['skipped']} already there, {len(stats['failed'])} failed. ===")
+
+
+def merge_stats(stats: dict) -> None:
+    """ Add the RUN_STATS of a worker process to this process's RUN_STATS. """
+    RUN_STATS["downloaded"] += stats["downloaded"]
+    RUN_STATS["skipped"] += stats["skipped"]
+    RUN_STATS["linked"] += stats["linked"]
+    RUN_STATS["failed"].extend(stats["failed"])
+    if TRACE_EVENTS is not None:
+        TRACE_EVENTS.extend(stats.get("trace", []))
+    for name, (count, total, longest, timeouts) in stats["waits"].items():
+        my_count, my_total, my_longest, my_timeouts = RUN_STATS["waits"].get(name, (0, 0.0, 0.0, 0))
+        RUN_STATS["waits"][name] = (my_count + count, my_total + total,
+                                    max(my_longest, longest), my_timeouts + timeouts)
+    for phase, seconds in stats["seconds"].items():
+        RUN_STATS["seconds"][phase] = RUN_STATS["seconds"].get(phase, 0.0) + seconds
+    for boxx_site, metrics in stats["sites"].items():
+        my_metrics = site_metrics(boxx_site)
+        my_metrics["files"] += metrics["files"]
+        my_metrics["bytes"] += metrics["bytes"]
+        for reason, count in metrics["failures"].items():
+            my_metrics["failures"][reason] = my_metrics["failures"].get(reason, 0) + count
+        for phase, histogram in metrics["phases"].items():
+            my_histogram = my_metrics["phases"].setdefault(
+                phase, {"buckets": [0] * len(LATENCY_BUCKETS), "count": 0, "sum": 0.0})
+            my_histogram["buckets"] = [mine + theirs for mine, theirs in zip(my_histogram["buckets"],
+                                                                               histogram["buckets"])]
+            my_histogram["count"] += histogram["count"]
+            my_histogram["sum"] += histogram["sum"]
+
+
+def print_summary() -> None:
+    """ Report what happened during the run. """
+    print()
+    print(f"*** *** *** {RUN_STATS['downloaded']} downloaded, {RUN_STATS['linked']} linked to earlier downloads, "
+          f"{RUN_STATS['skipped']} already there, {len(RUN_STATS['failed'])} failed *** *** ***")
+    for name, (count, total, longest, timeouts) in sorted(RUN_STATS["waits"].items()):
+        print(f"    WAIT {name}: {count} waits, average {total / count:.2f}s, longest {longest:.2f}s, "
+              f"{timeouts} reached the {WAIT_CEILINGS[name]:.0f}s ceiling")
+    for phase, seconds in sorted(RUN_STATS["seconds"].items()):
+        print(f"    TIME {phase}: {seconds:.1f}s")
+    for failure in RUN_STATS["failed"]:
+        print(f"    FAILED: {failure}")
+
+
+def write_prometheus_file(started: float) -> None:
+    """
+    Write the run's metrics, labelled by boxx site, for node_exporter's
+    textfile collector.  The file is replaced all at once so the collector
+    never reads half of it.
+
+    param started: when the run started.
+    """
+    if not PROMETHEUS_FILE:
+        return
+
+    lines = []
+
+    def metric(name: str, kind: str, helptext: str, samples: [(str, float)]) -> None:
+        lines.append(f"# HELP {name} {helptext}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+
+    sites = sorted(RUN_STATS["sites"].items())
+    metric("boxx_sync_files_downloaded", "gauge", "Files downloaded by the last run.",
+           [(f'{{site="{site}"}}', metrics["files"]) for site, metrics in sites])
+    metric("boxx_sync_bytes_downloaded", "gauge", "Bytes downloaded by the last run.",
+           [(f'{{site="{site}"}}', metrics["bytes"]) for site, metrics in sites])
+    metric("boxx_sync_throughput_bytes_per_second", "gauge", "Bytes downloaded per second of transfer time.",
+           [(f'{{site="{site}"}}', round(metrics["bytes"] / metrics["phases"]["transfer"]["sum"], 1))
+            for site, metrics in sites if metrics["phases"].get("transfer", {}).get("sum")])
+    metric("boxx_sync_rate_limit_sleep_seconds", "gauge", "Seconds spent waiting for the download limit.",
+           [(f'{{site="{site}"}}', metrics["phases"].get("rate-limit-sleep", {}).get("sum", 0.0))
+            for site, metrics in sites])
+    metric("boxx_sync_failures", "gauge", "Failures during the last run by reason.",
+           [(f'{{site="{site}",reason="{reason}"}}', count)
+            for site, metrics in sites for reason, count in sorted(metrics["failures"].items())])
+
+    # PHASE LATENCY HISTOGRAMS.  PROMETHEUS BUCKETS ARE CUMULATIVE.
+    samples = []
+    for site, metrics in sites:
+        for phase, histogram in sorted(metrics["phases"].items()):
+            labels = f'site="{site}",phase="{phase}"'
+            cumulative = 0
+            for bucket, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+                cumulative += count
+                samples.append((f'_bucket{{{labels},le="{bucket:g}"}}', cumulative))
+            samples.append((f'_bucket{{{labels},le="+Inf"}}', histogram["count"]))
+            samples.append((f"_sum{{{labels}}}", round(histogram["sum"], 3)))
+            samples.append((f"_count{{{labels}}}", histogram["count"]))
+    metric("boxx_sync_phase_seconds", "histogram", "Time spent in each phase of the last run.", samples)
+
+    metric("boxx_sync_run_duration_seconds", "gauge", "How long the last run took.",
+           [("", round(time.time() - started, 3))])
+    metric("boxx_sync_last_run_timestamp_seconds", "gauge", "When the last run finished.",
+           [("", round(time.time()))])
+
+    Path(PROMETHEUS_FILE).parent.mkdir(parents=True, exist_ok=True)
+    with open(PROMETHEUS_FILE + ".tmp", "w", encoding="utf-8") as prom_file:
+        prom_file.write("\n".join(lines) + "\n")
+    os.replace(PROMETHEUS_FILE + ".tmp", PROMETHEUS_FILE)
+
+
+class DaemonState:
+    """
+    What the daemon is doing.  Shared with the control socket's thread, so
+    hold the lock while changing it.  (See daemon_command())
+    """
+
+    def __init__(self, site_list: [str]):
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.site_list = site_list
+        self.started = time.time()
+        self.activity = "starting"
+        self.paused = False
+        self.stopping = False
+        self.full_sync = True
+        self.last_full_sync = 0.0
+        self.last_poll = None
+        self.next_poll = time.time()
+        self.polls = 0
+        self.downloaded = 0
+        self.failed = 0
+
+    def status(self) -> dict:
+        """ What the control socket's status command reports. """
+        return {"activity": "paused" if self.paused else self.activity,
+                "sites": self.site_list,
+                "uptime": format_duration(time.time() - self.started),
+                "polls": self.polls,
+                "last_poll": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.last_poll))
+                if self.last_poll else None,
+                "next_poll": "now" if self.full_sync or self.next_poll <= time.time()
+                else f"in {format_duration(self.next_poll - time.time())}",
+                "next_full_sync": "now" if self.full_sync
+                else f"in {format_duration(max(0.0, self.last_full_sync + DAEMON_FULL_SYNC - time.time()))}",
+                "downloaded": self.downloaded,
+                "failed": self.failed}
+
+    def stop(self, *signal_info) -> None:
+        """
+        Stop after the current download.  (Also the SIGTERM and SIGINT
+        handler.  A second signal stops right away)
+        """
+        if self.stopping and signal_info:
+            raise KeyboardInterrupt
+        with self.lock:
+            self.stopping = True
+        self.wake.set()
+
+    def pause_point(self) -> bool:
+        """
+        Wait here while the daemon is paused.
+
+        return: False once the daemon is stopping.
+        """
+        while True:
+            with self.lock:
+                if self.stopping:
+                    return False
+                if not self.paused:
+                    return True
+            self.wake.wait(1)
+            self.wake.clear()
+
+
+def daemon_command(state: DaemonState, command: str) -> dict:
+    """
+    Carry out a command sent to the control socket.
+        status:  what the daemon is doing
+        pause:   stop downloading (after the current file) and polling
+        resume:  carry on after a pause
+        trigger: check every item of every site now
+        stop:    stop after the current file
+
+    param state: the daemon's state.
+    param command: the command.
+    return: the reply (the daemon's status, or an error).
+    """
+    with state.lock:
+        if command == "pause":
+            state.paused = True
+        elif command == "resume":
+            state.paused = False
+        elif command == "trigger":
+            state.full_sync = True
+        elif command == "stop":
+            state.stopping = True
+        elif command != "status":
+            return {"ok": False, "error": f"unknown command: {command}"}
+        reply = {"ok": True, **state.status()}
+    state.wake.set()
+    return reply
+
+
+def start_control_server(state: DaemonState) -> socketserver.UnixStreamServer:
+    """
+    Listen for commands on the control socket in a background thread.  Each
+    connection sends one command line and gets one JSON line back.
+
+    param state: the daemon's state.
+    return: the server. (Shut it down when the daemon stops)
+    """
+
+    class ControlHandler(socketserver.StreamRequestHandler):
+        """ Answers one command sent to the control socket. """
+
+        def handle(self):
+            command = self.rfile.readline().decode("utf-8", errors="replace").strip().lower()
+            self.wfile.write((json.dumps(daemon_command(state, command)) + "\n").encode())
+
+    Path(CONTROL_SOCKET).parent.mkdir(parents=True, exist_ok=True)
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(CONTROL_SOCKET)
+    server = socketserver.ThreadingUnixStreamServer(CONTROL_SOCKET, ControlHandler)
+    server.daemon_threads = True
+    os.chmod(CONTROL_SOCKET, 0o600)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def send_control_command(command: str) -> dict | None:
+    """
+    Send a command to a running daemon's control socket.
+
+    param command: status, pause, resume, trigger or stop.
+    return: the daemon's reply, or None if no daemon is listening.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as control:
+            control.settimeout(DUR_WAIT_UTL)
+            control.connect(CONTROL_SOCKET)
+            control.sendall(command.encode() + b"\n")
+            with control.makefile("rb") as replies:
+                return json.loads(replies.readline())
+    except (OSError, ValueError):
+        return None
+
+
+def run_daemon(site_list: [str], args: argparse.Namespace) -> None:
+    """
+    Keep running with one browser (started when first needed) and each site's
+    login session kept warm.  Every poll-interval-in-minutes (give or take
+    the jitter) each site's "My Downloads" is read and only the purchases
+    that are new since the last poll are downloaded.  Every item is checked
+    again at the start, every full-sync-in-hours and when triggered through
+    the control socket.
+
+    param site_list: the boxx sites to visit.
+    param args: the command line. (See read_command_line())
+    """
+    if send_control_command("status") is not None:
+        print_error(f"A daemon is already listening on {CONTROL_SOCKET}")
+        sys.exit(1)
+
+    # EMPTY THE DOWNLOAD DIR FOR A CLEAN START (AND FINISH MOVING
+    # WHAT THE LAST RUN DOWNLOADED)
+    Path(DOWNLOAD_DIR).mkdir(parents=True, exist_ok=True)
+    clean_download_dir()
+    requeue_outbox()
+
+    state = DaemonState(site_list)
+    server = start_control_server(state)
+    signal.signal(signal.SIGTERM, state.stop)
+    signal.signal(signal.SIGINT, state.stop)
+    print(f"Daemon started.  Control socket: {CONTROL_SOCKET}")
+
+    # EVERY POLL READS "MY DOWNLOADS" AGAIN
+    poll_args = argparse.Namespace(**{**vars(args), "refresh_catalog": True, "resume": False})
+    browser = LazyBrowser()
+    sessions = {}
+    while True:
+        # SLEEP UNTIL THE NEXT POLL OR A COMMAND
+        with state.lock:
+            timeout = None if state.paused else 0.0 if state.full_sync else max(0.0, state.next_poll - time.time())
+        state.wake.wait(timeout)
+        state.wake.clear()
+        with state.lock:
+            if state.stopping:
+                break
+            if state.paused or not (state.full_sync or time.time() >= state.next_poll):
+                continue
+            full = state.full_sync or time.time() - state.last_full_sync >= DAEMON_FULL_SYNC
+            state.full_sync = False
+            state.activity = "checking every item" if full else "checking for new purchases"
+
+        started = time.time()
+        RUN_STATS.update(downloaded=0, skipped=0, linked=0, failed=[], waits={}, seconds={}, sites={})
+        rotate_journal()
+        try:
+            sync_sites(browser, site_list, poll_args, sessions, not full, state.pause_point)
+
+        # A BROKEN BROWSER OR SESSION IS REPLACED ON THE NEXT POLL.
+        except Exception as err:  # pylint: disable=broad-except
+            print_error(f"FAIL: poll stopped early: {err!r}")
+            record_event(None, "failure", reason="poll-stopped", message=repr(err))
+            with STATS_LOCK:
+                RUN_STATS["failed"].append(f"poll stopped early: {err!r}")
+            browser.quit()
+            sessions.clear()
+        stop_mover()
+
+        print_summary()
+        record_throughput()
+        record_event(None, "poll", full=full, seconds=round(time.time() - started, 3),
+                     downloaded=RUN_STATS["downloaded"], skipped=RUN_STATS["skipped"],
+                     failed=len(RUN_STATS["failed"]))
+        write_prometheus_file(started)
+
+        with state.lock:
+            state.polls += 1
+            state.downloaded += RUN_STATS["downloaded"]
+            state.failed += len(RUN_STATS["failed"])
+            state.last_poll = time.time()
+            if full:
+                state.last_full_sync = started
+            state.next_poll = time.time() + max(0.0, DAEMON_INTERVAL + random.uniform(-DAEMON_JITTER, DAEMON_JITTER))
+            state.activity = "waiting"
+        print(f"Next poll {state.status()['next_poll']}.")
+
+    print("Daemon stopping.")
+    server.shutdown()
+    server.server_close()
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(CONTROL_SOCKET)
+    browser.quit()
+
+
 def main():
     """
     Main program starts here.
     """
-    site, cmdln_item, file = read_command_line()
+    started = time.time()
+    args = read_command_line()
+
+    # TALK TO A RUNNING DAEMON INSTEAD OF DOWNLOADING
+    if args.control is not None:
+        reply = send_control_command(args.control)
+        if reply is None:
+            print_error(f"No daemon is listening on {CONTROL_SOCKET}")
+            sys.exit(1)
+        for name, value in reply.items():
+            print(f"{name}: {value}")
+        sys.exit(0 if reply["ok"] else 1)
+
+    # SEE WHERE THE TIME GOES (--trace AND --profile)
+    if args.trace:
+        start_tracing()
+    if args.profile:
+        start_profiler(PROFILE_INTERVAL)
+    try:
+        with span("run", "phase"):
+            run_command(args, started)
+    finally:
+        if args.profile:
+            stop_profiler(args.profile)
+        if args.trace:
+            write_trace(args.trace)
 
-    # EMPTY THE DOWNLOAD DIR FOR A CLEAN START
-    clean_download_dir()
 
-    # START UP THE BROWSER
-    browser = start_browser()
+def run_command(args: argparse.Namespace, started: float) -> None:
+    """
+    Do what the command line asks for.  (See main())
+
+    param args: the command line. (See read_command_line())
+    param started: when the run started.
+    """
+    site = args.site
+
+    # LOAD THE MANIFEST OF DOWNLOADED FILES
+    open_manifest(args.rebuild_manifest)
+
+    # LOOK AFTER THE MEDIA INDEX INSTEAD OF DOWNLOADING
+    if args.index:
+        update_media_index()
+        return
+    if args.query is not None:
+        query_media(args.query)
+        return
 
     # LOOP THROUGH EACH BUSY-BOXX SITE THAT IS CONFIGURED FOR PROCESSING
     if site is None:
@@ -611,29 +4426,37 @@ def main():
     else:
         site_list = [site]
 
-    for boxx_site in site_list:
-        print()
-        print(f"*** *** *** DOWNLOAD FROM {boxx_site.upper()} *** *** ***")
-        print()
-        # LOGIN TO THE SITE
-        login(browser, boxx_site)
-
-        # GET A LIST OF ALL PURCHASED ITEMS
-        item_pgs = get_item_download_pages(browser)
-        pgs = filter_items(item_pgs, [cmdln_item])
+    if args.daemon:
+        run_daemon(site_list, args)
+        return
 
-        # DOWNLOAD THE FILES FOR EACH ITEM
-        for (url, item) in pgs:
-            print(f"    Follow link to detail page for {item}")
-            if cmdln_item is not None or not ensure_save_dir_exists(boxx_site, item):
-                print(f"        *** Download url: {url} ***")
-                print(f"        *** Save to: {get_save_dir(boxx_site, item)} ***")
-                download_item_files(browser, url, boxx_site, item, file)
+    # A NEW PLAN GETS A NEW JOURNAL
+    if not args.resume and not args.dry_run:
+        rotate_journal()
 
-            else:
-                print(f"    --- Skip {get_save_dir(boxx_site, item)} - previously downloaded.")
+    if args.jobs > 1 and len(site_list) > 1 and not args.dry_run:
+        run_sites_in_parallel(site_list, args)
 
-    browser.quit()
+    else:
+        # EMPTY THE DOWNLOAD DIR FOR A CLEAN START (AND FINISH MOVING
+        # WHAT THE LAST RUN DOWNLOADED)
+        if not args.dry_run:
+            Path(DOWNLOAD_DIR).mkdir(parents=True, exist_ok=True)
+            clean_download_dir()
+            requeue_outbox()
+
+        # THE BROWSER STARTS THE FIRST TIME IT IS NEEDED
+        browser = LazyBrowser()
+        sync_sites(browser, site_list, args, {})
+        browser.quit()
+        stop_mover()
+
+    print_summary()
+    if not args.dry_run:
+        record_throughput()
+    record_event(None, "run", seconds=round(time.time() - started, 3), downloaded=RUN_STATS["downloaded"],
+                 skipped=RUN_STATS["skipped"], failed=len(RUN_STATS["failed"]))
+    write_prometheus_file(started)
 
 
 if "__main__" == __name__:
@@ -0,0 +1,330 @@
+"""
+MODULE: boxx-mock-site.py
+
+A local stand-in for a boxx website.  It serves the pages and elements
+boxx-download.py looks for (login form, "My Downloads", item download
+pages with their svg toggles and DescriptionWrapper variants) and the
+files themselves, rate limited and at a configurable bandwidth.
+
+Used by boxx-benchmark.py and handy for trying out changes without
+touching the real sites:
+    python boxx-mock-site.py --port 8765 --items 5
+    (then set mock-boxx=http://127.0.0.1:8765 in [BOXX SITE URLS])
+"""
+import argparse
+import html
+import re
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+SESSION_COOKIE = "BoxxMockSession=logged-in"
+VARIANT_NAMES = ["4K ProRes", "HD ProRes", "HD H264", "SD H264"]
+SEND_CHUNK = 64 * 1024
+
+
+class MockCatalog:
+    """
+    The purchases offered by the mock site.  Every item has the same number
+    of members, and every member the same number of variants (0 variants
+    means the member's single file downloads as soon as its svg is clicked).
+    With static_variants the variants are part of the item page itself
+    instead of showing up when the svg is clicked.  With duplicates every
+    item has the same files (like a clip sold in several volumes).
+    """
+
+    def __init__(self, items: int, members: int, variants: int, file_size: int,
+                 static_variants: bool = False, duplicates: bool = False):
+        self.items = items
+        self.members = members
+        self.variants = min(variants, len(VARIANT_NAMES))
+        self.file_size = file_size
+        self.static_variants = static_variants
+        self.duplicates = duplicates
+
+    @classmethod
+    def for_file_count(cls, files: int, members: int, variants: int, file_size: int,
+                       static_variants: bool = False, duplicates: bool = False):
+        """ Build a catalog with (at least) the given number of files. """
+        per_item = members * max(variants, 1)
+        return cls(max(1, -(-files // per_item)), members, variants, file_size, static_variants, duplicates)
+
+    @property
+    def file_count(self) -> int:
+        """ Number of files offered by the whole catalog. """
+        return self.items * self.members * max(self.variants, 1)
+
+    def file_body(self, item: int, member: int, variant: int) -> bytes:
+        """ Contents of a file.  Each file starts differently unless the catalog has duplicates. """
+        header = f"MOCK {0 if self.duplicates else item} {member} {variant}\n".encode()
+        return (header + bytes(self.file_size))[:self.file_size]
+
+    def etag(self, item: int, member: int, variant: int) -> str:
+        """ ETag of a file.  (Files with the same contents have the same ETag) """
+        return f'"mock-{0 if self.duplicates else item}-{member}-{variant}-{self.file_size}"'
+
+
+
+def login_page() -> str:
+    """ The login form. """
+    return """<html><body>
+<input id="EmailAddressTextBox" type="text">
+<input id="LoginPasswordTextBox" type="password">
+<button id="SignInButton" onclick="document.cookie='""" + SESSION_COOKIE + """; path=/'; location='/';">
+Sign In</button>
+</body></html>"""
+
+
+def home_page(logged_in: bool) -> str:
+    """ The home page.  Only logged in users see the "My Downloads" link. """
+    if logged_in:
+        return '<html><body><a href="/MyDownloads">My Downloads</a></body></html>'
+    return '<html><body><a href="/Login/">Sign In</a></body></html>'
+
+
+def my_downloads_page(catalog: MockCatalog) -> str:
+    """ One link and one card for each purchased item. """
+    cards = []
+    for item in range(catalog.items):
+        cards.append(f"""
+<a href="/0~{item}|mock-pack-{item}">Download</a>
+<div class="contentsToDisplay">
+  <div class="ContentExtraInfoSuperTitle">VOLUME {item + 1}:</div>
+  <div class="TitleText">Mock Pack {item}</div>
+</div>""")
+    return f"<html><body><a href=\"/MyDownloads\">My Downloads</a>{''.join(cards)}</body></html>"
+
+
+def item_page(catalog: MockCatalog, item: int) -> str:
+    """
+    An item's download page.  Clicking a member's svg either shows that
+    member's variants (replacing the ones shown before) or, for members
+    with a single file, downloads it.
+    """
+    variants = [html.escape(name) for name in VARIANT_NAMES[:catalog.variants]]
+    blocks = []
+    for member in range(catalog.members):
+        static = "".join(
+            f'<div class="DescriptionWrapper"><a href="/file/{item}/{member}/{index}">'
+            f'<span class="ContentInfo">{name}</span></a></div>'
+            for index, name in enumerate(variants)) if catalog.static_variants else ""
+        blocks.append(f"""
+<div class="DownloadPageText">
+  <div class="TitleText">Clip {member}</div>
+  <div class="Contentname">MC {item:03d} {member:03d}</div>
+  <div class="Duration">00 : {member % 60:02d}</div>
+  <svg width="16" height="16" onclick="showMember({member})"><rect width="16" height="16"/></svg>
+  {static}
+</div>""")
+    return f"""<html><body>
+{''.join(blocks)}
+<div id="Variants"></div>
+<script>
+const VARIANTS = {variants!r};
+function showMember(member) {{
+    if (VARIANTS.length === 0) {{
+        location.href = "/file/{item}/" + member + "/0";
+        return;
+    }}
+    document.getElementById("Variants").innerHTML = VARIANTS.map((name, index) =>
+        '<div class="DescriptionWrapper"><a href="/file/{item}/' + member + '/' + index + '">' +
+        '<span class="ContentInfo">' + name + '</span></a></div>').join("");
+}}
+</script>
+</body></html>"""
+
+
+class RateLimit:
+    """ The site's download limit: no more than count downloads in window seconds. """
+
+    def __init__(self, count: int, window: float):
+        self.count = count
+        self.window = window
+        self.started = []
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """ Count a download, unless it is over the limit. """
+        if self.count < 1:
+            return True
+
+        with self.lock:
+            now = time.time()
+            self.started = [when for when in self.started if when > now - self.window]
+            if len(self.started) >= self.count:
+                return False
+            self.started.append(now)
+            return True
+
+
+def make_handler(catalog: MockCatalog, bandwidth: int, rate_limit: RateLimit, stats: dict,
+                 latency: float = 0.0):
+    """
+    Build the request handler class for a mock site.
+
+    param catalog: what the site offers.
+    param bandwidth: bytes per second for each file download. (0 = unlimited)
+    param rate_limit: the site's download limit.
+    param latency: seconds each page takes to be served.
+    param stats: counts of requests, downloads and refusals (updated by the handler)
+    return: the handler class for ThreadingHTTPServer.
+    """
+
+    class MockBoxxHandler(BaseHTTPRequestHandler):
+        """ Serves one request to the mock site. """
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            """ Keep quiet.  (The benchmark's output is what matters.) """
+
+        def logged_in(self) -> bool:
+            return SESSION_COOKIE in self.headers.get("Cookie", "")
+
+        def send_page(self, body: str, status: int = 200) -> None:
+            if latency > 0:
+                time.sleep(latency)
+            data = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(data)
+
+        def redirect(self, location: str) -> None:
+            self.send_response(302)
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_HEAD(self):  # pylint: disable=invalid-name
+            self.do_GET()
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            stats["requests"] += 1
+            url = urlparse(self.path)
+            if url.path.startswith("/Login"):
+                self.send_page(login_page())
+            elif url.path == "/":
+                self.send_page(home_page(self.logged_in()))
+            elif not self.logged_in():
+                self.redirect("/Login/")
+            elif url.path == "/MyDownloads":
+                self.send_page(my_downloads_page(catalog))
+            elif url.path == "/Downloads":
+                match = re.match(r"0~(\d+)\|", unquote(parse_qs(url.query).get("path", [""])[0]))
+                if match is None or int(match.group(1)) >= catalog.items:
+                    self.send_page("<html><body>Not found</body></html>", 404)
+                else:
+                    self.send_page(item_page(catalog, int(match.group(1))))
+            elif url.path.startswith("/file/"):
+                self.send_file(url.path)
+            else:
+                self.send_page("<html><body>Not found</body></html>", 404)
+
+        def send_file(self, path: str) -> None:
+            """ Send a file (or the requested range of it) at the site's bandwidth. """
+            try:
+                item, member, variant = (int(part) for part in path.split("/")[2:5])
+            except ValueError:
+                self.send_page("<html><body>Not found</body></html>", 404)
+                return
+
+            if self.command == "GET" and not rate_limit.allow():
+                stats["refused"] += 1
+                self.send_page("<html><body>Too many downloads</body></html>", 429)
+                return
+
+            body = catalog.file_body(item, member, variant)
+            etag = catalog.etag(item, member, variant)
+            start = 0
+            match = re.match(r"bytes=(\d+)-$", self.headers.get("Range", ""))
+            if match and self.headers.get("If-Range", etag) == etag and int(match.group(1)) >= len(body):
+                # NOTHING OF THE FILE IS AT OR PAST THE RANGE'S START.
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if match and self.headers.get("If-Range", etag) == etag:
+                start = int(match.group(1))
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Disposition", f'attachment; filename="mock-{item}-{member}-{variant}.mp4"')
+            self.send_header("Content-Length", str(len(body) - start))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            if self.command == "HEAD":
+                return
+
+            stats["downloads"] += 1
+            for pos in range(start, len(body), SEND_CHUNK):
+                chunk = body[pos:pos + SEND_CHUNK]
+                self.wfile.write(chunk)
+                if bandwidth > 0:
+                    time.sleep(len(chunk) / bandwidth)
+            stats["bytes"] += len(body) - start
+
+    return MockBoxxHandler
+
+
+def start_mock_site(catalog: MockCatalog, port: int = 0, bandwidth: int = 0,
+                    rate_limit: RateLimit | None = None, latency: float = 0.0) -> (ThreadingHTTPServer, dict):
+    """
+    Start a mock site in a background thread.
+
+    param catalog: what the site offers.
+    param port: port to listen on. (0 = any free port)
+    param bandwidth: bytes per second for each file download. (0 = unlimited)
+    param rate_limit: the site's download limit. (None = no limit)
+    param latency: seconds each page takes to be served.
+    return: the server (server.server_address has the port) and its request counts.
+    """
+    stats = {"requests": 0, "downloads": 0, "refused": 0, "bytes": 0}
+    handler = make_handler(catalog, bandwidth, rate_limit or RateLimit(0, 0), stats, latency)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def main():
+    """
+    Run a mock site until interrupted.
+    """
+    parser = argparse.ArgumentParser(description="Serve a mock boxx website.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--items", type=int, default=3, help="purchased items")
+    parser.add_argument("--members", type=int, default=10, help="members of each item")
+    parser.add_argument("--variants", type=int, default=2,
+                        help="files for each member (0 = a single file that downloads on click)")
+    parser.add_argument("--file-size", type=int, default=1024 * 1024, help="bytes in each file")
+    parser.add_argument("--static-variants", action="store_true",
+                        help="put the variants in the item pages instead of showing them on click")
+    parser.add_argument("--duplicates", action="store_true", help="give every item the same files")
+    parser.add_argument("--bandwidth", type=int, default=0, help="bytes per second per download (0 = unlimited)")
+    parser.add_argument("--rate-limit", default="5/300",
+                        help="downloads/seconds allowed (0/0 = no limit)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds each page takes to be served")
+    args = parser.parse_args()
+
+    count, window = (float(part) for part in args.rate_limit.split("/"))
+    catalog = MockCatalog(args.items, args.members, args.variants, args.file_size,
+                          args.static_variants, args.duplicates)
+    server, stats = start_mock_site(catalog, args.port, args.bandwidth, RateLimit(int(count), window), args.latency)
+    print(f"Mock boxx site with {catalog.file_count} files at http://127.0.0.1:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"    {stats}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if "__main__" == __name__:
+    main()
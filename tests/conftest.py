@@ -0,0 +1,205 @@
+"""
+Fixtures for the tests of boxx-download.py.
+
+Every test gets its own temporary directories, .ini file and mock site (see
+boxx-mock-site.py), so the tests run offline and never touch the real
+base-dir or state-dir.  Firefox isn't needed.
+    python -m pytest
+"""
+import contextlib
+import importlib.util
+import json
+import os
+
+from pathlib import Path
+
+import pytest
+
+SCRIPT_DIR = Path(__file__).resolve().parent.parent
+MOCK_SITE = "mock-boxx"
+
+
+def load_script(name: str):
+    """ Import one of the hyphenated scripts as a fresh module. (It reads the .ini file in the cwd) """
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_"), SCRIPT_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def mock():
+    """ The boxx-mock-site.py module. """
+    return load_script("boxx-mock-site")
+
+
+@pytest.fixture
+def catalog(mock):
+    """ Two items of three members, each with two files of 200 KB. """
+    return mock.MockCatalog(2, 3, 2, 200_000, static_variants=True)
+
+
+@pytest.fixture
+def start_site(mock, catalog):
+    """
+    Start a mock site serving the catalog (or another one).  Returns its url
+    and its request counts.  (The site is stopped after the test)
+    """
+    servers = []
+
+    def start(rate_limit=None, site_catalog=None) -> (str, dict):
+        server, stats = mock.start_mock_site(site_catalog or catalog, rate_limit=rate_limit)
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}", stats
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def make_boxx(tmp_path, monkeypatch):
+    """
+    Load boxx-download.py with an .ini file of its own.  Extra [SETTINGS]
+    and [WAITS] (setting name: value) can be given.
+    """
+    modules = []
+
+    def make(site_url: str = "http://127.0.0.1:9", settings: dict | None = None, waits: dict | None = None):
+        settings = {"downloads-per-window": "1000", "download-window-in-seconds": "60",
+                    "wait-until-duration": "15", "hide-browser": "Yes", **(settings or {})}
+        (tmp_path / "boxx-download.ini").write_text(
+            "[SETTINGS]\n" + "".join(f"{name}={value}\n" for name, value in settings.items())
+            + "\n[WAITS]\n" + "".join(f"{name}={value}\n" for name, value in (waits or {}).items())
+            + f"\n[BOXX SITE URLS]\n{MOCK_SITE}={site_url}\n"
+            + f"\n[DIRECTORIES]\nbase-dir={tmp_path}/base\ndownload-dir={tmp_path}/downloads\n"
+            + f"state-dir={tmp_path}/state\n{MOCK_SITE}={MOCK_SITE}\n",
+            encoding="utf-8")
+        monkeypatch.chdir(tmp_path)
+        module = load_script("boxx-download")
+        modules.append(module)
+        return module
+
+    yield make
+    for module in modules:
+        module.close_manifest()
+
+
+@pytest.fixture
+def boxx(make_boxx):
+    """ boxx-download.py with the default test settings. """
+    return make_boxx()
+
+
+@pytest.fixture
+def session(mock) -> dict:
+    """ A login session for the mock site.  (See build_http_session()) """
+    name, value = mock.SESSION_COOKIE.split("=")
+    return {"cookies": [{"name": name, "value": value}]}
+
+
+def no_browser(profile: str):
+    """ Stands in for start_browser(): the tests don't need (or have) Firefox. """
+    raise AssertionError("the browser was started")
+
+
+def save_session_file(boxx, session: dict) -> None:
+    """ Save the login session for the mock site, as an earlier run would have.  (See load_session()) """
+    session_file = Path(boxx.get_session_file(MOCK_SITE))
+    session_file.parent.mkdir(parents=True, exist_ok=True)
+    session_file.write_text(json.dumps(session), encoding="utf-8")
+
+
+class FakeElement:
+    """ Something on a FakeBrowser page that can be clicked. """
+
+    def __init__(self, on_click):
+        self.click = on_click
+
+
+class FakeBrowser:
+    """
+    Stands in for Firefox on an item's download page, so
+    download_item_files() can run without it.  Each member is
+    (title, content name, duration, variant descriptions); a member without
+    variants downloads its single file as soon as its svg is clicked.  The
+    scripts of boxx-download.py are told apart by which constant they are.
+    """
+    CONTEXT_CHROME = "chrome"
+
+    def __init__(self, boxx, members: list, variant_delay: int = 0, starts: bool = True):
+        """
+        param boxx: the boxx-download.py module.
+        param members: the members on the page.
+        param variant_delay: how many times the old variant list is still
+                        shown after a member is clicked.  (A list that loads
+                        slowly)
+        param starts: False = clicking a variant doesn't start its download.
+        """
+        self.boxx = boxx
+        self.members = members
+        self.variant_delay = variant_delay
+        self.starts = starts
+        self.download_dir = boxx.DOWNLOAD_DIR
+        self.wrappers = []
+        self.pending = None
+        self.delay_left = 0
+        self.clicks = []
+
+    def use_site(self, boxx_site: str) -> None:
+        """ (See LazyBrowser) """
+
+    def get(self, url: str) -> None:
+        self.wrappers, self.pending = [], None
+
+    def context(self, _):
+        return contextlib.nullcontext()
+
+    def execute_script(self, script: str, *args):
+        boxx = self.boxx
+        if script is boxx.ITEM_PAGE_JS:
+            return [{"title": ttl, "content_name": cnt_name, "duration": dur}
+                    for ttl, cnt_name, dur, _ in self.members]
+        if script is boxx.SET_DOWNLOAD_DIR_JS:
+            self.download_dir = args[0]
+            return None
+        if script is boxx.MEMBER_TOGGLE_JS:
+            return FakeElement(lambda: self.click_member(args[0]))
+        if script is boxx.VARIANTS_JS:
+            return [{"description": descr, "url": None} for _, descr, seen in self.shown() if not seen]
+        if script is boxx.VARIANT_ELEMENT_JS:
+            position, descr, _ = [wrapper for wrapper in self.shown() if not wrapper[2]][args[0]]
+            return FakeElement(lambda: self.click_variant(position, descr))
+        if script is getattr(boxx, "MARK_VARIANTS_JS", None):
+            self.wrappers = [(position, descr, True) for position, descr, _ in self.wrappers]
+            return None
+        return None
+
+    def shown(self) -> list:
+        """ The variant lists on the page right now. """
+        if self.pending is not None:
+            if self.delay_left > 0:
+                self.delay_left -= 1
+            else:
+                self.wrappers, self.pending = self.pending, None
+        return self.wrappers
+
+    def click_member(self, position: int) -> None:
+        self.clicks.append(position)
+        variants = self.members[position][3]
+        if not variants:
+            self.download(f"mock-{position}.mp4")
+        else:
+            self.pending = [(position, descr, False) for descr in variants]
+            self.delay_left = self.variant_delay
+
+    def click_variant(self, position: int, descr: str) -> None:
+        self.clicks.append((position, descr))
+        if self.starts:
+            self.download(f"mock-{position}-{descr}.mp4")
+
+    def download(self, name: str) -> None:
+        Path(self.download_dir).mkdir(parents=True, exist_ok=True)
+        with open(os.path.join(self.download_dir, name), "wb") as dl_file:
+            dl_file.write(b"MOCK " + name.encode())
@@ -0,0 +1,21 @@
+"""
+The benchmark's --http-only mode, which runs the whole utility against the
+mock site without Firefox.  (See boxx-benchmark.py)
+"""
+import sys
+
+from conftest import load_script
+
+
+def test_http_only_benchmark_downloads_everything(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("BOXX_USER", "benchmark@example.com")
+    monkeypatch.setenv("BOXX_PW", "benchmark")
+    monkeypatch.setattr(sys, "argv", ["boxx-benchmark.py", "--http-only", "--files", "10", "--members", "5",
+                                      "--file-size", "1000"])
+
+    load_script("boxx-benchmark").main()
+
+    report = capsys.readouterr().out
+    assert "10 files:" in report
+    assert "10 downloaded, 0 linked, 0 skipped, 0 failed" in report
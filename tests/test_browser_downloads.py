@@ -0,0 +1,44 @@
+"""
+Finished browser downloads, each in a download directory of its own.
+(See BrowserDownloads, build_save_location() and rename_and_move_dl_file())
+"""
+import os
+
+from pathlib import Path
+
+from conftest import MOCK_SITE
+
+ITEM = "001-mock-pack-0"
+
+
+def browser_download(dl_dir: str, name: str, data: bytes = b"MOCK") -> None:
+    """ Leave a file in a download directory, as the browser would. """
+    Path(dl_dir).mkdir(parents=True, exist_ok=True)
+    Path(dl_dir, name).write_bytes(data)
+
+
+def test_save_location_takes_the_extension_of_the_download(boxx):
+    dl_dir = os.path.join(boxx.DOWNLOAD_DIR, ".inflight", "1")
+    browser_download(dl_dir, "mock-0-0-0.tar.gz")
+
+    assert boxx.build_save_location(MOCK_SITE, ITEM, "clip%-0", dl_dir=dl_dir) \
+        == os.path.join(boxx.get_save_dir(MOCK_SITE, ITEM), "clip-0.tar.gz")
+
+
+def test_save_location_defaults_to_the_download_dir(boxx):
+    browser_download(boxx.DOWNLOAD_DIR, "mock-0-0-0.mp4")
+
+    assert boxx.build_save_location(MOCK_SITE, ITEM, "clip-0").endswith(os.path.join(ITEM, "clip-0.mp4"))
+
+
+def test_download_is_moved_out_of_its_directory(make_boxx):
+    boxx = make_boxx(settings={"mover-threads": "0"})
+    dl_dir = os.path.join(boxx.DOWNLOAD_DIR, ".inflight", "0")
+    browser_download(dl_dir, "mock-0-0-0.mp4", b"MOCK 0 0 0")
+    boxx.ensure_save_dir_exists(MOCK_SITE, ITEM)
+
+    boxx.rename_and_move_dl_file(ITEM, MOCK_SITE, "clip-0", dl_dir=dl_dir)
+
+    assert not boxx.list_download_files(dl_dir)
+    assert Path(boxx.get_save_dir(MOCK_SITE, ITEM), "clip-0.mp4").read_bytes() == b"MOCK 0 0 0"
+    assert boxx.file_exists(MOCK_SITE, ITEM, "clip-0")
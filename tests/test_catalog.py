@@ -0,0 +1,51 @@
+"""
+The cached catalog of purchased items.  (See load_catalog(), save_catalog()
+and open_site())
+"""
+import argparse
+
+from conftest import MOCK_SITE, no_browser, save_session_file
+
+ITEMS = [("/Downloads?path=0~0|a", "001-mock-pack-0"), ("/Downloads?path=0~1|b", "002-mock-pack-1")]
+
+
+def test_cached_catalog_is_used_until_it_is_too_old(make_boxx):
+    boxx = make_boxx(settings={"catalog-ttl-in-hours": "1"})
+    boxx.save_catalog(MOCK_SITE, ITEMS)
+    assert boxx.load_catalog(MOCK_SITE) == ITEMS
+
+    with boxx.open_manifest() as manifest:
+        manifest.execute("UPDATE catalogs SET fetched_at = fetched_at - 3601")
+    assert boxx.load_catalog(MOCK_SITE) is None
+
+
+def test_changed_link_forgets_the_item_listing(boxx):
+    boxx.save_catalog(MOCK_SITE, ITEMS)
+    for _, item in ITEMS:
+        boxx.record_catalog_entry(MOCK_SITE, item, 0, "clip-0", "mc0", "0005", "4k-prores")
+        boxx.record_item_listed(MOCK_SITE, item)
+
+    boxx.save_catalog(MOCK_SITE, [ITEMS[0], ("/Downloads?path=0~1|changed", ITEMS[1][1])])
+
+    assert boxx.load_catalog_entries(MOCK_SITE, ITEMS[0][1])
+    assert not boxx.load_catalog_entries(MOCK_SITE, ITEMS[1][1])
+
+
+def test_second_run_reads_only_the_home_page(make_boxx, start_site, session, monkeypatch):
+    site_url, stats = start_site()
+    boxx = make_boxx(site_url)
+    monkeypatch.setattr(boxx, "start_browser", no_browser)
+    save_session_file(boxx, session)
+    args = argparse.Namespace(refresh_catalog=False)
+
+    _, item_pgs = boxx.open_site(boxx.LazyBrowser(), MOCK_SITE, args)
+    assert [item for _, item in item_pgs] == ["001-mock-pack-0", "002-mock-pack-1"]
+    first_run = stats["requests"]
+
+    # THE SAVED SESSION IS CHECKED ON THE HOME PAGE, BUT "MY DOWNLOADS"
+    # ISN'T READ AGAIN.
+    assert boxx.open_site(boxx.LazyBrowser(), MOCK_SITE, args)[1] == item_pgs
+    assert stats["requests"] == first_run + 1
+
+    boxx.open_site(boxx.LazyBrowser(), MOCK_SITE, argparse.Namespace(refresh_catalog=True))
+    assert stats["requests"] > first_run + 2
@@ -0,0 +1,91 @@
+"""
+The daemon and its control socket.  (See run_daemon(), daemon_command()
+and send_control_command())
+"""
+import signal
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import MOCK_SITE, no_browser, save_session_file
+
+
+@pytest.fixture
+def control(boxx):
+    """ A daemon's state with its control socket listening.  (Nothing is downloaded) """
+    state = boxx.DaemonState([MOCK_SITE])
+    server = boxx.start_control_server(state)
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def test_commands_change_what_the_daemon_does(boxx, control):
+    assert boxx.send_control_command("pause")["activity"] == "paused"
+    assert control.paused
+
+    reply = boxx.send_control_command("resume")
+    assert (reply["ok"], reply["activity"], reply["sites"]) == (True, "starting", [MOCK_SITE])
+    assert not control.paused
+
+    control.full_sync = False
+    assert boxx.send_control_command("trigger")["next_full_sync"] == "now"
+    assert boxx.send_control_command("stop")["ok"]
+    assert control.stopping
+
+
+def test_unknown_command_is_refused(boxx, control):
+    assert boxx.send_control_command("explode") == {"ok": False, "error": "unknown command: explode"}
+
+
+def test_no_daemon_listening(boxx):
+    assert boxx.send_control_command("status") is None
+
+
+def test_paused_daemon_waits_until_it_is_resumed_or_stopped(boxx):
+    state = boxx.DaemonState([MOCK_SITE])
+    boxx.daemon_command(state, "pause")
+    answers = []
+    waiter = threading.Thread(target=lambda: answers.append(state.pause_point()))
+    waiter.start()
+    time.sleep(0.2)
+    assert answers == []
+
+    boxx.daemon_command(state, "stop")
+    waiter.join(5)
+    assert answers == [False]
+
+
+def stop_after_first_poll(boxx, statuses: list) -> None:
+    """ Wait (up to 30 seconds) for the daemon's first poll, then stop it. """
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        status = boxx.send_control_command("status")
+        if status is not None and status["polls"] >= 1:
+            statuses.append(status)
+            break
+        time.sleep(0.1)
+    boxx.send_control_command("stop")
+
+
+def test_daemon_polls_the_site_until_it_is_stopped(make_boxx, start_site, catalog, session, monkeypatch):
+    site_url, stats = start_site()
+    boxx = make_boxx(site_url, {"mover-threads": "0"})
+    monkeypatch.setattr(boxx, "start_browser", no_browser)
+    # THE TEST RUNNER KEEPS ITS OWN SIGNAL HANDLERS.
+    monkeypatch.setattr(signal, "signal", lambda signum, handler: None)
+    monkeypatch.setattr(sys, "argv", ["boxx-download.py", "--daemon", MOCK_SITE])
+    save_session_file(boxx, session)
+    statuses = []
+    controller = threading.Thread(target=stop_after_first_poll, args=(boxx, statuses))
+
+    controller.start()
+    boxx.main()
+    controller.join()
+
+    assert statuses[0]["downloaded"] == stats["downloads"] == catalog.file_count
+    assert statuses[0]["failed"] == 0
+    assert statuses[0]["activity"] == "waiting"
+    assert boxx.send_control_command("status") is None
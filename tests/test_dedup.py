@@ -0,0 +1,90 @@
+"""
+Keeping one copy of files with the same contents.  (See store_blob(),
+share_file() and link_known_file())
+"""
+import os
+
+import pytest
+
+from conftest import MOCK_SITE
+
+ITEMS = ["001-mock-pack-0", "002-mock-pack-1"]
+
+
+@pytest.fixture
+def duplicates_site(start_site, mock):
+    """ A mock site where both items have the same files. """
+    return start_site(site_catalog=mock.MockCatalog(2, 1, 1, 10_000, static_variants=True, duplicates=True))
+
+
+def download_both(boxx, session, site_url: str) -> list:
+    """ Download the (same) first file of both items.  Returns where they were saved. """
+    http = boxx.build_http_session(session)
+    saved = []
+    for item, item_name in enumerate(ITEMS):
+        boxx.ensure_save_dir_exists(MOCK_SITE, item_name)
+        assert boxx.fetch_file(http, f"{site_url}/file/{item}/0/0", item_name, MOCK_SITE, "clip-0")
+        save_dir = boxx.get_save_dir(MOCK_SITE, item_name)
+        saved.extend(os.path.join(save_dir, name) for name in os.listdir(save_dir))
+    return saved
+
+
+def test_same_contents_are_kept_once(make_boxx, duplicates_site, session):
+    site_url, stats = duplicates_site
+    boxx = make_boxx(site_url)
+
+    first, second = download_both(boxx, session, site_url)
+
+    assert stats["downloads"] == 2
+    assert os.path.samefile(first, second)
+    assert os.path.samefile(first, boxx.get_blob_path(boxx.hash_file(first)))
+
+
+def test_known_file_is_linked_without_downloading_it(make_boxx, duplicates_site, session):
+    site_url, stats = duplicates_site
+    boxx = make_boxx(site_url, {"head-requests": "Yes"})
+
+    first, second = download_both(boxx, session, site_url)
+
+    assert stats["downloads"] == 1
+    assert os.path.samefile(first, second)
+    assert boxx.RUN_STATS["linked"] == 1
+    assert boxx.file_exists(MOCK_SITE, ITEMS[1], "clip-0")
+
+
+def test_known_file_whose_blob_is_gone_is_downloaded(make_boxx, duplicates_site, session):
+    site_url, stats = duplicates_site
+    boxx = make_boxx(site_url, {"head-requests": "Yes"})
+    http = boxx.build_http_session(session)
+    boxx.ensure_save_dir_exists(MOCK_SITE, ITEMS[0])
+    boxx.fetch_file(http, f"{site_url}/file/0/0/0", ITEMS[0], MOCK_SITE, "clip-0")
+    blob_dir = boxx.BLOB_DIR
+    for sub_dir in os.listdir(blob_dir):
+        for blob in os.listdir(os.path.join(blob_dir, sub_dir)):
+            os.remove(os.path.join(blob_dir, sub_dir, blob))
+
+    boxx.ensure_save_dir_exists(MOCK_SITE, ITEMS[1])
+    assert not boxx.link_known_file(http, f"{site_url}/file/1/0/0", ITEMS[1], MOCK_SITE, "clip-0")
+    assert stats["downloads"] == 1
+
+
+def test_dedup_off_keeps_every_copy(make_boxx, duplicates_site, session):
+    site_url, stats = duplicates_site
+    boxx = make_boxx(site_url, {"dedup-mode": "off", "head-requests": "Yes"})
+
+    first, second = download_both(boxx, session, site_url)
+
+    assert stats["downloads"] == 2
+    assert not os.path.samefile(first, second)
+    assert not os.path.exists(boxx.BLOB_DIR)
+
+
+def test_file_already_there_is_replaced_by_a_link(boxx, tmp_path):
+    blob, copy = tmp_path / "blob", tmp_path / "copy"
+    blob.write_bytes(b"MOCK")
+    copy.write_bytes(b"MOCK")
+
+    boxx.share_file(str(blob), str(copy))
+
+    assert os.path.samefile(blob, copy)
+    assert not os.path.exists(f"{copy}.link")
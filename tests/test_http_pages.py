@@ -0,0 +1,101 @@
+"""
+Reading the site's pages over HTTP instead of with the browser.  (See
+parse_html(), read_catalog_over_http(), read_item_page_over_http() and
+list_item_files_over_http())
+"""
+import pytest
+
+from conftest import MOCK_SITE
+
+ITEM = "001-mock-pack-0"
+EVERYTHING = ([], [])
+
+
+def test_my_downloads_is_found_from_the_home_page(make_boxx, start_site, session):
+    site_url, stats = start_site()
+    boxx = make_boxx(site_url)
+    http = boxx.build_http_session(session)
+
+    assert boxx.read_catalog_over_http(http, MOCK_SITE) == [
+        (f"{site_url}/Downloads?path=0~{item}|mock-pack-{item}", f"00{item + 1}-mock-pack-{item}")
+        for item in range(2)]
+    assert stats["requests"] == 2
+
+    # THE PAGE'S ADDRESS IS REMEMBERED.
+    boxx.read_catalog_over_http(http, MOCK_SITE)
+    assert stats["requests"] == 3
+
+
+def test_pages_need_the_login_session(make_boxx, start_site):
+    site_url, _ = start_site()
+    boxx = make_boxx(site_url)
+    http = boxx.build_http_session({"cookies": []})
+
+    assert boxx.read_catalog_over_http(http, MOCK_SITE) is None
+    assert boxx.read_item_page_over_http(http, f"{site_url}/Downloads?path=0~0|x") is None
+
+
+def test_item_page_members_and_their_files(make_boxx, start_site, session):
+    site_url, _ = start_site()
+    boxx = make_boxx(site_url)
+
+    members = boxx.read_item_page_over_http(boxx.build_http_session(session), f"{site_url}/Downloads?path=0~0|x")
+
+    assert len(members) == 3
+    assert {name: members[1][name] for name in ("title", "content_name", "duration")} \
+        == {"title": "Clip 1", "content_name": "MC 000 001", "duration": "00 : 01"}
+    assert members[1]["variants"] == [{"description": "4K ProRes", "url": f"{site_url}/file/0/1/0"},
+                                      {"description": "HD ProRes", "url": f"{site_url}/file/0/1/1"}]
+
+
+def test_variants_shown_only_by_clicking_need_the_browser(make_boxx, start_site, mock, session):
+    site_url, _ = start_site(site_catalog=mock.MockCatalog(1, 2, 2, 1000))
+    boxx = make_boxx(site_url)
+    http = boxx.build_http_session(session)
+    url = f"{site_url}/Downloads?path=0~0|x"
+    selector = boxx.FileSelector(*EVERYTHING)
+    assert boxx.list_item_files_over_http(http, url, MOCK_SITE, ITEM, selector) is None
+
+    # ONCE THE BROWSER HAS LISTED THEM, THE CACHED VARIANTS ARE USED.
+    for member in range(2):
+        boxx.record_catalog_entry(MOCK_SITE, ITEM, member, f"clip-{member}", f"mc000{member:03d}",
+                                  f"00{member:02d}", "4k-prores")
+    files = boxx.list_item_files_over_http(http, url, MOCK_SITE, ITEM, selector)
+    assert [(position, descr, dl_url) for position, _, _, _, descr, dl_url in files] \
+        == [(0, "4k-prores", None), (1, "4k-prores", None)]
+    assert boxx.open_manifest().execute("SELECT COUNT(*) FROM item_files").fetchone()[0] == 2
+
+
+def test_unwanted_members_leave_the_item_unfinished(make_boxx, start_site, mock, session):
+    site_url, _ = start_site(site_catalog=mock.MockCatalog(1, 2, 2, 1000))
+    boxx = make_boxx(site_url)
+    boxx.record_catalog_entry(MOCK_SITE, ITEM, 0, "clip-0", "mc000000", "0000", "4k-prores")
+    selector = boxx.FileSelector([boxx.parse_rule("title:clip-0")], [])
+
+    files = boxx.list_item_files_over_http(boxx.build_http_session(session), f"{site_url}/Downloads?path=0~0|x",
+                                           MOCK_SITE, ITEM, selector)
+
+    # CLIP 1 WAS NEVER LISTED, SO THE ITEM CAN'T BE COMPLETE.
+    assert [ttl for _, ttl, _, _, _, _ in files] == ["clip-0"]
+    assert boxx.open_manifest().execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+
+
+def test_unclosed_tags_are_forgiven(boxx):
+    root = boxx.parse_html('<div class="A"><p>one <b>two</div><div class="B">three<br>four</div>'
+                           '<script>ignored()</script>')
+    assert root.text_of("A") == "one two"
+    assert root.text_of("B") == "threefour"
+    assert root.text() == "one twothreefour"
+
+
+@pytest.mark.parametrize("html, url", [
+    ('<a href="/file/1"><span id="x">4K</span></a>', "http://site/file/1"),
+    ('<div id="x"><a href="file/2">4K</a></div>', "http://site/item/file/2"),
+    ('<div id="x" data-url="/file/3">4K</div>', "http://site/file/3"),
+    ('<div id="x"><button onclick="startDownload(\'/Download/4\')">4K</button></div>', "http://site/Download/4"),
+    ('<a href="javascript:void(0)"><span id="x">4K</span></a>', None),
+    ('<a href="#"><span id="x">4K</span></a>', None),
+])
+def test_download_urls_are_found_without_clicking(boxx, html, url):
+    elem = next(elem for elem in boxx.parse_html(html).iter() if elem.attrs.get("id") == "x")
+    assert boxx.find_download_url(elem, "http://site/item/page") == url
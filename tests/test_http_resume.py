@@ -0,0 +1,106 @@
+"""
+Resuming cut off HTTP downloads with Range / If-Range.  (See stream_download())
+"""
+import os
+
+from pathlib import Path
+
+from conftest import MOCK_SITE
+
+ITEM = "001-mock-pack-0"
+SAVE_NAME = "clip-0-mc000000-0000-4k-prores"
+
+
+def stage_partial(boxx, data: bytes, etag: str, expected_size: int) -> str:
+    """ Leave a partial download behind, as a cut off attempt would. """
+    Path(boxx.STAGING_DIR).mkdir(parents=True, exist_ok=True)
+    staged = boxx.get_staged_path(MOCK_SITE, ITEM, SAVE_NAME)
+    with open(staged + ".part", "wb") as part_file:
+        part_file.write(data)
+    boxx.save_staged_info(staged, {"dl_filename": "mock-0-0-0.mp4", "expected_size": expected_size, "etag": etag})
+    return staged
+
+
+def download(boxx, session, site_url: str) -> str:
+    """ Stream the catalog's first file. """
+    http = boxx.build_http_session(session)
+    boxx.ensure_save_dir_exists(MOCK_SITE, ITEM)
+    return boxx.stream_download(http, f"{site_url}/file/0/0/0", ITEM, MOCK_SITE, SAVE_NAME)
+
+
+def test_resume_sends_only_the_rest(make_boxx, start_site, catalog, session):
+    site_url, stats = start_site()
+    boxx = make_boxx(site_url)
+    body = catalog.file_body(0, 0, 0)
+    staged = stage_partial(boxx, body[:75_000], catalog.etag(0, 0, 0), len(body))
+
+    saved = download(boxx, session, site_url)
+
+    assert Path(saved).read_bytes() == body
+    assert stats["bytes"] == len(body) - 75_000
+    assert not os.path.exists(staged + ".part")
+    assert boxx.file_exists(MOCK_SITE, ITEM, SAVE_NAME)
+
+
+def test_changed_file_is_downloaded_again(make_boxx, start_site, catalog, session):
+    site_url, stats = start_site()
+    boxx = make_boxx(site_url)
+    body = catalog.file_body(0, 0, 0)
+    stage_partial(boxx, b"x" * 75_000, '"an-older-version"', len(body))
+
+    saved = download(boxx, session, site_url)
+
+    # IF-RANGE DIDN'T MATCH, SO THE SITE SENT THE WHOLE FILE.
+    assert Path(saved).read_bytes() == body
+    assert stats["bytes"] == len(body)
+
+
+def test_complete_partial_is_not_downloaded_again(make_boxx, start_site, catalog, session):
+    site_url, stats = start_site()
+    boxx = make_boxx(site_url)
+    body = catalog.file_body(0, 0, 0)
+    staged = stage_partial(boxx, body, catalog.etag(0, 0, 0), len(body))
+    boxx.save_staged_info(staged, {**boxx.load_staged_info(staged), "site": MOCK_SITE, "item": ITEM,
+                                   "file": SAVE_NAME,
+                                   "target": boxx.build_save_location(MOCK_SITE, ITEM, SAVE_NAME, "mock-0-0-0.mp4")})
+
+    saved = download(boxx, session, site_url)
+
+    assert Path(saved).read_bytes() == body
+    assert stats["requests"] == 0
+
+
+def test_refused_range_starts_over(make_boxx, start_site, catalog, session):
+    site_url, stats = start_site()
+    boxx = make_boxx(site_url)
+    body = catalog.file_body(0, 0, 0)
+    # THE STAGED PART IS LONGER THAN THE FILE, SO THE SITE ANSWERS 416.
+    staged = stage_partial(boxx, body + b"x" * 10, catalog.etag(0, 0, 0), len(body) + 100)
+
+    saved = download(boxx, session, site_url)
+
+    assert Path(saved).read_bytes() == body
+    assert stats["bytes"] == len(body)
+    assert not os.path.exists(staged + ".part")
+
+
+def test_part_from_the_wrong_place_is_not_appended(make_boxx, start_site, catalog, session, monkeypatch):
+    site_url, stats = start_site()
+    boxx = make_boxx(site_url)
+    body = catalog.file_body(0, 0, 0)
+    stage_partial(boxx, body[:75_000], catalog.etag(0, 0, 0), len(body))
+    http = boxx.build_http_session(session)
+    request = http.request
+
+    def shifted(method, url, headers=None, **kwargs):
+        """ The site sends the file from an earlier byte than was asked for. """
+        if "Range" in headers:
+            headers = {**headers, "Range": "bytes=50000-"}
+        return request(method, url, headers=headers, **kwargs)
+
+    monkeypatch.setattr(http, "request", shifted)
+    boxx.ensure_save_dir_exists(MOCK_SITE, ITEM)
+    saved = boxx.stream_download(http, f"{site_url}/file/0/0/0", ITEM, MOCK_SITE, SAVE_NAME)
+
+    assert Path(saved).read_bytes() == body
+    assert stats["bytes"] == len(body) - 50_000 + len(body)
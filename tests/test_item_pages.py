@@ -0,0 +1,213 @@
+"""
+Downloading an item's files through the browser, and trying the ones that
+failed again.  (See download_item_files() and retry_failed_downloads(), run
+against FakeBrowser)
+"""
+import argparse
+import os
+import time
+
+import pytest
+
+from conftest import MOCK_SITE, FakeBrowser
+
+ITEM = "001-mock-pack-0"
+FAST = {"mover-threads": "0", "browser-downloads": "2", "download-timeout-in-seconds": "5",
+        "download-stable-size-in-seconds": "0.01"}
+FAST_WAITS = {"member-files": "1", "download-start": "1", "item-page": "1"}
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> list:
+    """ How long each time.sleep() would have slept.  (Nothing sleeps) """
+    slept = []
+    monkeypatch.setattr(time, "sleep", slept.append)
+    return slept
+
+
+@pytest.fixture
+def fast_boxx(make_boxx):
+    def make(settings: dict | None = None):
+        return make_boxx(settings={**FAST, **(settings or {})}, waits=FAST_WAITS)
+    return make
+
+
+def download_item(boxx, browser, selector=None) -> None:
+    boxx.ensure_save_dir_exists(MOCK_SITE, ITEM)
+    boxx.download_item_files(browser, None, f"/Downloads/{ITEM}", MOCK_SITE, ITEM, None,
+                             selector or boxx.FileSelector([], []))
+
+
+def saved_files(boxx) -> list:
+    save_dir = boxx.get_save_dir(MOCK_SITE, ITEM)
+    return sorted(os.listdir(save_dir)) if os.path.isdir(save_dir) else []
+
+
+def test_every_variant_is_downloaded(fast_boxx):
+    boxx = fast_boxx()
+    browser = FakeBrowser(boxx, [("Clip 0", "mc0", "0 : 05", ["4k-prores", "hd-prores"]),
+                                 ("Clip 1", "mc1", "0 : 07", ["hd-prores"])])
+    download_item(boxx, browser)
+
+    assert saved_files(boxx) == ["clip-0-mc0-005-4k-prores.mp4", "clip-0-mc0-005-hd-prores.mp4",
+                                 "clip-1-mc1-007-hd-prores.mp4"]
+    assert boxx.RUN_STATS["downloaded"] == 3
+    assert len(boxx.load_download_history(MOCK_SITE)) == 3
+
+
+def test_listing_variants_takes_no_download_slot(fast_boxx, sleeps):
+    boxx = fast_boxx({"downloads-per-window": "2"})
+    boxx.save_download_history(MOCK_SITE, [time.time(), time.time()])
+    browser = FakeBrowser(boxx, [("Clip 0", "mc0", "0 : 05", ["4k-prores", "hd-prores"])])
+
+    download_item(boxx, browser, boxx.FileSelector([], [boxx.parse_rule("variant:*")]))
+
+    assert browser.clicks == [0]
+    assert not [wait for wait in sleeps if wait > 1]
+    assert len(boxx.load_download_history(MOCK_SITE)) == 2
+
+
+def test_single_file_counts_against_the_limit_and_is_not_clicked_again(fast_boxx):
+    boxx = fast_boxx()
+    browser = FakeBrowser(boxx, [("Clip 0", "mc0", "0 : 05", [])])
+    download_item(boxx, browser)
+
+    assert saved_files(boxx) == ["clip-0-mc0-005.mp4"]
+    assert len(boxx.load_download_history(MOCK_SITE)) == 1
+
+    browser.clicks.clear()
+    download_item(boxx, browser)
+    assert browser.clicks == []
+    assert boxx.RUN_STATS["skipped"] == 1
+
+
+def test_download_that_does_not_start_gives_its_slot_back(fast_boxx):
+    boxx = fast_boxx()
+    browser = FakeBrowser(boxx, [("Clip 0", "mc0", "0 : 05", ["4k-prores"])], starts=False)
+    download_item(boxx, browser)
+
+    assert boxx.load_download_history(MOCK_SITE) == []
+    assert [(entry.filename, entry.reason) for entry in boxx.RETRY_QUEUE] \
+        == [("clip-0-mc0-005-4k-prores", "did-not-start")]
+
+
+def test_slow_variant_list_is_not_mistaken_for_the_last_one(fast_boxx):
+    boxx = fast_boxx()
+    browser = FakeBrowser(boxx, [("Clip 0", "mc0", "0 : 05", ["4k-prores"]),
+                                 ("Clip 1", "mc1", "0 : 07", ["hd-prores"]),
+                                 ("Clip 2", "mc2", "0 : 09", [])], variant_delay=3)
+    download_item(boxx, browser)
+
+    assert browser.clicks == [0, (0, "4k-prores"), 1, (1, "hd-prores"), 2]
+    assert saved_files(boxx) == ["clip-0-mc0-005-4k-prores.mp4", "clip-1-mc1-007-hd-prores.mp4",
+                                 "clip-2-mc2-009.mp4"]
+
+
+def test_member_that_shows_nothing_is_tried_again_later(fast_boxx):
+    boxx = fast_boxx()
+    browser = FakeBrowser(boxx, [("Clip 0", "mc0", "0 : 05", ["4k-prores"])], variant_delay=1000)
+
+    started = time.time()
+    download_item(boxx, browser)
+
+    assert time.time() - started < 3
+    assert saved_files(boxx) == []
+    assert [(entry.filename, entry.reason) for entry in boxx.RETRY_QUEUE] == [("clip-0-mc0-005", "member-files")]
+    assert boxx.load_download_history(MOCK_SITE) == []
+
+
+def run_plan(boxx, browser) -> None:
+    """ Run a plan of the whole item with the browser, as execute_plan() would after planning. """
+    plan = [boxx.PlanEntry(MOCK_SITE, ITEM, f"/Downloads/{ITEM}", None, None, 2, 0)]
+    args = argparse.Namespace(file=None, selector=boxx.FileSelector([], []))
+    boxx.journal_plan(plan, [MOCK_SITE])
+    boxx.execute_plan(browser, plan, {MOCK_SITE: None}, args)
+
+
+def test_item_with_failures_is_not_journaled_done(fast_boxx):
+    boxx = fast_boxx({"retry-attempts": "1", "retry-backoff-in-seconds": "0"})
+    browser = FakeBrowser(boxx, [("Clip 0", "mc0", "0 : 05", ["4k-prores"])], starts=False)
+    run_plan(boxx, browser)
+
+    # THE RETRY FAILED TOO.  (A RUN THAT DIED BEFORE THE RETRY WOULD HAVE
+    # LEFT THE ITEM FOR --resume)
+    with open(boxx.JOURNAL_FILE, encoding="utf-8") as journal_file:
+        assert '"item-done"' not in journal_file.read()
+
+
+def test_finished_item_is_journaled(fast_boxx):
+    boxx = fast_boxx()
+    browser = FakeBrowser(boxx, [("Clip 0", "mc0", "0 : 05", ["4k-prores"])])
+    run_plan(boxx, browser)
+
+    with open(boxx.JOURNAL_FILE, encoding="utf-8") as journal_file:
+        entries = [line for line in journal_file if '"item-done"' in line or '"done"' in line]
+    assert len(entries) == 2
+
+
+def test_each_site_is_retried_before_the_next_one(fast_boxx, monkeypatch):
+    boxx = fast_boxx({"retry-attempts": "1", "retry-backoff-in-seconds": "0"})
+    calls = []
+
+    def download(browser, entry, *_):
+        calls.append(("download", entry.site))
+        boxx.queue_retry(entry.site, entry.item, entry.url, None, "download-start", f"{entry.site} failed")
+
+    monkeypatch.setattr(boxx, "download_plan_entry", download)
+    monkeypatch.setattr(boxx, "download_item_files", lambda browser, http, url, boxx_site, *_:
+                        calls.append(("retry", boxx_site)))
+    monkeypatch.setattr(boxx, "journal", lambda boxx_site, entry, **_: calls.append((entry, boxx_site)))
+    monkeypatch.setattr(boxx, "resume_staged_downloads", lambda http, boxx_site: None)
+    plan = [boxx.PlanEntry(site, ITEM, f"/Downloads/{ITEM}", None, None, 1, 0) for site in ("a-boxx", "b-boxx")]
+    args = argparse.Namespace(file=None, selector=boxx.FileSelector([], []))
+    boxx.execute_plan(FakeBrowser(boxx, []), plan, {"a-boxx": None, "b-boxx": None}, args)
+
+    assert calls == [("download", "a-boxx"), ("retry", "a-boxx"), ("item-done", "a-boxx"), ("done", "a-boxx"),
+                     ("download", "b-boxx"), ("retry", "b-boxx"), ("item-done", "b-boxx"), ("done", "b-boxx")]
+
+
+def test_retries_back_off_and_then_give_up(fast_boxx, sleeps):
+    boxx = fast_boxx({"retry-attempts": "3", "retry-backoff-in-seconds": "5"})
+    browser = FakeBrowser(boxx, [("Clip 0", "mc0", "0 : 05", ["4k-prores"])], starts=False)
+    run_plan(boxx, browser)
+
+    assert [wait for wait in sleeps if wait >= 5] == [5, 10, 20]
+    assert browser.clicks.count((0, "4k-prores")) == 4
+    # THE FAILURE IS ONLY LISTED ONCE.
+    assert boxx.RUN_STATS["failed"] == [f"{MOCK_SITE.upper()} {ITEM} clip-0-mc0-005-4k-prores did not start "
+                                        "(did-not-start)"]
+
+
+def test_retry_that_works_clears_the_failure(fast_boxx, monkeypatch):
+    boxx = fast_boxx({"retry-attempts": "3", "retry-backoff-in-seconds": "5"})
+    browser = FakeBrowser(boxx, [("Clip 0", "mc0", "0 : 05", ["4k-prores"])], starts=False)
+    # THE SITE WORKS AGAIN BY THE TIME OF THE FIRST RETRY.
+    monkeypatch.setattr(time, "sleep", lambda seconds: seconds >= 5 and setattr(browser, "starts", True))
+    run_plan(boxx, browser)
+
+    assert saved_files(boxx) == ["clip-0-mc0-005-4k-prores.mp4"]
+    assert boxx.RUN_STATS["failed"] == []
+    assert boxx.RETRY_QUEUE == []
+
+
+@pytest.mark.parametrize("leftovers, finished, reason", [
+    (["mock-0-0-0.mp4", "mock-0-0-1.mp4"], True, "extra-files"),
+    (["mock-0-0-0.mp4.part"], False, "timeout"),
+])
+def test_failed_download_is_quarantined_and_retried(fast_boxx, leftovers, finished, reason):
+    boxx = fast_boxx()
+    dl_dir = os.path.join(boxx.DOWNLOAD_DIR, ".inflight", "0")
+    os.makedirs(dl_dir)
+    for name in leftovers:
+        with open(os.path.join(dl_dir, name), "wb") as dl_file:
+            dl_file.write(b"MOCK")
+    event = boxx.DownloadEvent(leftovers[0], 4, 0.1) if finished else None
+
+    boxx.process_download(dl_dir, event, ITEM, MOCK_SITE, "clip-0", f"/Downloads/{ITEM}")
+
+    assert boxx.list_download_files(dl_dir) == []
+    quarantined, = os.listdir(os.path.join(boxx.DOWNLOAD_DIR, ".quarantine"))
+    assert sorted(os.listdir(os.path.join(boxx.DOWNLOAD_DIR, ".quarantine", quarantined))) == leftovers
+    assert [(entry.filename, entry.reason) for entry in boxx.RETRY_QUEUE] == [("clip-0", reason)]
+    assert quarantined in boxx.RETRY_QUEUE[0].message
+    assert saved_files(boxx) == []
@@ -0,0 +1,72 @@
+"""
+Carrying on with an unfinished plan from the run journal.  (See journal()
+and resume_site())
+"""
+from conftest import MOCK_SITE
+
+
+def write_plan(boxx) -> list:
+    """ Journal a plan of two files streamed over HTTP and an item the browser lists. """
+    plan = [boxx.PlanEntry(MOCK_SITE, "001-a", "/a", "a1", "/file/a1", 1, 100),
+            boxx.PlanEntry(MOCK_SITE, "001-a", "/a", "a2", "/file/a2", 1, 100),
+            boxx.PlanEntry(MOCK_SITE, "002-b", "/b", None, None, 3, 300)]
+    boxx.journal_plan(plan, [MOCK_SITE])
+    return plan
+
+
+def test_finished_files_are_left_out(boxx):
+    plan = write_plan(boxx)
+    boxx.journal(MOCK_SITE, "completed", item="001-a", file="a1")
+
+    entries, start_at = boxx.resume_site(MOCK_SITE)
+    assert entries == plan[1:]
+    assert start_at == {}
+
+
+def test_browser_item_starts_at_the_unfinished_member(boxx):
+    plan = write_plan(boxx)
+    boxx.journal(MOCK_SITE, "clicked", item="002-b", file="b1", member="clip-1")
+    boxx.journal(MOCK_SITE, "moved", item="002-b", file="b1")
+    boxx.journal(MOCK_SITE, "clicked", item="002-b", file="b2", member="clip-2")
+    boxx.journal(MOCK_SITE, "clicked", item="002-b", file="b3", member="clip-3")
+    boxx.journal(MOCK_SITE, "moved", item="002-b", file="b3")
+
+    entries, start_at = boxx.resume_site(MOCK_SITE)
+    assert entries == plan
+    assert start_at == {(MOCK_SITE, "002-b"): "clip-2"}
+
+
+def test_finished_items_are_left_out(boxx):
+    plan = write_plan(boxx)
+    boxx.journal(MOCK_SITE, "item-done", item="002-b")
+
+    assert boxx.resume_site(MOCK_SITE)[0] == plan[:2]
+
+
+def test_cut_off_last_line_is_ignored(boxx):
+    plan = write_plan(boxx)
+    with open(boxx.JOURNAL_FILE, "a", encoding="utf-8") as journal_file:
+        journal_file.write('{"time": 1, "site": "mock-boxx", "entry": "comp')
+
+    assert boxx.resume_site(MOCK_SITE)[0] == plan
+
+
+def test_other_sites_are_not_mixed_in(boxx):
+    plan = write_plan(boxx)
+    boxx.journal("other-boxx", "plan", plan=[["009-z", "/z", "z1", "/file/z1", 1, 100]])
+    boxx.journal("other-boxx", "completed", item="001-a", file="a1")
+
+    assert boxx.resume_site(MOCK_SITE)[0] == plan
+
+
+def test_nothing_to_resume(boxx):
+    assert boxx.resume_site(MOCK_SITE) is None
+
+    write_plan(boxx)
+    boxx.journal(MOCK_SITE, "done")
+    assert boxx.resume_site(MOCK_SITE) is None
+
+    # A NEW RUN STARTS A NEW JOURNAL.
+    write_plan(boxx)
+    boxx.rotate_journal()
+    assert boxx.resume_site(MOCK_SITE) is None
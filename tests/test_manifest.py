@@ -0,0 +1,64 @@
+"""
+The manifest of downloaded files.  (See open_manifest(), rebuild_manifest(),
+file_exists() and item_complete())
+"""
+import os
+
+from pathlib import Path
+
+from conftest import MOCK_SITE
+
+ITEM = "001-mock-pack-0"
+
+
+def put_in_base_dir(boxx, name: str, data: bytes = b"MOCK") -> Path:
+    """ Leave a file under base-dir, as an earlier run (or a person) would. """
+    file_path = Path(boxx.CONFIG.get(boxx.SECTION_DIRS, "base-dir"), MOCK_SITE, ITEM, name)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_path.write_bytes(data)
+    return file_path
+
+
+def test_new_manifest_lists_the_files_already_there(boxx):
+    put_in_base_dir(boxx, "clip-0.tar.gz")
+    put_in_base_dir(boxx, "clip-1.mp4.part")
+
+    # THE NAME THE FILE WAS SAVED UNDER MAY END AT ANY ".".
+    assert boxx.file_exists(MOCK_SITE, ITEM, "clip-0")
+    assert boxx.file_exists(MOCK_SITE, ITEM, "clip-0.tar")
+    assert not boxx.file_exists(MOCK_SITE, ITEM, "clip-1")
+
+
+def test_rebuild_forgets_files_that_are_gone(boxx):
+    clip = put_in_base_dir(boxx, "clip-0.mp4")
+    boxx.record_file(MOCK_SITE, ITEM, "clip-0", str(clip))
+    clip.unlink()
+    assert boxx.file_exists(MOCK_SITE, ITEM, "clip-0")
+
+    boxx.close_manifest()
+    boxx.open_manifest(rebuild=True)
+    assert not boxx.file_exists(MOCK_SITE, ITEM, "clip-0")
+
+
+def test_recorded_files_keep_their_checksum(boxx):
+    clip = put_in_base_dir(boxx, "clip-0.mp4", b"MOCK 0")
+    boxx.record_file(MOCK_SITE, ITEM, "Clip 0", str(clip), boxx.hash_file(str(clip)))
+
+    size, sha256 = boxx.open_manifest().execute("SELECT size, sha256 FROM files WHERE file = ?",
+                                               (boxx.clean("Clip 0"),)).fetchone()
+    assert (size, sha256) == (6, boxx.hash_file(str(clip)))
+
+
+def test_item_is_complete_once_every_listed_file_is_there(make_boxx, start_site, session):
+    site_url, _ = start_site()
+    boxx = make_boxx(site_url, {"dedup-mode": "off", "mover-threads": "0"})
+    http = boxx.build_http_session(session)
+    item_url = dict((item, url) for url, item in boxx.read_catalog_over_http(http, MOCK_SITE))[ITEM]
+    files = boxx.list_item_files_over_http(http, item_url, MOCK_SITE, ITEM, boxx.FileSelector([], []))
+    boxx.ensure_save_dir_exists(MOCK_SITE, ITEM)
+
+    for _, ttl, cnt_name, dur, descr, dl_url in files:
+        assert not boxx.item_complete(MOCK_SITE, ITEM)
+        assert boxx.fetch_file(http, dl_url, ITEM, MOCK_SITE, boxx.member_filename(ttl, cnt_name, dur, descr))
+    assert boxx.item_complete(MOCK_SITE, ITEM)
+    assert len(os.listdir(boxx.get_save_dir(MOCK_SITE, ITEM))) == len(files) == 6
@@ -0,0 +1,109 @@
+"""
+The media index of everything under base-dir, and --query.  (See
+update_media_index(), index_new_files() and query_media())
+"""
+import os
+import sys
+
+from pathlib import Path
+
+import pytest
+
+from conftest import MOCK_SITE
+
+ITEM = "001-mock-pack-0"
+FAKE_FFPROBE = """#!{python}
+import json, sys
+path = sys.argv[-1]
+with open({log!r}, "a") as log:
+    log.write(path + "\\n")
+print(json.dumps({{"streams": [{{"codec_name": "prores", "width": 3840 if "4k" in path else 1920,
+                                 "height": 2160 if "4k" in path else 1080}}],
+                  "format": {{"duration": "5.5"}}}}))
+"""
+
+
+@pytest.fixture
+def ffprobe(tmp_path) -> Path:
+    """ Stands in for ffprobe.  Each file it probes is added to the returned log. """
+    log = tmp_path / "ffprobe.log"
+    script = tmp_path / "ffprobe"
+    script.write_text(FAKE_FFPROBE.format(python=sys.executable, log=str(log)), encoding="utf-8")
+    script.chmod(0o755)
+    log.touch()
+    return script
+
+
+@pytest.fixture
+def archive(make_boxx, start_site, session, ffprobe, monkeypatch):
+    """ The first item of the mock site, downloaded and listed. """
+    site_url, _ = start_site()
+    boxx = make_boxx(site_url, {"mover-threads": "0"})
+    monkeypatch.setattr(boxx, "FFPROBE", str(ffprobe))
+    # THE PROBES RUN IN OTHER PROCESSES, WHICH LOOK THE MODULE UP BY NAME.
+    monkeypatch.setitem(sys.modules, boxx.__name__, boxx)
+    http = boxx.build_http_session(session)
+    files = boxx.list_item_files_over_http(http, f"{site_url}/Downloads?path=0~0|x", MOCK_SITE, ITEM,
+                                           boxx.FileSelector([], []))
+    boxx.ensure_save_dir_exists(MOCK_SITE, ITEM)
+    for _, ttl, cnt_name, dur, descr, dl_url in files:
+        boxx.fetch_file(http, dl_url, ITEM, MOCK_SITE, boxx.member_filename(ttl, cnt_name, dur, descr))
+    boxx.MEDIA_PENDING.clear()
+    return boxx
+
+
+def query(boxx, capsys, *rules: str) -> list:
+    """ The names of the files --query lists for the rules. """
+    capsys.readouterr()
+    boxx.query_media(boxx.FileSelector([boxx.parse_rule(rule, tuple(boxx.MEDIA_COLUMNS)) for rule in rules], []))
+    return [os.path.basename(line.split("  ")[0]) for line in capsys.readouterr().out.splitlines()[:-1]]
+
+
+def probed(ffprobe: Path) -> list:
+    return [os.path.basename(path) for path in (ffprobe.parent / "ffprobe.log").read_text().split()]
+
+
+def test_files_are_found_by_what_they_are(archive, ffprobe, capsys):
+    archive.update_media_index()
+    assert len(probed(ffprobe)) == 6
+
+    assert query(archive, capsys, "width:>=3000") == [f"clip-{member}-mc000{member:03d}-00{member:02d}-4k-prores.mp4"
+                                                      for member in range(3)]
+    assert query(archive, capsys, "title:clip-1", "variant:hd-*") == ["clip-1-mc000001-0001-hd-prores.mp4"]
+    assert query(archive, capsys, "codec:h264") == []
+
+
+def test_only_new_and_changed_files_are_probed_again(archive, ffprobe):
+    archive.update_media_index()
+    save_dir = archive.get_save_dir(MOCK_SITE, ITEM)
+    changed, gone = sorted(os.listdir(save_dir))[:2]
+    with open(os.path.join(save_dir, changed), "ab") as media_file:
+        media_file.write(b"more")
+    os.remove(os.path.join(save_dir, gone))
+
+    archive.update_media_index()
+
+    assert probed(ffprobe)[6:] == [changed]
+    paths = [row[0] for row in archive.open_manifest().execute("SELECT path FROM media")]
+    assert len(paths) == 5
+    assert os.path.join(save_dir, gone) not in paths
+
+
+def test_without_ffprobe_the_names_are_indexed(archive, capsys, monkeypatch):
+    monkeypatch.setattr(archive, "FFPROBE", "")
+    archive.update_media_index()
+
+    # THE LENGTH COMES FROM THE DURATION IN THE NAME.
+    assert query(archive, capsys, "duration:1", "variant:4k-prores") == ["clip-1-mc000001-0001-4k-prores.mp4"]
+    assert query(archive, capsys, "width:>0") == []
+
+
+def test_moved_files_are_indexed_at_the_end_of_the_run(archive, ffprobe, capsys):
+    clip = Path(archive.get_save_dir(MOCK_SITE, ITEM), "clip-9.mp4")
+    clip.write_bytes(b"MOCK")
+    archive.record_file(MOCK_SITE, ITEM, "clip-9", str(clip))
+
+    archive.index_new_files()
+
+    assert probed(ffprobe) == ["clip-9.mp4"]
+    assert query(archive, capsys, "title:clip-9") == ["clip-9.mp4"]
@@ -0,0 +1,101 @@
+"""
+Moving finished browser downloads into place in the background, and the
+outbox that keeps them safe across a crash.  (See rename_and_move_dl_file(),
+the mover threads and requeue_outbox())
+"""
+import os
+
+from pathlib import Path
+
+from conftest import MOCK_SITE
+
+ITEM = "001-mock-pack-0"
+
+
+def browser_download(boxx, name: str, data: bytes = b"MOCK") -> None:
+    """ Leave a finished download in the download directory. """
+    Path(boxx.DOWNLOAD_DIR).mkdir(parents=True, exist_ok=True)
+    Path(boxx.DOWNLOAD_DIR, name).write_bytes(data)
+
+
+def saved(boxx, name: str) -> Path:
+    return Path(boxx.get_save_dir(MOCK_SITE, ITEM), name)
+
+
+def outbox(boxx) -> list:
+    return sorted(os.listdir(boxx.get_outbox_dir()))
+
+
+def test_downloads_are_moved_in_the_background(make_boxx):
+    boxx = make_boxx(settings={"mover-threads": "2", "mover-queue-size": "1"})
+    boxx.ensure_save_dir_exists(MOCK_SITE, ITEM)
+    for member in range(3):
+        browser_download(boxx, f"mock-0-{member}-0.mp4", f"MOCK 0 {member} 0".encode())
+        boxx.rename_and_move_dl_file(ITEM, MOCK_SITE, f"clip-{member}")
+        # THE DOWNLOAD DIRECTORY IS EMPTY AGAIN BEFORE THE MOVE IS DONE.
+        assert not boxx.list_download_files(boxx.DOWNLOAD_DIR)
+    boxx.stop_mover()
+
+    for member in range(3):
+        assert saved(boxx, f"clip-{member}.mp4").read_bytes() == f"MOCK 0 {member} 0".encode()
+        assert boxx.file_exists(MOCK_SITE, ITEM, f"clip-{member}")
+    assert outbox(boxx) == []
+
+
+def test_outbox_of_a_crashed_run_is_moved_by_the_next(make_boxx, monkeypatch):
+    boxx = make_boxx(settings={"mover-threads": "0"})
+    boxx.ensure_save_dir_exists(MOCK_SITE, ITEM)
+    browser_download(boxx, "mock-0-0-0.mp4")
+    # THE RUN DIES BEFORE THE MOVER GETS TO THE FILE.
+    monkeypatch.setattr(boxx, "queue_move", lambda job: None)
+    boxx.rename_and_move_dl_file(ITEM, MOCK_SITE, "clip-0")
+    assert len(outbox(boxx)) == 2
+
+    boxx = make_boxx(settings={"mover-threads": "0"})
+    boxx.requeue_outbox()
+
+    assert saved(boxx, "clip-0.mp4").read_bytes() == b"MOCK"
+    assert outbox(boxx) == []
+
+
+def test_job_whose_file_is_gone_is_dropped(make_boxx, monkeypatch):
+    boxx = make_boxx(settings={"mover-threads": "0"})
+    boxx.ensure_save_dir_exists(MOCK_SITE, ITEM)
+    browser_download(boxx, "mock-0-0-0.mp4")
+    monkeypatch.setattr(boxx, "queue_move", lambda job: None)
+    boxx.rename_and_move_dl_file(ITEM, MOCK_SITE, "clip-0")
+    os.remove(os.path.join(boxx.get_outbox_dir(), outbox(boxx)[0]))
+
+    boxx.requeue_outbox()
+    assert outbox(boxx) == []
+    assert not boxx.file_exists(MOCK_SITE, ITEM, "clip-0")
+
+
+def test_unreadable_job_is_quarantined_with_its_file(boxx):
+    Path(boxx.get_outbox_dir(), "1-mock-0-0-0.mp4").write_bytes(b"MOCK")
+    Path(boxx.get_outbox_dir(), "1-mock-0-0-0.mp4.json").write_text('{"src": ', encoding="utf-8")
+
+    boxx.requeue_outbox()
+
+    assert outbox(boxx) == []
+    quarantined, = os.listdir(os.path.join(boxx.DOWNLOAD_DIR, ".quarantine"))
+    assert sorted(os.listdir(os.path.join(boxx.DOWNLOAD_DIR, ".quarantine", quarantined))) \
+        == ["1-mock-0-0-0.mp4", "1-mock-0-0-0.mp4.json"]
+
+
+def test_file_that_changed_is_reported_and_kept(make_boxx, monkeypatch):
+    boxx = make_boxx(settings={"mover-threads": "0"})
+    boxx.ensure_save_dir_exists(MOCK_SITE, ITEM)
+    browser_download(boxx, "mock-0-0-0.mp4")
+    jobs = []
+    monkeypatch.setattr(boxx, "queue_move", jobs.append)
+    boxx.rename_and_move_dl_file(ITEM, MOCK_SITE, "clip-0")
+    with open(jobs[0]["src"], "ab") as outbox_file:
+        outbox_file.write(b" and more")
+
+    boxx.move_or_report(jobs[0])
+
+    assert boxx.RUN_STATS["failed"] == [f"{MOCK_SITE.upper()} {ITEM} clip-0 not moved: "
+                                        f"{jobs[0]['src']} changed size while waiting to be moved (move)"]
+    assert len(outbox(boxx)) == 2
+    assert not saved(boxx, "clip-0.mp4").exists()
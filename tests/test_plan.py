@@ -0,0 +1,84 @@
+"""
+The order the plan downloads files in.  (See order_plan() and
+measure_plan_entry())
+"""
+from pathlib import Path
+
+from conftest import MOCK_SITE
+
+
+def entry(boxx, item: str, filename: str | None, size: float, files: float = 1):
+    return boxx.PlanEntry(MOCK_SITE, item, f"/Downloads/{item}", filename, None, files, size)
+
+
+def test_catalog_order_is_kept(boxx):
+    plan = [entry(boxx, "002-b", "x", 5), entry(boxx, "010-a", "y", 1), entry(boxx, "001-c", "z", 3)]
+    assert boxx.order_plan(plan, ["catalog"], []) == plan
+
+
+def test_newest_and_oldest_go_by_volume(boxx):
+    plan = [entry(boxx, "002-b", "x", 5), entry(boxx, "010-a", "y", 1), entry(boxx, "001-c", "z", 3)]
+    assert [e.item for e in boxx.order_plan(plan, ["newest"], [])] == ["010-a", "002-b", "001-c"]
+    assert [e.item for e in boxx.order_plan(plan, ["oldest"], [])] == ["001-c", "002-b", "010-a"]
+
+
+def test_size_rules_go_by_file_size(boxx):
+    # A WHOLE ITEM (FILES NOT KNOWN YET) COUNTS AS ITS AVERAGE FILE.
+    plan = [entry(boxx, "001-a", "big", 900), entry(boxx, "001-a", None, 1000, files=4),
+            entry(boxx, "002-b", "small", 100)]
+    assert [e.size for e in boxx.order_plan(plan, ["smallest"], [])] == [100, 1000, 900]
+    assert [e.size for e in boxx.order_plan(plan, ["largest"], [])] == [900, 1000, 100]
+
+
+def test_rules_apply_in_turn_after_first(boxx):
+    plan = [entry(boxx, "001-a", "a1", 50), entry(boxx, "002-b", "b1", 90), entry(boxx, "002-b", "b2", 10),
+            entry(boxx, "003-c", "c1", 70)]
+    ordered = boxx.order_plan(plan, ["newest", "smallest"], ["001-a"])
+    assert [e.filename for e in ordered] == ["a1", "c1", "b2", "b1"]
+
+
+def test_real_sizes_come_from_the_site(make_boxx, start_site, catalog, session):
+    site_url, stats = start_site()
+    boxx = make_boxx(site_url, {"head-requests": "Yes"})
+    http = boxx.build_http_session(session)
+    planned = entry(boxx, "001-mock-pack-0", "clip-0", 1)._replace(dl_url=f"{site_url}/file/0/0/0")
+
+    assert boxx.measure_plan_entry(http, planned).size == catalog.file_size
+    # HEAD REQUESTS AREN'T DOWNLOADS, AND THE SIZE IS ONLY ASKED FOR ONCE.
+    assert stats["downloads"] == 0
+    assert boxx.measure_plan_entry(http, planned).size == catalog.file_size
+    assert stats["requests"] == 1
+
+
+def test_unknown_sizes_keep_the_estimate(boxx, session):
+    planned = entry(boxx, "001-mock-pack-0", None, 1234, files=3)
+    assert boxx.measure_plan_entry(boxx.build_http_session(session), planned) == planned
+
+
+def test_known_sizes_are_used_without_asking_the_site(make_boxx, start_site, session):
+    site_url, stats = start_site()
+    boxx = make_boxx(site_url)
+    http = boxx.build_http_session(session)
+    cut_off, moved, unknown = (entry(boxx, "001-mock-pack-0", f"clip-{member}", 1)._replace(
+        dl_url=f"{site_url}/file/0/{member}/0") for member in range(3))
+    Path(boxx.STAGING_DIR).mkdir(parents=True, exist_ok=True)
+    boxx.save_staged_info(boxx.get_staged_path(MOCK_SITE, "001-mock-pack-0", "clip-0"), {"expected_size": 500})
+    # THE SAME CLIP FROM ANOTHER VOLUME.
+    boxx.ensure_save_dir_exists(MOCK_SITE, "002-mock-pack-1")
+    clip = Path(boxx.get_save_dir(MOCK_SITE, "002-mock-pack-1"), "clip-1.mp4")
+    clip.write_bytes(b"x" * 700)
+    boxx.record_file(MOCK_SITE, "002-mock-pack-1", "clip-1", str(clip))
+
+    assert boxx.measure_plan_entry(http, cut_off).size == 500
+    assert boxx.measure_plan_entry(http, moved).size == 700
+    assert boxx.measure_plan_entry(http, unknown) == unknown
+    assert stats["requests"] == 0
+
+
+def test_known_files_are_not_looked_up_without_head_requests(make_boxx, start_site, session):
+    site_url, stats = start_site()
+    boxx = make_boxx(site_url)
+
+    assert not boxx.link_known_file(boxx.build_http_session(session), f"{site_url}/file/0/0/0",
+                                    "001-mock-pack-0", MOCK_SITE, "clip-0")
+    assert stats["requests"] == 0
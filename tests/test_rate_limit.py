@@ -0,0 +1,78 @@
+"""
+The download limit: no more than downloads-per-window downloads in
+download-window-in-seconds.  (See wait_for_download_slot())
+"""
+import time
+
+import pytest
+
+from conftest import MOCK_SITE
+
+LIMITED = {"downloads-per-window": "2", "download-window-in-seconds": "60"}
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> list:
+    """ How long each time.sleep() would have slept.  (Nothing sleeps) """
+    slept = []
+    monkeypatch.setattr(time, "sleep", slept.append)
+    return slept
+
+
+def test_full_window_waits_for_the_oldest_download(make_boxx, sleeps):
+    boxx = make_boxx(settings=LIMITED)
+    first = boxx.wait_for_download_slot(MOCK_SITE)
+    boxx.wait_for_download_slot(MOCK_SITE)
+    assert not sleeps
+
+    boxx.wait_for_download_slot(MOCK_SITE)
+    assert len(sleeps) == 1
+    assert first + 60 - time.time() <= sleeps[0] <= 60
+
+
+def test_released_slot_is_given_back(make_boxx, sleeps):
+    boxx = make_boxx(settings=LIMITED)
+    boxx.wait_for_download_slot(MOCK_SITE)
+    boxx.release_download_slot(MOCK_SITE, boxx.wait_for_download_slot(MOCK_SITE))
+
+    boxx.wait_for_download_slot(MOCK_SITE)
+    assert not sleeps
+    assert len(boxx.load_download_history(MOCK_SITE)) == 2
+
+
+def test_history_is_shared_and_ages_out(make_boxx):
+    boxx = make_boxx(settings=LIMITED)
+    now = time.time()
+    boxx.save_download_history(MOCK_SITE, [now - 120, now - 30, now - 10])
+
+    # A LATER RUN SEES THE DOWNLOADS STILL INSIDE THE WINDOW.
+    assert make_boxx(settings=LIMITED).load_download_history(MOCK_SITE) == [now - 30, now - 10]
+
+
+def test_http_downloads_stay_under_the_site_limit(make_boxx, start_site, mock, session):
+    # THE SITE COUNTS A DOWNLOAD WHEN ITS REQUEST ARRIVES, A LITTLE AFTER
+    # ITS SLOT WAS CLAIMED, SO ITS WINDOW IS A LITTLE SHORTER HERE.
+    site_url, stats = start_site(rate_limit=mock.RateLimit(2, 0.8))
+    boxx = make_boxx(site_url, {"downloads-per-window": "2", "download-window-in-seconds": "1",
+                                "dedup-mode": "off"})
+    http = boxx.build_http_session(session)
+    boxx.ensure_save_dir_exists(MOCK_SITE, "001-mock-pack-0")
+
+    started = time.time()
+    for member in range(3):
+        assert boxx.fetch_file(http, f"{site_url}/file/0/{member}/0", "001-mock-pack-0", MOCK_SITE,
+                               f"clip-{member}")
+
+    assert stats["downloads"] == 3
+    assert stats["refused"] == 0
+    assert time.time() - started >= 0.9
+
+
+def test_download_the_site_started_is_counted_without_waiting(make_boxx, sleeps):
+    boxx = make_boxx(settings=LIMITED)
+    boxx.wait_for_download_slot(MOCK_SITE)
+    boxx.wait_for_download_slot(MOCK_SITE)
+
+    boxx.claim_download_slot(MOCK_SITE)
+    assert not sleeps
+    assert len(boxx.load_download_history(MOCK_SITE)) == 3
@@ -0,0 +1,81 @@
+"""
+--include / --exclude rules.  (See parse_rule() and selected())
+"""
+import math
+
+import pytest
+
+
+def selector(boxx, include=(), exclude=()):
+    return boxx.FileSelector([boxx.parse_rule(rule) for rule in include],
+                             [boxx.parse_rule(rule) for rule in exclude])
+
+
+def test_name_rules_are_lower_case_globs(boxx):
+    rule = boxx.parse_rule("Title: *Sunset Beach*")
+    assert rule.field == "title"
+    assert rule.pattern == "*sunset-beach*"
+
+
+@pytest.mark.parametrize("text, low, high", [
+    ("volume:3-10", 3, 10),
+    ("volume:7", 7, 7),
+    ("volume:>=12", 12, math.inf),
+    ("duration:<=5", 0, 5),
+    ("duration:0:05-0:30", 5, 30),
+    ("duration:1:30", 90, 90),
+])
+def test_number_rules_are_ranges(boxx, text, low, high):
+    rule = boxx.parse_rule(text)
+    assert (rule.low, rule.high) == (low, high)
+
+
+def test_strict_comparisons_leave_out_the_limit(boxx):
+    rule = boxx.parse_rule("duration:<5")
+    assert rule.low <= 4.999 <= rule.high
+    assert not rule.low <= 5 <= rule.high
+
+
+@pytest.mark.parametrize("text", ["title", "colour:red", "title:", "volume:many", "duration:<soon"])
+def test_bad_rules_are_refused(boxx, text):
+    with pytest.raises(ValueError):
+        boxx.parse_rule(text)
+
+
+def test_query_fields_are_only_for_queries(boxx):
+    with pytest.raises(ValueError):
+        boxx.parse_rule("codec:h264")
+    assert boxx.parse_rule("codec:h264", tuple(boxx.MEDIA_COLUMNS)).field == "codec"
+
+
+def test_no_rules_select_everything(boxx):
+    assert boxx.selected(selector(boxx), item="001-a", title="x", variant="4k-prores")
+
+
+def test_rules_for_a_field_are_alternatives(boxx):
+    wanted = selector(boxx, include=["variant:4k-*", "variant:hd-h264"])
+    assert boxx.selected(wanted, variant="4k-prores")
+    assert boxx.selected(wanted, variant="hd-h264")
+    assert not boxx.selected(wanted, variant="hd-prores")
+
+
+def test_rules_for_different_fields_must_all_match(boxx):
+    wanted = selector(boxx, include=["volume:>=10", "title:*beach*"])
+    assert boxx.selected(wanted, volume=12, title="sunset-beach")
+    assert not boxx.selected(wanted, volume=12, title="forest")
+    assert not boxx.selected(wanted, volume=3, title="sunset-beach")
+
+
+def test_excludes_win(boxx):
+    wanted = selector(boxx, include=["title:*beach*"], exclude=["duration:>60"])
+    assert boxx.selected(wanted, title="beach", duration=30)
+    assert not boxx.selected(wanted, title="beach", duration=90)
+
+
+def test_only_the_known_fields_are_checked(boxx):
+    # AN ITEM IS LOOKED AT BEFORE ITS FILES ARE KNOWN, AND SINGLE FILES
+    # HAVE NO VARIANT.
+    wanted = selector(boxx, include=["item:001-*", "variant:4k-*"], exclude=["duration:<5"])
+    assert boxx.selected(wanted, item="001-mock")
+    assert not boxx.selected(wanted, item="002-mock")
+    assert boxx.selected(wanted, item="001-mock", title="clip", duration=None)
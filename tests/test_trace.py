@@ -0,0 +1,118 @@
+"""
+Where the time went: spans for --trace and stacks for --profile.  (See
+span(), traced(), write_trace(), start_profiler() and stop_profiler())
+"""
+import json
+import signal
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import MOCK_SITE, no_browser, save_session_file
+
+
+@pytest.fixture
+def alarm():
+    """ Put back the SIGALRM handler the profiler replaces. """
+    handler = signal.getsignal(signal.SIGALRM)
+    yield
+    signal.setitimer(signal.ITIMER_REAL, 0)
+    signal.signal(signal.SIGALRM, handler)
+
+
+def spans(events: list) -> dict:
+    """ The complete spans of a trace by name. """
+    return {event["name"]: event for event in events if event["ph"] == "X"}
+
+
+def test_nothing_is_recorded_without_tracing(boxx):
+    with boxx.span("idle"):
+        pass
+    assert boxx.TRACE_EVENTS is None
+
+
+def test_spans_nest_by_time(boxx):
+    boxx.start_tracing()
+    with boxx.span("outer", "phase", site=MOCK_SITE):
+        with boxx.span("inner", "wait"):
+            time.sleep(0.01)
+
+    outer, inner = spans(boxx.TRACE_EVENTS)["outer"], spans(boxx.TRACE_EVENTS)["inner"]
+    assert (outer["cat"], outer["args"]) == ("phase", {"site": MOCK_SITE})
+    assert inner["dur"] >= 10_000
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert outer["tid"] == inner["tid"] == threading.get_ident()
+
+
+def test_each_thread_is_named_once(boxx):
+    def work():
+        for _ in range(2):
+            with boxx.span("work"):
+                pass
+
+    boxx.start_tracing()
+    worker = threading.Thread(target=work, name="mover-0")
+    with boxx.span("main"):
+        pass
+    with boxx.span("main again"):
+        pass
+    worker.start()
+    worker.join()
+
+    names = [event["args"]["name"] for event in boxx.TRACE_EVENTS if event["ph"] == "M"]
+    assert names == [threading.current_thread().name, "mover-0"]
+
+
+def test_traced_functions_are_spans_named_after_them(boxx):
+    @boxx.traced
+    def plan_site(answer):
+        return answer
+
+    boxx.start_tracing()
+    assert plan_site(42) == 42
+    assert plan_site.__name__ == "plan_site"
+    assert spans(boxx.TRACE_EVENTS)["plan_site"]["cat"] == "code"
+
+
+def test_profile_is_folded_stacks(boxx, alarm, tmp_path):
+    def busy_for_a_while():
+        deadline = time.time() + 0.3
+        while time.time() < deadline:
+            pass
+
+    boxx.start_profiler(0.005)
+    busy_for_a_while()
+    boxx.stop_profiler(str(tmp_path / "profile.folded"))
+
+    lines = (tmp_path / "profile.folded").read_text().splitlines()
+    assert lines
+    stacks = {line.rsplit(" ", 1)[0]: int(line.rsplit(" ", 1)[1]) for line in lines}
+    busy = [stack for stack in stacks if stack.split(";")[-1].startswith("busy_for_a_while ")]
+    assert busy
+    assert all(stack.startswith("MainThread;") for stack in busy)
+    assert sum(stacks[stack] for stack in busy) >= 10
+
+
+def test_traced_run_of_the_mock_site(make_boxx, start_site, catalog, session, alarm, tmp_path, monkeypatch):
+    site_url, stats = start_site()
+    boxx = make_boxx(site_url, {"mover-threads": "0"})
+    monkeypatch.setattr(boxx, "start_browser", no_browser)
+    monkeypatch.setattr(sys, "argv", ["boxx-download.py", MOCK_SITE, "--trace", str(tmp_path / "trace.json"),
+                                      "--profile", str(tmp_path / "profile.folded")])
+    save_session_file(boxx, session)
+
+    boxx.main()
+
+    assert stats["downloads"] == catalog.file_count
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    assert trace["displayTimeUnit"] == "ms"
+    run = spans(trace["traceEvents"])["run"]
+    for event in trace["traceEvents"]:
+        if event["ph"] == "X":
+            assert run["ts"] <= event["ts"] <= event["ts"] + event["dur"] <= run["ts"] + run["dur"] + 1
+    phases = {event["name"] for event in trace["traceEvents"] if event.get("cat") == "phase"}
+    assert {"login", "my-downloads", "transfer"} <= phases
+    assert (tmp_path / "profile.folded").read_text()
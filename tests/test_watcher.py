@@ -0,0 +1,81 @@
+"""
+Noticing finished browser downloads.  (See DownloadWatcher and
+wait_for_any_download())
+"""
+import os
+import threading
+import time
+
+from pathlib import Path
+
+import pytest
+
+QUICK = {"download-stable-size-in-seconds": "0.01", "download-poll-interval-in-seconds": "0.05"}
+
+
+@pytest.fixture
+def quick_boxx(make_boxx):
+    return make_boxx(settings=QUICK)
+
+
+def download_dir(boxx, name: str) -> str:
+    dl_dir = os.path.join(boxx.DOWNLOAD_DIR, ".inflight", name)
+    Path(dl_dir).mkdir(parents=True)
+    return dl_dir
+
+
+def firefox_download(dl_dir: str, name: str, data: bytes, delay: float = 0.0) -> None:
+    """ Download a file the way Firefox does: a placeholder, a .part file, then a rename. """
+    time.sleep(delay)
+    Path(dl_dir, name).write_bytes(b"")
+    Path(dl_dir, name + ".part").write_bytes(data)
+    os.replace(os.path.join(dl_dir, name + ".part"), os.path.join(dl_dir, name))
+
+
+def test_download_in_progress_is_not_finished(quick_boxx):
+    dl_dir = download_dir(quick_boxx, "0")
+    with quick_boxx.DownloadWatcher(dl_dir) as watcher:
+        Path(dl_dir, "clip.mp4").write_bytes(b"")
+        Path(dl_dir, "clip.mp4.part").write_bytes(b"MOCK")
+        assert watcher.check() is None
+
+        os.replace(os.path.join(dl_dir, "clip.mp4.part"), os.path.join(dl_dir, "clip.mp4"))
+        event = watcher.check()
+    assert (event.filename, event.size) == ("clip.mp4", 4)
+
+
+def test_empty_placeholder_is_not_finished(quick_boxx):
+    dl_dir = download_dir(quick_boxx, "0")
+    Path(dl_dir, "clip.mp4").write_bytes(b"")
+    with quick_boxx.DownloadWatcher(dl_dir) as watcher:
+        assert watcher.check() is None
+
+
+@pytest.mark.parametrize("inotify", [True, False])
+def test_the_directory_the_download_finished_in_is_found(quick_boxx, monkeypatch, inotify):
+    dl_dirs = [download_dir(quick_boxx, str(number)) for number in range(2)]
+    if not inotify:
+        monkeypatch.setattr(quick_boxx, "inotify_watch", lambda dl_dir: None)
+    else:
+        inotify_fd = quick_boxx.inotify_watch(dl_dirs[0])
+        if inotify_fd is None:
+            pytest.skip("no inotify here")
+        os.close(inotify_fd)
+    writer = threading.Thread(target=firefox_download, args=(dl_dirs[1], "clip.mp4", b"MOCK", 0.2))
+
+    with quick_boxx.DownloadWatcher(dl_dirs[0]) as first, quick_boxx.DownloadWatcher(dl_dirs[1]) as second:
+        assert (first.inotify_fd is not None, second.inotify_fd is not None) == (inotify, inotify)
+        writer.start()
+        watcher, event = quick_boxx.wait_for_any_download([first, second], 5)
+    writer.join()
+
+    assert watcher is second
+    assert event.filename == "clip.mp4"
+    # INOTIFY SAW THE RENAME, SO THE SIZE DIDN'T HAVE TO BE WATCHED.
+    assert ("clip.mp4" in second.closed) == inotify
+
+
+def test_download_that_takes_too_long_times_out(quick_boxx):
+    dl_dir = download_dir(quick_boxx, "0")
+    with quick_boxx.DownloadWatcher(dl_dir, started=time.time() - 10) as watcher:
+        assert quick_boxx.wait_for_any_download([watcher], 5) == (watcher, None)